@@ -1,13 +1,19 @@
+import asyncio
+import logging
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 
+# Load environment variables before the services read their configuration at import time
+load_dotenv()
+
 # Import routers
-from app.routers import measurements
+from app.routers import measurements, patients, analytics, admin
+from app.services.executor import shutdown_executors
+from app.services.gemini_client import GEMINI_WARMUP, GEMINI_WARMUP_PING
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,6 +33,36 @@ app.add_middleware(
 
 # Include routers
 app.include_router(measurements.router, prefix="/api/measurements", tags=["measurements"])
+app.include_router(patients.router, prefix="/api/patients", tags=["patients"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+
+def _log_warmup_failure(task: asyncio.Task):
+    """Log a failed Gemini warm-up instead of leaving its exception unretrieved."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error warming up Gemini model handles: {str(task.exception())}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Start the extraction job workers and warm up the Gemini model handles."""
+    await measurements.job_workers.start()
+    app.state.warmup_task = None
+    if GEMINI_WARMUP:
+        # Warm up in the background so startup is not delayed by channel setup. It runs on its own
+        # thread rather than in the extraction pool, which the job workers need for re-queued jobs.
+        app.state.warmup_task = asyncio.create_task(
+            asyncio.to_thread(measurements.gemini_service.client.warm_up, ping=GEMINI_WARMUP_PING)
+        )
+        app.state.warmup_task.add_done_callback(_log_warmup_failure)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the warm-up and the job workers, close the storage backend and release the worker pools used for blocking service calls."""
+    if getattr(app.state, "warmup_task", None) is not None:
+        app.state.warmup_task.cancel()
+    await measurements.job_workers.stop()
+    measurements.storage_service.close()
+    shutdown_executors()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,56 @@
+from fastapi import APIRouter
+import logging
+
+from ..schemas.admin import CacheStatsResponse, RegionHealthResponse, RateLimitResponse
+from .measurements import gemini_service, storage_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/regions", response_model=RegionHealthResponse)
+async def get_region_health():
+    """
+    Get the routing health of each Gemini region.
+    
+    Returns:
+        RegionHealthResponse: Circuit breaker state and rolling statistics per region
+    """
+    regions = gemini_service.client.router.snapshot()
+    return RegionHealthResponse(
+        success=True,
+        message=f"Retrieved health for {len(regions)} regions",
+        data=regions
+    )
+
+@router.get("/rate-limits", response_model=RateLimitResponse)
+async def get_rate_limits():
+    """
+    Get the client-side Gemini rate limiter metrics.
+    
+    Returns:
+        RateLimitResponse: Budget, queue length and wait time per region
+    """
+    limits = gemini_service.client.rate_limiter.stats()
+    return RateLimitResponse(
+        success=True,
+        message=f"Retrieved rate limits for {len(limits)} regions",
+        data=limits
+    )
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """
+    Get hit/miss counters for the extraction and measurement caches.
+    
+    Returns:
+        CacheStatsResponse: Counters per cache
+    """
+    return CacheStatsResponse(
+        success=True,
+        message="Retrieved cache statistics",
+        data={
+            "extraction": gemini_service.cache.stats(),
+            "measurements": storage_service.cache_stats(),
+        }
+    )
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, Query
+import os
+import logging
+from datetime import datetime
+from typing import Optional
+
+from ..schemas.analytics import TimeSeriesResponse
+from ..services.analytics_service import AnalyticsService, TIMESERIES_FIELDS
+from ..services.executor import run_storage
+from .measurements import storage_service
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of points a chart can ask for
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", "5000"))
+
+router = APIRouter()
+
+# Initialize services
+analytics_service = AnalyticsService(storage_service)
+
+@router.get("/timeseries", response_model=TimeSeriesResponse)
+async def get_timeseries(
+    patient_id: Optional[str] = Query(None, description="Restrict to one patient (informacoes_basicas.id)"),
+    exam_from: Optional[datetime] = Query(None, description="Earliest exam time"),
+    exam_to: Optional[datetime] = Query(None, description="Latest exam time"),
+    fields: Optional[str] = Query(None, description="Comma-separated series to include; all if omitted"),
+    max_points: Optional[int] = Query(None, ge=3, le=TIMESERIES_MAX_POINTS, description="Downsample to at most this many points (LTTB)"),
+    downsample_by: str = Query("peso", description="Series that drives downsampling"),
+):
+    """
+    Get column-oriented measurement series for charts.
+    
+    Values are returned as one array per series aligned with a dates array,
+    optionally downsampled with LTTB, plus per-series statistics computed on
+    the full history.
+    
+    Args:
+        patient_id: Restrict to one patient
+        exam_from: Earliest exam time
+        exam_to: Latest exam time
+        fields: Comma-separated series names
+        max_points: Downsample to at most this many points
+        downsample_by: Series that drives downsampling
+        
+    Returns:
+        TimeSeriesResponse: The series
+    """
+    try:
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        result = await run_storage(
+            analytics_service.timeseries,
+            patient_id, exam_from, exam_to, field_list, max_points, downsample_by
+        )
+        return TimeSeriesResponse(
+            success=True,
+            message=f"Retrieved {result['returned_points']} of {result['total_points']} points",
+            data=result
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{str(e)}. Available fields: {', '.join(TIMESERIES_FIELDS)}"
+        )
+    except Exception as e:
+        logger.error(f"Error building time series: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error building time series: {str(e)}"
+        )
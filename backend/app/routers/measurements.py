@@ -1,44 +1,136 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Body
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Body, Query, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
+import asyncio
 import logging
 import json
-from typing import List, Optional
-import tempfile
-import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import ValidationError
 
 from ..schemas.measurement import (
+    BatchItemResult,
+    BatchUploadResponse,
     FileUpload,
+    ImportRejection,
+    ImportResponse,
+    JobResponse,
     MeasurementData,
     MeasurementResponse,
     MeasurementsListResponse
 )
 from ..services.gemini_service import GeminiService
-from ..services.firestore_service import FirestoreService
+from ..services.storage_backend import (
+    get_storage_service,
+    BATCH_WRITE_LIMIT,
+    MeasurementConflictError,
+    MeasurementExistsError,
+    MeasurementNotFoundError,
+    new_measurement_id
+)
+from ..services.executor import run_extraction, run_storage
+from ..services.export_service import EXPORT_FORMATS, ExportService, ExportUnavailableError
+from ..services.import_service import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, ImportService, is_empty_csv_row, parse_csv_header
+)
+from ..services.pdf_splitter import split_result_sheets
+from ..services.job_queue import JobQueue, JobWorkerPool, FINAL_STATUSES
 from ..utils.file_utils import (
     allowed_file,
     save_uploaded_file,
-    decode_base64_file
+    decode_base64_file,
+    extract_zip_files,
+    get_file_mime_type,
+    read_upload,
+    UploadTooLargeError
 )
 
 logger = logging.getLogger(__name__)
 
+# Batch upload settings
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+
+# Listing page sizes
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Rejected records listed in an import response (all are counted)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+
 router = APIRouter()
 
 # Create service instances
 gemini_service = GeminiService()
-firestore_service = FirestoreService()
+storage_service = get_storage_service()
+export_service = ExportService(storage_service)
+import_service = ImportService(storage_service)
+
+
+async def _process_job(job: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    Extract and save the measurement for a queued job.
+    
+    Args:
+        job: The claimed job, including its payload
+        
+    Returns:
+        Tuple[dict, str]: (measurement data, document ID)
+    """
+    file_name = f"upload.{job['file_type']}" if job["file_type"] else job["file_name"] or ""
+    measurement_data, _ = await run_extraction(
+        gemini_service.process_inbody_bytes, job["payload"], get_file_mime_type(file_name)
+    )
+    doc_id = await run_storage(storage_service.save_measurement, measurement_data)
+    return measurement_data, doc_id
+
+
+job_queue = JobQueue()
+job_workers = JobWorkerPool(job_queue, _process_job)
+
+
+def _job_response(job: Dict[str, Any]) -> JobResponse:
+    """Build a JobResponse from a stored job."""
+    return JobResponse(
+        success=job["status"] != "failed",
+        message=f"Job {job['id']} is {job['status']}",
+        job_id=job["id"],
+        status=job["status"],
+        data=MeasurementData(**job["result"]) if job["result"] else None,
+        id=job["doc_id"],
+        error=job["error"]
+    )
+
+
+async def _enqueue_job(payload: bytes, file_name: str, file_type: Optional[str]) -> JSONResponse:
+    """Queue an extraction job and return a 202 response with its ID."""
+    job_id = await run_storage(job_queue.enqueue, payload, file_name, file_type)
+    job_workers.notify()
+    response = JobResponse(
+        success=True,
+        message="Measurement queued for processing",
+        job_id=job_id,
+        status="pending"
+    )
+    return JSONResponse(
+        status_code=202,
+        content=response.model_dump(mode="json"),
+        headers={"Location": f"/api/measurements/jobs/{job_id}"}
+    )
+
 
 @router.post("/upload", response_model=MeasurementResponse)
 async def upload_measurement_file(
     file: UploadFile = File(...),
+    job: bool = Query(False, description="Queue the file and return a job ID immediately"),
 ):
     """
     Upload and process an InBody measurement file.
     
     Args:
         file: The uploaded file
+        job: If true, queue the extraction and return a job ID (HTTP 202)
         
     Returns:
         MeasurementResponse: The processed measurement data
@@ -51,29 +143,38 @@ async def upload_measurement_file(
                 detail=f"File type not allowed. Allowed types: {', '.join([ext[1:] for ext in ['.jpg', '.jpeg', '.png', '.pdf']])}"
             )
         
-        # Save the uploaded file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
+        # Read the upload in chunks, enforcing the size limit
+        upload = await read_upload(file)
         
         try:
+            if job:
+                return await _enqueue_job(upload.getbuffer(), file.filename, Path(file.filename).suffix.lower()[1:])
+            
             # Process the file with Gemini
-            measurement_data = gemini_service.process_inbody_image(temp_file_path)
+            measurement_data, cached = await run_extraction(
+                gemini_service.process_inbody_bytes, upload.getbuffer(), get_file_mime_type(file.filename)
+            )
             
-            # Save the data to Firestore
-            doc_id = firestore_service.save_measurement(measurement_data)
+            # Save the data to storage
+            doc_id = await run_storage(storage_service.save_measurement, measurement_data)
             
             # Return the response
             return MeasurementResponse(
                 success=True,
                 message="Measurement processed and saved successfully",
                 data=MeasurementData(**measurement_data),
-                id=doc_id
+                id=doc_id,
+                cached=cached
             )
         finally:
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
+            upload.close()
     
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MeasurementExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing measurement file: {str(e)}")
         raise HTTPException(
@@ -81,15 +182,95 @@ async def upload_measurement_file(
             detail=f"Error processing measurement file: {str(e)}"
         )
 
+def _sse(event: str, payload: str) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.post("/upload/stream")
+async def upload_measurement_file_stream(
+    file: UploadFile = File(...),
+):
+    """
+    Upload and process an InBody measurement file, streaming sections as they are extracted.
+    
+    Each top-level section of the report (informacoes_basicas,
+    composicao_corporal, ...) is sent as a "section" event as soon as the
+    model finishes it. The saved measurement follows as a "measurement" event;
+    its data is authoritative and replaces the previewed sections. Failures
+    after the stream has started are sent as an "error" event.
+    
+    Args:
+        file: The uploaded file
+        
+    Returns:
+        StreamingResponse: A text/event-stream of section previews and the saved MeasurementResponse
+    """
+    if not allowed_file(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Allowed types: {', '.join([ext[1:] for ext in ['.jpg', '.jpeg', '.png', '.pdf']])}"
+        )
+    try:
+        upload = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    events = gemini_service.stream_inbody_bytes(upload.getbuffer(), get_file_mime_type(file.filename))
+    
+    async def event_stream():
+        try:
+            while True:
+                # Each step blocks until the model produces the next section, so it runs on the extraction pool
+                item = await run_extraction(next, events, None)
+                if item is None:
+                    return
+                kind, value = item
+                if kind == 'section':
+                    name, section = value
+                    yield _sse("section", json.dumps({"name": name, "value": section}, default=str))
+                    continue
+                
+                measurement_data, cached = value
+                doc_id = await run_storage(storage_service.save_measurement, measurement_data)
+                response = MeasurementResponse(
+                    success=True,
+                    message="Measurement processed and saved successfully",
+                    data=MeasurementData(**measurement_data),
+                    id=doc_id,
+                    cached=cached
+                )
+                yield _sse("measurement", response.model_dump_json())
+        except MeasurementExistsError as e:
+            yield _sse("error", json.dumps({"status": 409, "detail": str(e)}))
+        except Exception as e:
+            logger.error(f"Error streaming measurement file: {str(e)}")
+            yield _sse("error", json.dumps({"status": 500, "detail": f"Error processing measurement file: {str(e)}"}))
+        finally:
+            try:
+                events.close()
+            except ValueError:
+                # Still running on a worker after a disconnect; it is closed when collected
+                pass
+            upload.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @router.post("/upload-base64", response_model=MeasurementResponse)
 async def upload_base64_file(
     file_upload: FileUpload = Body(...),
+    job: bool = Query(False, description="Queue the file and return a job ID immediately"),
 ):
     """
     Upload and process a base64-encoded InBody measurement file.
     
     Args:
         file_upload: The base64-encoded file data
+        job: If true, queue the extraction and return a job ID (HTTP 202)
         
     Returns:
         MeasurementResponse: The processed measurement data
@@ -107,62 +288,485 @@ async def upload_base64_file(
                 detail="Could not determine file type. Please provide file_type."
             )
         
-        # Save the file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as temp_file:
-            temp_file.write(file_data)
-            temp_file_path = temp_file.name
+        if job:
+            return await _enqueue_job(file_data, file_upload.file_name, file_type)
+        
+        # Process the file with Gemini
+        measurement_data, cached = await run_extraction(
+            gemini_service.process_inbody_bytes, file_data, get_file_mime_type(f"upload.{file_type}")
+        )
         
+        # Save the data to storage
+        doc_id = await run_storage(storage_service.save_measurement, measurement_data)
+
+        # Return the response
         try:
-            # Process the file with Gemini
-            measurement_data = gemini_service.process_inbody_image(temp_file_path)
-            
-            # Save the data to Firestore
-            doc_id = firestore_service.save_measurement(measurement_data)
+            return MeasurementResponse(
+                success=True,
+                message="Measurement processed and saved successfully",
+                data=MeasurementData(**measurement_data),
+                id=doc_id,
+                cached=cached
+            )
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Validation error: {e}"
+            )
 
-            # Return the response
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MeasurementExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing base64 measurement file: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing measurement file: {str(e)}"
+        )
+
+
+async def _save_batch_results(results: List[BatchItemResult],
+                              to_save: List[Tuple[int, Dict[str, Any], bool]]) -> None:
+    """
+    Save extracted measurements with batched writes and record the outcome in their result items.
+    
+    Args:
+        results: Result items, updated in place
+        to_save: (result index, measurement data, cached) for each successful extraction
+    """
+    for start in range(0, len(to_save), BATCH_WRITE_LIMIT):
+        chunk = to_save[start:start + BATCH_WRITE_LIMIT]
+        try:
+            doc_ids = await run_storage(
+                storage_service.save_measurements_batch, [data for _, data, _ in chunk]
+            )
+        except Exception as e:
+            logger.error(f"Error saving measurement batch: {str(e)}")
+            for index, _, _ in chunk:
+                results[index].error = f"Error saving measurement: {str(e)}"
+            continue
+        for (index, measurement_data, cached), doc_id in zip(chunk, doc_ids):
+            if doc_id is None:
+                results[index].error = str(MeasurementExistsError(new_measurement_id(measurement_data)))
+                continue
+            results[index] = BatchItemResult(
+                file_name=results[index].file_name,
+                success=True,
+                id=doc_id,
+                cached=cached,
+                data=MeasurementData(**measurement_data)
+            )
+
+
+def _batch_response(results: List[BatchItemResult], noun: str) -> BatchUploadResponse:
+    """Summarise per-item results into a BatchUploadResponse."""
+    succeeded = sum(1 for result in results if result.success)
+    return BatchUploadResponse(
+        success=succeeded == len(results),
+        message=f"Processed {succeeded} of {len(results)} {noun}",
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def _page_name(file_name: str, page: int) -> str:
+    """Name of one page of an uploaded PDF in a result manifest."""
+    return f"{file_name}#page={page}"
+
+
+async def _batch_items(name: str, data: bytes) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Batch items for one uploaded file: the file itself, or one per result sheet of a multi-page PDF."""
+    if Path(name).suffix.lower() != ".pdf":
+        return [(name, data, None)]
+    try:
+        sheets = await run_extraction(split_result_sheets, data)
+    except ValueError as e:
+        return [(name, None, str(e))]
+    if len(sheets) == 1:
+        return [(name, sheets[0][1], None)]
+    return [(_page_name(name, page), sheet, None) for page, sheet in sheets]
+
+
+@router.post("/upload-pdf", response_model=BatchUploadResponse)
+async def upload_measurement_pdf(
+    file: UploadFile = File(...),
+):
+    """
+    Upload a PDF that may hold several InBody reports and save one measurement per report.
+    
+    The PDF is split into pages locally, pages that are not result sheets are
+    skipped and the rest are extracted in parallel.
+    
+    Args:
+        file: The uploaded PDF
+        
+    Returns:
+        BatchUploadResponse: Per-report result manifest, one item per result sheet
+    """
+    if Path(file.filename).suffix.lower() != ".pdf":
+        raise HTTPException(status_code=400, detail="File type not allowed. Allowed types: pdf")
+    
+    try:
+        upload = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        pages = await run_extraction(gemini_service.process_inbody_pdf, upload.getbuffer())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing PDF {file.filename}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing measurement file: {str(e)}"
+        )
+    finally:
+        upload.close()
+    
+    results = [
+        BatchItemResult(
+            file_name=_page_name(file.filename, page), success=False,
+            error=f"Error processing measurement file: {error}" if error else None
+        )
+        for page, _, _, error in pages
+    ]
+    await _save_batch_results(
+        results, [(index, data, cached) for index, (_, data, cached, error) in enumerate(pages) if error is None]
+    )
+    return _batch_response(results, "reports")
+
+@router.post("/upload-batch", response_model=BatchUploadResponse)
+async def upload_measurement_batch(
+    files: List[UploadFile] = File(...),
+):
+    """
+    Upload and process many InBody measurement files at once.
+    
+    Files may be sent as a multipart list and/or as ZIP archives. A PDF with
+    several InBody result sheets becomes one item per sheet. Extraction
+    runs with bounded concurrency and the results are saved with batched
+    writes. A failure on one file does not fail the others.
+    
+    Args:
+        files: The uploaded files or ZIP archives
+        
+    Returns:
+        BatchUploadResponse: Per-file result manifest
+    """
+    # Spool each part under the single-upload size limit, as for single uploads, expanding
+    # archives into their spooled members; every buffer is released when the batch is done
+    uploads = []
+    try:
+        entries: List[Tuple[str, Optional[bytes], Optional[str]]] = []
+        for file in files:
             try:
-                return MeasurementResponse(
-                    success=True,
-                    message="Measurement processed and saved successfully",
-                    data=MeasurementData(**measurement_data),
-                    id=doc_id
-                )
-            except ValidationError as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Validation error: {e}"
+                upload = await read_upload(file)
+            except UploadTooLargeError as e:
+                entries.append((file.filename, None, str(e)))
+                continue
+            uploads.append(upload)
+            if Path(file.filename).suffix.lower() == ".zip":
+                try:
+                    members = extract_zip_files(upload, BATCH_MAX_FILES)
+                except ValueError as e:
+                    entries.append((file.filename, None, str(e)))
+                    continue
+                finally:
+                    # Members are spooled on their own; the archive is no longer needed
+                    upload.close()
+                uploads.extend(member for _, member in members)
+                entries.extend((f"{file.filename}/{name}", member.getbuffer(), None) for name, member in members)
+            elif allowed_file(file.filename):
+                entries.append((file.filename, upload.getbuffer(), None))
+            else:
+                entries.append((file.filename, None, "File type not allowed"))
+            _check_batch_size(len(entries), "files")
+        
+        # Split multi-report PDFs only once the number of files is known to be within the limit
+        items: List[Tuple[str, Optional[bytes], Optional[str]]] = []
+        for name, data, error in entries:
+            if error is None:
+                items.extend(await _batch_items(name, data))
+            else:
+                items.append((name, None, error))
+            _check_batch_size(len(items), "reports")
+        
+        return await _extract_and_save_batch(items)
+    finally:
+        for upload in uploads:
+            upload.close()
+
+
+def _check_batch_size(count: int, noun: str) -> None:
+    """Reject a batch as soon as it holds more than BATCH_MAX_FILES items."""
+    if count > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many {noun} in batch (more than {BATCH_MAX_FILES}); the limit is {BATCH_MAX_FILES}"
+        )
+
+
+async def _extract_and_save_batch(items: List[Tuple[str, Optional[bytes], Optional[str]]]) -> BatchUploadResponse:
+    """
+    Extract batch items with bounded concurrency and save the results with batched writes.
+    
+    Args:
+        items: (name, file data, error) for each item; items with an error are only reported
+        
+    Returns:
+        BatchUploadResponse: Per-item result manifest
+    """
+    results = [
+        BatchItemResult(file_name=name, success=False, error=error)
+        for name, _, error in items
+    ]
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def extract(index: int, name: str, data: bytes):
+        async with semaphore:
+            try:
+                return await run_extraction(
+                    gemini_service.extract_inbody_bytes, data, get_file_mime_type(name.split("#")[0])
                 )
-        finally:
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
+            except Exception as e:
+                logger.error(f"Error processing batch file {name}: {str(e)}")
+                results[index].error = f"Error processing measurement file: {str(e)}"
+                return None
+    
+    pending = [(index, name, data) for index, (name, data, error) in enumerate(items) if error is None]
+    extracted = await asyncio.gather(*(extract(index, name, data) for index, name, data in pending))
+    
+    # Save every successful extraction with batched writes, one commit per chunk
+    to_save = []
+    for (index, _, _), outcome in zip(pending, extracted):
+        if outcome is not None:
+            measurement_data, cached = outcome
+            to_save.append((index, measurement_data, cached))
+    await _save_batch_results(results, to_save)
+    
+    return _batch_response(results, "files")
+
+
+async def _iter_lines(request: Request):
+    """Yield every line of the request body as it arrives, blank ones included."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig", errors="replace").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig", errors="replace").rstrip("\r")
+
 
+@router.post("/import", response_model=ImportResponse)
+async def import_measurements(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson or csv; defaults from the Content-Type"),
+):
+    """
+    Import measurements that were already extracted, without calling Gemini.
+    
+    The body is NDJSON (one MeasurementData object per line) or CSV with a
+    header of dotted column names, as produced by /export. Records are
+    validated as the body streams in and saved in batches; a record with the
+    same patient ID and exam date as an existing measurement updates it.
+    
+    Args:
+        request: The request, whose body is read as a stream
+        format: ndjson or csv; defaults from the Content-Type
+        
+    Returns:
+        ImportResponse: Counts of inserted, updated and rejected records
+    """
+    content_type = request.headers.get("content-type", "")
+    import_format = format or ("csv" if "csv" in content_type else "ndjson")
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown import format: {import_format}")
+    
+    inserted = updated = date_only = rejected = 0
+    errors: List[ImportRejection] = []
+    
+    async def flush(lines, columns):
+        nonlocal inserted, updated, date_only, rejected
+        result = await run_storage(import_service.import_lines, lines, import_format, columns)
+        inserted += result["inserted"]
+        updated += result["updated"]
+        date_only += result["date_only"]
+        rejected += len(result["rejected"])
+        for line_number, error in result["rejected"]:
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append(ImportRejection(line=line_number, error=error))
+    
+    try:
+        columns = None
+        lines = []
+        line_number = 0
+        record = ""
+        async for line in _iter_lines(request):
+            line_number += 1
+            if import_format == "csv":
+                # A quoted CSV field may span lines, blank ones included
+                record += line if not record else "\n" + line
+                if record.count('"') % 2:
+                    continue
+                line, record = record, ""
+                if is_empty_csv_row(line):
+                    continue
+                if columns is None:
+                    columns = parse_csv_header(line)
+                    continue
+            elif not line.strip():
+                continue
+            lines.append((line_number, line))
+            if len(lines) == IMPORT_BATCH_SIZE:
+                await flush(lines, columns)
+                lines = []
+        if record:
+            lines.append((line_number, record))
+        if lines:
+            await flush(lines, columns)
     except Exception as e:
-        logger.error(f"Error processing base64 measurement file: {str(e)}")
+        logger.error(f"Error importing measurements: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing measurement file: {str(e)}"
+            detail=f"Error importing measurements after {inserted + updated} records: {str(e)}"
         )
+    
+    logger.info(f"Imported measurements: {inserted} inserted, {updated} updated "
+                f"({date_only} matched on date only), {rejected} rejected")
+    return ImportResponse(
+        success=rejected == 0,
+        message=f"Imported {inserted + updated} measurements, rejected {rejected}",
+        inserted=inserted,
+        updated=updated,
+        date_only=date_only,
+        rejected=rejected,
+        errors=errors
+    )
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status of an extraction job.
+    
+    Args:
+        job_id: The job ID
+        
+    Returns:
+        JobResponse: The job status, with the measurement once completed
+    """
+    job = await run_storage(job_queue.get, job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID {job_id} not found"
+        )
+    
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Stream job status changes as server-sent events until the job finishes.
+    
+    Args:
+        job_id: The job ID
+        
+    Returns:
+        StreamingResponse: A text/event-stream of JobResponse payloads
+    """
+    job = await run_storage(job_queue.get, job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID {job_id} not found"
+        )
+    
+    async def event_stream():
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                payload = _job_response(current).model_dump_json()
+                yield f"event: {last_status}\ndata: {payload}\n\n"
+            if current["status"] in FINAL_STATUSES:
+                return
+            # Keep the connection alive while waiting for a worker to finish
+            yield ": keep-alive\n\n"
+            await job_workers.wait_for_update(timeout=15)
+            current = await run_storage(job_queue.get, job_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 
 @router.get("", response_model=MeasurementsListResponse)
-async def get_all_measurements():
+async def get_all_measurements(
+    page_size: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum measurements per page"),
+    cursor: Optional[str] = Query(None, description="Cursor returned with the previous page"),
+    since: Optional[datetime] = Query(None, description="Only return measurements changed after this time"),
+    exam_from: Optional[datetime] = Query(None, description="Only return measurements examined at or after this time"),
+    exam_to: Optional[datetime] = Query(None, description="Only return measurements examined at or before this time"),
+):
     """
-    Get all measurements.
+    Get measurements.
+    
+    Without parameters, all measurements are returned. With any of the
+    pagination or filter parameters, one page is returned along with a
+    cursor for the next one. The first page of a `since` sync also lists
+    the measurements deleted after that time.
     
+    Args:
+        page_size: Maximum measurements per page
+        cursor: Cursor returned with the previous page
+        since: Only return measurements changed after this time
+        exam_from: Only return measurements examined at or after this time
+        exam_to: Only return measurements examined at or before this time
+        
     Returns:
-        MeasurementsListResponse: List of all measurements
+        MeasurementsListResponse: List of measurements
     """
     try:
-        # Get all measurements from Firestore
-        measurements = firestore_service.get_all_measurements()
+        if all(param is None for param in (page_size, cursor, since, exam_from, exam_to)):
+            # Get all measurements from storage
+            measurements = await run_storage(storage_service.get_all_measurements)
+            next_cursor = None
+        else:
+            measurements, next_cursor = await run_storage(
+                storage_service.list_measurements,
+                page_size or DEFAULT_PAGE_SIZE, cursor, since, exam_from, exam_to
+            )
+        deleted_ids = []
+        if since is not None and cursor is None:
+            deleted_ids = await run_storage(storage_service.list_deleted_ids, since)
         
         # Return the response
         return MeasurementsListResponse(
             success=True,
             message=f"Retrieved {len(measurements)} measurements",
-            data=measurements
+            data=measurements,
+            next_cursor=next_cursor,
+            deleted_ids=deleted_ids
         )
     
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error getting measurements: {str(e)}")
         raise HTTPException(
@@ -170,11 +774,62 @@ async def get_all_measurements():
             detail=f"Error getting measurements: {str(e)}"
         )
 
+@router.get("/export")
+async def export_measurements(
+    format: str = Query("csv", description="File format: csv, parquet or arrow"),
+    exam_from: Optional[datetime] = Query(None, description="Only export measurements examined at or after this time"),
+    exam_to: Optional[datetime] = Query(None, description="Only export measurements examined at or before this time"),
+):
+    """
+    Export measurements as a flat table, one column per leaf field.
+    
+    The file is streamed while measurements are read page by page, so memory
+    use does not depend on the number of measurements.
+    
+    Args:
+        format: File format (csv, parquet or arrow)
+        exam_from: Only export measurements examined at or after this time
+        exam_to: Only export measurements examined at or before this time
+        
+    Returns:
+        StreamingResponse: The exported file
+    """
+    try:
+        chunks = export_service.export(format, exam_from, exam_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    async def stream():
+        # Each chunk reads (and encodes) one page from storage, so pull them on the storage pool
+        try:
+            while True:
+                chunk = await run_storage(next, chunks, None)
+                if chunk is None:
+                    return
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated file
+            logger.error(f"Error exporting measurements: {str(e)}")
+            raise
+    
+    extension = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="measurements.{extension}"'}
+    )
+
 @router.get("/{measurement_id}", response_model=MeasurementResponse)
-async def get_measurement(measurement_id: str):
+async def get_measurement(measurement_id: str, response: Response):
     """
     Get a specific measurement by ID.
     
+    The ETag response header carries the document version; send it back as
+    If-Match on PUT or DELETE to make the write conditional.
+    
     Args:
         measurement_id: The measurement ID
         
@@ -182,8 +837,8 @@ async def get_measurement(measurement_id: str):
         MeasurementResponse: The measurement data
     """
     try:
-        # Get the measurement from Firestore
-        measurement = firestore_service.get_measurement(measurement_id)
+        # Get the measurement from storage
+        measurement, etag = await run_storage(storage_service.get_measurement_with_etag, measurement_id)
         
         if not measurement:
             raise HTTPException(
@@ -191,6 +846,8 @@ async def get_measurement(measurement_id: str):
                 detail=f"Measurement with ID {measurement_id} not found"
             )
         
+        response.headers["ETag"] = etag
+        
         # Return the response
         return MeasurementResponse(
             success=True,
@@ -211,36 +868,38 @@ async def get_measurement(measurement_id: str):
 @router.put("/{measurement_id}", response_model=MeasurementResponse)
 async def update_measurement(
     measurement_id: str,
+    response: Response,
     measurement_data: MeasurementData = Body(...),
+    if_match: Optional[str] = Header(None),
 ):
     """
     Update a measurement by ID.
     
+    The existence check is part of the write, so this is a single storage
+    round trip. With an If-Match header the write only succeeds if the
+    measurement has not changed since that ETag was read.
+    
     Args:
         measurement_id: The measurement ID
         measurement_data: The updated measurement data
+        if_match: Optional ETag from a previous GET
         
     Returns:
         MeasurementResponse: The updated measurement data
     """
     try:
-        # Check if the measurement exists
-        existing_measurement = firestore_service.get_measurement(measurement_id)
-        
-        if not existing_measurement:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Measurement with ID {measurement_id} not found"
-            )
-        
-        # Update the measurement in Firestore
-        updated_data = measurement_data.model_dump(exclude_unset=True)
+        # Update the measurement in storage
+        # Derived data is maintained by the storage layer, never taken from clients
+        updated_data = measurement_data.model_dump(exclude_unset=True, exclude={"derivados"})
         
         # Preserve the ID
         updated_data["id"] = measurement_id
         
         # Save the updated data
-        firestore_service.save_measurement(updated_data, measurement_id)
+        etag = await run_storage(
+            storage_service.update_measurement, measurement_id, updated_data, if_match
+        )
+        response.headers["ETag"] = etag
         
         # Return the response
         return MeasurementResponse(
@@ -252,6 +911,13 @@ async def update_measurement(
     
     except HTTPException:
         raise
+    except MeasurementNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Measurement with ID {measurement_id} not found"
+        )
+    except MeasurementConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValidationError as e:
         logger.error(f"Validation error updating measurement {measurement_id}: {str(e)}")
         raise HTTPException(
@@ -266,28 +932,23 @@ async def update_measurement(
         )
 
 @router.delete("/{measurement_id}", response_model=MeasurementResponse)
-async def delete_measurement(measurement_id: str):
+async def delete_measurement(measurement_id: str, if_match: Optional[str] = Header(None)):
     """
     Delete a measurement by ID.
     
+    Like update, the existence check (and the If-Match check, if given) is
+    part of the delete itself.
+    
     Args:
         measurement_id: The measurement ID
+        if_match: Optional ETag from a previous GET
         
     Returns:
         MeasurementResponse: Success response
     """
     try:
-        # Check if the measurement exists
-        measurement = firestore_service.get_measurement(measurement_id)
-        
-        if not measurement:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Measurement with ID {measurement_id} not found"
-            )
-        
         # Delete the measurement
-        firestore_service.delete_measurement(measurement_id)
+        await run_storage(storage_service.delete_measurement, measurement_id, if_match)
         
         # Return the response
         return MeasurementResponse(
@@ -296,8 +957,13 @@ async def delete_measurement(measurement_id: str):
             id=measurement_id
         )
     
-    except HTTPException:
-        raise
+    except MeasurementNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Measurement with ID {measurement_id} not found"
+        )
+    except MeasurementConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         logger.error(f"Error deleting measurement {measurement_id}: {str(e)}")
         raise HTTPException(
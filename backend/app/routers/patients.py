@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Query
+import logging
+from datetime import datetime
+from typing import Optional
+
+from ..schemas.measurement import MeasurementsListResponse
+from ..schemas.patient import PatientsListResponse
+from ..services.executor import run_storage
+from .measurements import storage_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("", response_model=PatientsListResponse)
+async def list_patients():
+    """
+    Get all patients with a summary of their latest measurement.
+    
+    Returns:
+        PatientsListResponse: One summary per patient
+    """
+    try:
+        patients = await run_storage(storage_service.list_patients)
+        return PatientsListResponse(
+            success=True,
+            message=f"Retrieved {len(patients)} patients",
+            data=patients
+        )
+    except Exception as e:
+        logger.error(f"Error listing patients: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listing patients: {str(e)}"
+        )
+
+@router.get("/{patient_id}/measurements", response_model=MeasurementsListResponse)
+async def get_patient_measurements(
+    patient_id: str,
+    exam_from: Optional[datetime] = Query(None, description="Only return measurements examined at or after this time"),
+    exam_to: Optional[datetime] = Query(None, description="Only return measurements examined at or before this time"),
+):
+    """
+    Get one patient's measurements, ordered by exam time.
+    
+    Served from the patient index, so the cost depends on the patient's
+    history rather than on the number of measurements stored.
+    
+    Args:
+        patient_id: The patient ID (informacoes_basicas.id)
+        exam_from: Only return measurements examined at or after this time
+        exam_to: Only return measurements examined at or before this time
+        
+    Returns:
+        MeasurementsListResponse: The patient's measurements
+    """
+    try:
+        measurements = await run_storage(
+            storage_service.get_patient_measurements, patient_id, exam_from, exam_to
+        )
+        
+        if not measurements and exam_from is None and exam_to is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Patient with ID {patient_id} not found"
+            )
+        
+        return MeasurementsListResponse(
+            success=True,
+            message=f"Retrieved {len(measurements)} measurements for patient {patient_id}",
+            data=measurements
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting measurements for patient {patient_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting patient measurements: {str(e)}"
+        )
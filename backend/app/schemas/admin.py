@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional, List
+
+class RegionHealth(BaseModel):
+    """Schema for the health of a Gemini region."""
+    region: str = Field(..., description="Vertex AI region")
+    state: str = Field(..., description="Circuit breaker state (closed, open, half_open)")
+    score: float = Field(..., description="Routing score; lower is healthier")
+    requests: int = Field(..., description="Requests in the rolling window")
+    errors: int = Field(..., description="Failed requests in the rolling window")
+    quota_errors: int = Field(..., description="Quota (ResourceExhausted) errors in the rolling window")
+    error_rate: float = Field(..., description="Error rate in the rolling window")
+    latency_ewma_seconds: Optional[float] = Field(None, description="Moving average of successful request latency")
+    consecutive_failures: int = Field(..., description="Failures since the last success")
+    open_for_seconds: Optional[float] = Field(None, description="Time since the breaker opened, if open")
+    last_error: Optional[str] = Field(None, description="Most recent error message")
+
+class RegionHealthResponse(BaseModel):
+    """Schema for region health response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    data: List[RegionHealth] = Field([], description="Health of each region, in configured order")
+
+class RegionRateLimit(BaseModel):
+    """Schema for the client-side rate limit state of a Gemini region."""
+    region: str = Field(..., description="Vertex AI region")
+    rpm_limit: Optional[float] = Field(None, description="Requests per minute budget, if limited")
+    tpm_limit: Optional[float] = Field(None, description="Tokens per minute budget, if limited")
+    requests_available: Optional[float] = Field(None, description="Requests currently available in the bucket")
+    tokens_available: Optional[float] = Field(None, description="Tokens currently available in the bucket")
+    queued: int = Field(..., description="Callers waiting for budget")
+    acquired: int = Field(..., description="Requests admitted since startup")
+    timeouts: int = Field(..., description="Requests that gave up waiting for budget")
+    total_wait_seconds: float = Field(..., description="Total time spent waiting for budget")
+    mean_wait_seconds: float = Field(..., description="Mean wait per admitted request")
+    max_wait_seconds: float = Field(..., description="Longest wait for an admitted request")
+
+class RateLimitResponse(BaseModel):
+    """Schema for rate limit metrics response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    data: List[RegionRateLimit] = Field([], description="Rate limit state of each region")
+
+class CacheStatsResponse(BaseModel):
+    """Schema for cache statistics response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    data: Dict[str, Any] = Field({}, description="Hit/miss counters per cache")
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class SeriesStats(BaseModel):
+    """Schema for summary statistics of one series over the full history."""
+    first: Optional[float] = Field(None, description="First value")
+    last: Optional[float] = Field(None, description="Last value")
+    change: Optional[float] = Field(None, description="Last value minus first value")
+    min: Optional[float] = Field(None, description="Minimum value")
+    max: Optional[float] = Field(None, description="Maximum value")
+    mean: Optional[float] = Field(None, description="Mean value")
+    slope_per_30_days: Optional[float] = Field(None, description="Least-squares trend per 30 days")
+
+class TimeSeries(BaseModel):
+    """Schema for column-oriented measurement series."""
+    ids: List[Optional[str]] = Field([], description="Measurement ID of each point")
+    dates: List[str] = Field([], description="Exam time of each point (ISO 8601)")
+    series: Dict[str, List[Optional[float]]] = Field({}, description="Values per series, aligned with dates")
+    stats: Dict[str, SeriesStats] = Field({}, description="Statistics per series over all points")
+    total_points: int = Field(0, description="Number of measurements in the range")
+    returned_points: int = Field(0, description="Number of points returned after downsampling")
+
+class TimeSeriesResponse(BaseModel):
+    """Schema for time series response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    data: TimeSeries = Field(..., description="Column-oriented series")
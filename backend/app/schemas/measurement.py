@@ -56,6 +56,23 @@ class ControlePeso(BaseModel):
     controle_gordura: Optional[float] = Field(None, description="Recommended fat adjustment in kg")
     controle_musculo: Optional[float] = Field(None, description="Recommended muscle adjustment in kg")
 
+class DerivedValues(BaseModel):
+    """Schema for one derived value per tracked metric."""
+    peso: Optional[float] = Field(None, description="Weight in kg")
+    massa_gordura: Optional[float] = Field(None, description="Body fat mass in kg")
+    massa_muscular_esqueletica: Optional[float] = Field(None, description="Skeletal muscle mass in kg")
+    imc: Optional[float] = Field(None, description="Body Mass Index")
+    pgc: Optional[float] = Field(None, description="Percent Body Fat")
+
+class Derivados(BaseModel):
+    """Schema for comparison data precomputed on write against the patient's history."""
+    medicao_anterior_id: Optional[str] = Field(None, description="ID of the patient's previous measurement")
+    dias_desde_anterior: Optional[float] = Field(None, description="Days since the previous measurement")
+    variacao: Optional[DerivedValues] = Field(None, description="Change since the previous measurement")
+    taxa_30_dias: Optional[DerivedValues] = Field(None, description="Change since the previous measurement per 30 days")
+    media_30_dias: Optional[DerivedValues] = Field(None, description="Average over the 30 days up to this exam")
+    media_90_dias: Optional[DerivedValues] = Field(None, description="Average over the 90 days up to this exam")
+
 class MeasurementData(BaseModel):
     """Schema for complete measurement data."""
     informacoes_basicas: InformacoesBasicas
@@ -66,6 +83,9 @@ class MeasurementData(BaseModel):
     controle_peso: Optional[ControlePeso] = Field(None)
     modelo_inbody: Optional[str] = Field(None, description="InBody equipment model used")
     timestamp: Optional[datetime] = Field(None, description="Timestamp of data creation")
+    updated_at: Optional[datetime] = Field(None, description="Timestamp of the last change")
+    exam_timestamp: Optional[datetime] = Field(None, description="Exam time parsed from informacoes_basicas.data_exame")
+    derivados: Optional[Derivados] = Field(None, description="Comparison data maintained by the server")
     id: Optional[str] = Field(None, description="Document ID in Firestore")
 
     class Config:
@@ -79,9 +99,55 @@ class MeasurementResponse(BaseModel):
     message: str = Field(..., description="Response message")
     data: Optional[MeasurementData] = Field(None, description="Measurement data")
     id: Optional[str] = Field(None, description="Document ID in Firestore")
+    cached: Optional[bool] = Field(None, description="Whether the extraction was served from the cache")
 
 class MeasurementsListResponse(BaseModel):
     """Schema for list of measurements response."""
     success: bool = Field(..., description="Whether the operation was successful")
     message: str = Field(..., description="Response message")
     data: List[MeasurementData] = Field([], description="List of measurement data")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if there is one")
+    deleted_ids: List[str] = Field([], description="With since, on the first page: measurements deleted after that time")
+
+class JobResponse(BaseModel):
+    """Schema for extraction job status response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    job_id: str = Field(..., description="Extraction job ID")
+    status: str = Field(..., description="Job status (pending, running, completed, failed)")
+    data: Optional[MeasurementData] = Field(None, description="Measurement data, once completed")
+    id: Optional[str] = Field(None, description="Document ID in Firestore, once completed")
+    error: Optional[str] = Field(None, description="Error message, if the job failed")
+
+class BatchItemResult(BaseModel):
+    """Schema for the result of one file in a batch upload."""
+    file_name: str = Field(..., description="Original filename (or archive member name)")
+    success: bool = Field(..., description="Whether the file was processed and saved")
+    id: Optional[str] = Field(None, description="Document ID in Firestore, if saved")
+    cached: Optional[bool] = Field(None, description="Whether the extraction was served from the cache")
+    error: Optional[str] = Field(None, description="Error message, if the file failed")
+    data: Optional[MeasurementData] = Field(None, description="Measurement data, if saved")
+
+class BatchUploadResponse(BaseModel):
+    """Schema for batch upload response."""
+    success: bool = Field(..., description="Whether every file was processed and saved")
+    message: str = Field(..., description="Response message")
+    total: int = Field(..., description="Number of files received")
+    succeeded: int = Field(..., description="Number of files saved")
+    failed: int = Field(..., description="Number of files that failed")
+    results: List[BatchItemResult] = Field([], description="Per-file results, in upload order")
+
+class ImportRejection(BaseModel):
+    """Schema for a record rejected by a bulk import."""
+    line: int = Field(..., description="Line number in the uploaded file (1-based, header included)")
+    error: str = Field(..., description="Why the record was rejected")
+
+class ImportResponse(BaseModel):
+    """Schema for bulk import response."""
+    success: bool = Field(..., description="Whether every record was imported")
+    message: str = Field(..., description="Response message")
+    inserted: int = Field(..., description="Number of new measurements")
+    updated: int = Field(..., description="Number of existing measurements (same patient and exam date) updated")
+    date_only: int = Field(0, description="Number of records whose exam date has no time of day, matched on the date")
+    rejected: int = Field(..., description="Number of records rejected")
+    errors: List[ImportRejection] = Field([], description="Rejected records, up to IMPORT_MAX_ERRORS")
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class PatientSummary(BaseModel):
+    """Schema for a patient with their latest measurement."""
+    patient_id: str = Field(..., description="Patient ID (informacoes_basicas.id)")
+    nome: Optional[str] = Field(None, description="Patient name from the latest measurement")
+    measurement_count: int = Field(..., description="Number of measurements for the patient")
+    latest_measurement_id: Optional[str] = Field(None, description="Document ID of the latest measurement")
+    latest_exam_date: Optional[str] = Field(None, description="Exam date of the latest measurement")
+    latest_exam_timestamp: Optional[datetime] = Field(None, description="Parsed exam time of the latest measurement")
+    peso: Optional[float] = Field(None, description="Latest total weight in kg")
+    massa_gordura: Optional[float] = Field(None, description="Latest fat mass in kg")
+    massa_muscular_esqueletica: Optional[float] = Field(None, description="Latest skeletal muscle mass in kg")
+    imc: Optional[float] = Field(None, description="Latest Body Mass Index (BMI) in kg/m²")
+    pgc: Optional[float] = Field(None, description="Latest body fat percentage (%)")
+
+class PatientsListResponse(BaseModel):
+    """Schema for list of patients response."""
+    success: bool = Field(..., description="Whether the operation was successful")
+    message: str = Field(..., description="Response message")
+    data: List[PatientSummary] = Field([], description="List of patient summaries")
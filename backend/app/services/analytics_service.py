@@ -0,0 +1,242 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .storage_backend import EXAM_TIMESTAMP_FIELD, MeasurementStore
+
+logger = logging.getLogger(__name__)
+
+_SEGMENTS = ('braco_esquerdo', 'braco_direito', 'tronco', 'perna_esquerda', 'perna_direita')
+
+# Series name -> path of the value inside a measurement document
+TIMESERIES_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'peso': ('composicao_corporal', 'peso'),
+    'massa_gordura': ('composicao_corporal', 'massa_gordura'),
+    'massa_muscular_esqueletica': ('composicao_corporal', 'massa_muscular_esqueletica'),
+    'agua_corporal_total': ('composicao_corporal', 'agua_corporal_total'),
+    'pgc': ('indices_corporais', 'pgc'),
+    'imc': ('indices_corporais', 'imc'),
+    'nivel_gordura_visceral': ('indices_corporais', 'nivel_gordura_visceral'),
+    **{
+        f'{kind}_{segment}': ('analise_segmentar', kind, segment)
+        for kind in ('massa_magra', 'massa_gorda')
+        for segment in _SEGMENTS
+    },
+}
+
+_SECONDS_PER_30_DAYS = 30 * 24 * 3600
+
+# Page size used when loading a date range across all patients
+_RANGE_PAGE_SIZE = 500
+
+
+def _value_at(measurement: Dict[str, Any], path: Sequence[str]) -> Any:
+    value = measurement
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _column(measurements: List[Dict[str, Any]], path: Sequence[str]) -> np.ndarray:
+    """Pull one numeric field out of every measurement, with NaN where it is missing."""
+    values = (_value_at(measurement, path) for measurement in measurements)
+    return np.fromiter(
+        (value if isinstance(value, (int, float)) else np.nan for value in values),
+        dtype=float,
+        count=len(measurements),
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick the points to keep with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept. The rest are split into
+    threshold - 2 buckets, and from each the point forming the largest
+    triangle with the previously kept point and the next bucket's average
+    is kept, which preserves peaks and trends.
+
+    Args:
+        x: Sorted x values
+        y: y values, same length as x and all finite
+        threshold: Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    # Bucket i covers [edges[i], edges[i + 1]); the last edge is the final point
+    edges = np.floor(np.arange(threshold - 1) * every).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _series_stats(x: np.ndarray, y: np.ndarray) -> Dict[str, Optional[float]]:
+    """Summary statistics and the least-squares trend of one series."""
+    finite = np.isfinite(y)
+    if not finite.any():
+        return {'first': None, 'last': None, 'change': None, 'min': None,
+                'max': None, 'mean': None, 'slope_per_30_days': None}
+    xs, ys = x[finite], y[finite]
+    slope = None
+    if len(xs) > 1 and np.ptp(xs) > 0:
+        slope = float(np.polyfit(xs - xs[0], ys, 1)[0] * _SECONDS_PER_30_DAYS)
+    return {
+        'first': float(ys[0]),
+        'last': float(ys[-1]),
+        'change': float(ys[-1] - ys[0]),
+        'min': float(ys.min()),
+        'max': float(ys.max()),
+        'mean': float(ys.mean()),
+        'slope_per_30_days': slope,
+    }
+
+
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def build_timeseries(
+    measurements: List[Dict[str, Any]],
+    fields: Optional[Sequence[str]] = None,
+    max_points: Optional[int] = None,
+    downsample_by: str = 'peso',
+) -> Dict[str, Any]:
+    """
+    Turn measurements into column-oriented series.
+
+    Statistics are computed on the full history; downsampling only affects the
+    returned points. All series share the points chosen for `downsample_by`,
+    so rows stay aligned.
+
+    Args:
+        measurements: Measurements ordered by exam time
+        fields: Series to include (keys of TIMESERIES_FIELDS); None for all
+        max_points: Downsample to at most this many points with LTTB
+        downsample_by: Series that drives the choice of points
+
+    Returns:
+        dict: ids, dates, series, stats, total_points and returned_points
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    fields = list(fields or TIMESERIES_FIELDS)
+    unknown = [field for field in fields + [downsample_by] if field not in TIMESERIES_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    measurements = [m for m in measurements if isinstance(m.get(EXAM_TIMESTAMP_FIELD), datetime)]
+    x = np.fromiter(
+        (m[EXAM_TIMESTAMP_FIELD].timestamp() for m in measurements), dtype=float, count=len(measurements)
+    )
+    columns = {field: _column(measurements, TIMESERIES_FIELDS[field]) for field in fields}
+    stats = {field: _series_stats(x, values) for field, values in columns.items()}
+
+    keep = np.arange(len(measurements))
+    if max_points and len(measurements) > max_points:
+        driver = columns[downsample_by] if downsample_by in columns else _column(
+            measurements, TIMESERIES_FIELDS[downsample_by]
+        )
+        finite = np.flatnonzero(np.isfinite(driver))
+        if len(finite):
+            keep = finite[lttb_indices(x[finite], driver[finite], max_points)]
+        else:
+            # Nothing to drive LTTB with; fall back to evenly spaced points
+            keep = np.unique(np.linspace(0, len(measurements) - 1, max_points).round().astype(int))
+
+    return {
+        'ids': [measurements[i].get('id') for i in keep],
+        'dates': [measurements[i][EXAM_TIMESTAMP_FIELD].isoformat() for i in keep],
+        'series': {field: _to_list(values[keep]) for field, values in columns.items()},
+        'stats': stats,
+        'total_points': len(measurements),
+        'returned_points': int(len(keep)),
+    }
+
+
+class AnalyticsService:
+    """Server-side aggregation of measurement history for the dashboard charts."""
+
+    def __init__(self, storage: MeasurementStore):
+        """
+        Initialize the service.
+
+        Args:
+            storage (MeasurementStore): Where measurements are read from
+        """
+        self.storage = storage
+
+    def _load(self, patient_id: Optional[str], exam_from: Optional[datetime],
+              exam_to: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Load measurements ordered by exam time, using the narrowest query available."""
+        if patient_id:
+            return self.storage.get_patient_measurements(patient_id, exam_from, exam_to)
+        if exam_from is None and exam_to is None:
+            return self.storage.get_all_measurements()
+
+        measurements, cursor = [], None
+        while True:
+            page, cursor = self.storage.list_measurements(
+                _RANGE_PAGE_SIZE, cursor, exam_from=exam_from, exam_to=exam_to, use_cache=False
+            )
+            measurements.extend(page)
+            if cursor is None:
+                return measurements
+
+    def timeseries(
+        self,
+        patient_id: Optional[str] = None,
+        exam_from: Optional[datetime] = None,
+        exam_to: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+        max_points: Optional[int] = None,
+        downsample_by: str = 'peso',
+    ) -> Dict[str, Any]:
+        """
+        Get column-oriented series for a patient (or everyone) over an exam time range.
+
+        Args:
+            patient_id (str, optional): Restrict to one patient
+            exam_from (datetime, optional): Earliest exam time
+            exam_to (datetime, optional): Latest exam time
+            fields (list, optional): Series to include; None for all
+            max_points (int, optional): Downsample to at most this many points
+            downsample_by (str): Series that drives downsampling
+
+        Returns:
+            dict: See build_timeseries
+
+        Raises:
+            ValueError: If an unknown field is requested
+        """
+        measurements = self._load(patient_id, exam_from, exam_to)
+        result = build_timeseries(measurements, fields, max_points, downsample_by)
+        logger.info(
+            f"Built time series with {result['returned_points']} of {result['total_points']} points"
+        )
+        return result
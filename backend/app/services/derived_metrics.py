@@ -0,0 +1,93 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from .storage_backend import EXAM_TIMESTAMP_FIELD
+
+# Field holding the derived data on each measurement
+DERIVED_FIELD = 'derivados'
+
+# Metric name -> (section, field) in the measurement document
+DERIVED_METRICS = {
+    'peso': ('composicao_corporal', 'peso'),
+    'massa_gordura': ('composicao_corporal', 'massa_gordura'),
+    'massa_muscular_esqueletica': ('composicao_corporal', 'massa_muscular_esqueletica'),
+    'imc': ('indices_corporais', 'imc'),
+    'pgc': ('indices_corporais', 'pgc'),
+}
+
+_DAY_SECONDS = 24 * 3600
+_ROLLING_WINDOWS_DAYS = (30, 90)
+
+# How far derived data looks back: a change to one measurement can only affect
+# the next measurement and those up to this long after it
+DERIVED_WINDOW = timedelta(days=max(_ROLLING_WINDOWS_DAYS))
+
+
+def _metric(measurement: Dict[str, Any], section: str, field: str) -> Optional[float]:
+    value = (measurement.get(section) or {}).get(field)
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def compute_derived(history: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compute the derived data of every measurement in one patient's history.
+
+    For each measurement: the previous scan and the days since it, the change
+    of each metric versus that scan, the change normalised to 30 days, and
+    the 30- and 90-day rolling averages ending at the scan. Missing values
+    are skipped in averages and give None deltas.
+
+    Args:
+        history: The patient's measurements, including 'id', ordered by exam_timestamp
+
+    Returns:
+        list: Derived data aligned with history
+    """
+    times = [
+        measurement[EXAM_TIMESTAMP_FIELD].timestamp()
+        if isinstance(measurement.get(EXAM_TIMESTAMP_FIELD), datetime) else None
+        for measurement in history
+    ]
+    values = {
+        name: [_metric(measurement, section, field) for measurement in history]
+        for name, (section, field) in DERIVED_METRICS.items()
+    }
+    # bisect needs a sorted key list; undated measurements never open a window
+    sorted_times = [time if time is not None else float('-inf') for time in times]
+
+    derived = []
+    for index, measurement in enumerate(history):
+        time = times[index]
+        previous = index - 1 if index > 0 else None
+        days = None
+        if previous is not None and time is not None and times[previous] is not None:
+            days = (time - times[previous]) / _DAY_SECONDS
+
+        result = {
+            'medicao_anterior_id': history[previous].get('id') if previous is not None else None,
+            'dias_desde_anterior': _round(days),
+            'variacao': {},
+            'taxa_30_dias': {},
+        }
+        for name, series in values.items():
+            change = None
+            if previous is not None and series[index] is not None and series[previous] is not None:
+                change = series[index] - series[previous]
+            result['variacao'][name] = _round(change)
+            result['taxa_30_dias'][name] = _round(change / days * 30) if change is not None and days else None
+
+        for window in _ROLLING_WINDOWS_DAYS:
+            averages = {}
+            start = bisect_right(sorted_times, time - window * _DAY_SECONDS) if time is not None else index
+            for name, series in values.items():
+                window_values = [value for value in series[start:index + 1] if value is not None]
+                averages[name] = _round(sum(window_values) / len(window_values)) if window_values else None
+            result[f'media_{window}_dias'] = averages
+
+        derived.append(result)
+    return derived
@@ -0,0 +1,90 @@
+import os
+import asyncio
+import logging
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Sizing knobs for the blocking work offloaded from the event loop
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "8"))
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
+
+# Gemini calls are slow (10-30 s) and quota bound, so they get their own small
+# pool; storage calls are short and must never queue behind an extraction.
+_extraction_executor = ThreadPoolExecutor(
+    max_workers=EXTRACTION_WORKERS, thread_name_prefix="extraction"
+)
+_storage_executor = ThreadPoolExecutor(
+    max_workers=STORAGE_WORKERS, thread_name_prefix="storage"
+)
+
+# Image preprocessing is CPU bound and would hold the GIL, so it runs in worker
+# processes. They are spawned rather than forked: forking a process with live
+# gRPC channels is unsafe.
+_preprocess_executor = ProcessPoolExecutor(
+    max_workers=PREPROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+)
+
+
+async def _run_in_executor(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the given executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_extraction(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking Gemini extraction call off the event loop.
+
+    Args:
+        func: The blocking callable (e.g. GeminiService.process_inbody_image)
+        *args, **kwargs: Arguments forwarded to the callable
+
+    Returns:
+        The callable's return value
+    """
+    return await _run_in_executor(_extraction_executor, func, *args, **kwargs)
+
+
+async def run_storage(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking storage (Firestore) call off the event loop.
+
+    Args:
+        func: The blocking callable (e.g. FirestoreService.save_measurement)
+        *args, **kwargs: Arguments forwarded to the callable
+
+    Returns:
+        The callable's return value
+    """
+    return await _run_in_executor(_storage_executor, func, *args, **kwargs)
+
+
+def run_in_process_pool(func: Callable, *args) -> Any:
+    """
+    Run a CPU-bound callable in the preprocessing process pool and wait for it.
+
+    Blocks the calling thread, so call it from an extraction worker, never from
+    the event loop. The callable must be a module-level function, and its
+    arguments and result are pickled (pass bytes, not memoryviews).
+
+    Args:
+        func: The callable (e.g. image_preprocessor.preprocess_image)
+        *args: Arguments forwarded to the callable
+
+    Returns:
+        The callable's return value
+    """
+    return _preprocess_executor.submit(func, *args).result()
+
+
+def shutdown_executors() -> None:
+    """Shut down the worker pools, waiting for in-flight work to finish."""
+    logger.info("Shutting down extraction, storage and preprocessing executors")
+    _extraction_executor.shutdown(wait=True)
+    _storage_executor.shutdown(wait=True)
+    _preprocess_executor.shutdown(wait=True)
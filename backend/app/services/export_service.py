@@ -0,0 +1,213 @@
+import io
+import os
+import csv
+import logging
+import typing
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ..schemas.measurement import MeasurementData
+from .storage_backend import MeasurementStore
+
+logger = logging.getLogger(__name__)
+
+# Measurements read from storage (and encoded) per chunk of the export
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+# Export format -> media type
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Server-maintained fields that can be recomputed and are left out of exports
+_EXCLUDED_FIELDS = ('derivados',)
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when an export format needs an optional dependency that is not installed."""
+
+
+def _leaf_type(annotation: Any) -> Any:
+    """Strip Optional[...] from a field annotation."""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    return args[0] if typing.get_origin(annotation) is typing.Union and len(args) == 1 else annotation
+
+
+def _flatten_model(model: type, prefix: Tuple[str, ...] = ()) -> List[Tuple[str, Tuple[str, ...], type]]:
+    columns = []
+    for name, field in model.model_fields.items():
+        if not prefix and name in _EXCLUDED_FIELDS:
+            continue
+        kind = _leaf_type(field.annotation)
+        path = prefix + (name,)
+        if isinstance(kind, type) and issubclass(kind, BaseModel):
+            columns.extend(_flatten_model(kind, path))
+        else:
+            columns.append(('.'.join(path), path, kind))
+    return columns
+
+
+# (column name, path in the document, Python type) for every leaf of MeasurementData
+EXPORT_COLUMNS = _flatten_model(MeasurementData)
+
+
+def _coerce(value: Any, kind: type) -> Any:
+    """Convert a stored value to the column type, or None if it does not fit."""
+    if value is None:
+        return None
+    try:
+        if kind is datetime:
+            return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        if kind is float:
+            return float(value)
+        if kind is int:
+            return int(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _rows(measurements: List[Dict[str, Any]]) -> List[List[Any]]:
+    rows = []
+    for measurement in measurements:
+        row = []
+        for _, path, kind in EXPORT_COLUMNS:
+            value = measurement
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            row.append(_coerce(value, kind))
+        rows.append(row)
+    return rows
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects bytes until they are drained into the response."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailableError("Parquet and Arrow exports require pyarrow") from e
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    types = {datetime: pa.timestamp('us', tz='UTC'), float: pa.float64(), int: pa.int64()}
+    return pa.schema([pa.field(name, types.get(kind, pa.string())) for name, _, kind in EXPORT_COLUMNS])
+
+
+class ExportService:
+    """Streams the measurement history as flat, columnar files."""
+
+    def __init__(self, storage: MeasurementStore, page_size: int = EXPORT_PAGE_SIZE):
+        """
+        Initialize the service.
+
+        Args:
+            storage (MeasurementStore): Where measurements are read from
+            page_size (int): Measurements read and encoded per chunk
+        """
+        self.storage = storage
+        self.page_size = page_size
+
+    def _pages(self, exam_from: Optional[datetime], exam_to: Optional[datetime]) -> Iterator[List[List[Any]]]:
+        cursor, total = None, 0
+        while True:
+            measurements, cursor = self.storage.list_measurements(
+                self.page_size, cursor, exam_from=exam_from, exam_to=exam_to, use_cache=False
+            )
+            total += len(measurements)
+            if measurements:
+                yield _rows(measurements)
+            if cursor is None:
+                logger.info(f"Exported {total} measurements")
+                return
+
+    def export(self, export_format: str, exam_from: Optional[datetime] = None,
+               exam_to: Optional[datetime] = None) -> Iterator[bytes]:
+        """
+        Stream measurements as CSV, Parquet or an Arrow IPC stream.
+
+        Measurements are read one page at a time and each page is encoded and
+        handed out before the next is read (one row group or record batch per
+        page), so memory stays bounded however large the collection is.
+        Nested fields become dotted column names, e.g. composicao_corporal.peso.
+
+        Args:
+            export_format (str): One of EXPORT_FORMATS
+            exam_from (datetime, optional): Earliest exam time to include
+            exam_to (datetime, optional): Latest exam time to include
+
+        Returns:
+            iterator: Chunks of the encoded file; nothing is read until iteration starts
+
+        Raises:
+            ValueError: If the format is unknown
+            ExportUnavailableError: If the format needs pyarrow and it is not installed
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        if export_format == 'csv':
+            return self._export_csv(exam_from, exam_to)
+        return self._export_arrow(_import_pyarrow(), export_format, exam_from, exam_to)
+
+    def _export_csv(self, exam_from, exam_to) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _, _ in EXPORT_COLUMNS])
+        for rows in self._pages(exam_from, exam_to):
+            writer.writerows(
+                [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+            )
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Header only, for an empty export
+            yield buffer.getvalue().encode('utf-8')
+
+    def _export_arrow(self, pa, export_format, exam_from, exam_to) -> Iterator[bytes]:
+        schema = _arrow_schema(pa)
+        sink = _ChunkSink()
+        if export_format == 'parquet':
+            writer = pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+        try:
+            for rows in self._pages(exam_from, exam_to):
+                columns = list(zip(*rows))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from ..utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", ".extraction_cache")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+EXTRACTION_CACHE_MEMORY_ITEMS = int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", "256"))
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extraction results.
+
+    Entries are keyed by the SHA-256 of the file bytes together with the
+    prompt/schema version and model name, so a prompt or model change never
+    serves stale results. An in-memory LRU sits in front of an on-disk store
+    of JSON files with TTL and total-size eviction.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = EXTRACTION_CACHE_DIR,
+        max_bytes: int = EXTRACTION_CACHE_MAX_BYTES,
+        ttl_seconds: float = EXTRACTION_CACHE_TTL_SECONDS,
+        memory_items: int = EXTRACTION_CACHE_MEMORY_ITEMS,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory for the on-disk store
+            max_bytes (int): Maximum total size of the on-disk store. 0 disables it.
+            ttl_seconds (float): Entry lifetime in seconds
+            memory_items (int): Number of entries kept in the in-memory LRU
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_items=memory_items, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+
+        self._disk_bytes = 0
+        if self.max_bytes > 0:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+        logger.info(f"Initialized extraction cache at: {self.cache_dir}")
+
+    @staticmethod
+    def make_key(file_data: Union[bytes, memoryview], prompt_version: str, model_name: str) -> str:
+        """
+        Build the cache key for a file.
+
+        Args:
+            file_data (bytes | memoryview): The raw file contents
+            prompt_version (str): Version of the extraction prompt and schema
+            model_name (str): Name of the model used for extraction
+
+        Returns:
+            str: Hex digest identifying the extraction
+        """
+        digest = hashlib.sha256(file_data).hexdigest()
+        return hashlib.sha256(f"{digest}:{prompt_version}:{model_name}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached extraction result.
+
+        Args:
+            key (str): Key returned by make_key
+
+        Returns:
+            dict: A copy of the cached measurement data, or None on a miss
+        """
+        result = self.memory.get(key)
+        if result is not None:
+            return json.loads(result)
+
+        if self.max_bytes <= 0:
+            return None
+
+        path = self._path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        if time.time() - stat.st_mtime > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            result = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        # Touch the file so size eviction drops the least recently used entries first
+        os.utime(path)
+        self.memory.set(key, result)
+        self.disk_hits += 1
+        return json.loads(result)
+
+    def set(self, key: str, measurement_data: Dict[str, Any]) -> None:
+        """
+        Store an extraction result.
+
+        Args:
+            key (str): Key returned by make_key
+            measurement_data (dict): The validated measurement data
+        """
+        serialized = json.dumps(measurement_data, default=str)
+        self.memory.set(key, serialized)
+
+        if self.max_bytes <= 0:
+            return
+
+        path = self._path(key)
+        temp_path = None
+        try:
+            # A unique temp file per write, so concurrent writers of the same key never share one
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.cache_dir,
+                                             prefix=f"{key}.", suffix=".tmp", delete=False) as f:
+                temp_path = f.name
+                f.write(serialized)
+            with self._lock:
+                previous = path.stat().st_size if path.exists() else 0
+                os.replace(temp_path, path)
+                temp_path = None
+                self._disk_bytes += len(serialized.encode("utf-8")) - previous
+            self._evict()
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {key}: {str(e)}")
+            if temp_path is not None:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    def _remove(self, path: Path) -> None:
+        """Delete a cache file and account for its size."""
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._disk_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used ones until under the size limit."""
+        if self._disk_bytes <= self.max_bytes:
+            return
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, path))
+        for _, path in sorted(entries):
+            if self._disk_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: In-memory LRU stats plus on-disk hits and size
+        """
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,48 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict
+
+# Output contract for the model; passed as the native response schema, not in the prompt text
+SCHEMA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../schemas/json.schema"))
+
+# Kept short on purpose: the field names, types and units live in the response schema
+EXTRACTION_INSTRUCTIONS = (
+    "Extract every measurement visible in this InBody scale report. "
+    "Copy numbers as printed, without units; use null for values not shown. "
+    "Write data_exame as printed on the report."
+)
+
+
+def compact_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce the JSON schema to what the model needs to fill it in.
+
+    Descriptions of objects only restate their field names and number
+    formats only restate the type, so both are dropped; leaf descriptions
+    carry the units and are kept.
+
+    Args:
+        schema (dict): A node of the JSON schema
+
+    Returns:
+        dict: The compacted node
+    """
+    node = {key: value for key, value in schema.items() if key not in ("properties", "format")}
+    if "properties" in schema:
+        node.pop("description", None)
+        node["properties"] = {name: compact_schema(child) for name, child in schema["properties"].items()}
+    return node
+
+
+def _load_schema() -> Dict[str, Any]:
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+RESPONSE_SCHEMA = compact_schema(_load_schema())
+
+# Changes whenever the instructions or the schema do, so cached extractions are never reused across them
+PROMPT_VERSION = hashlib.sha256(
+    (EXTRACTION_INSTRUCTIONS + json.dumps(RESPONSE_SCHEMA, sort_keys=True, separators=(",", ":"))).encode("utf-8")
+).hexdigest()[:12]
@@ -1,12 +1,97 @@
 from google.cloud import firestore
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
 import os
-from datetime import datetime
+import copy
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.lru_cache import LRUCache
+from ..utils.pagination import encode_cursor, decode_cursor
+from .derived_metrics import DERIVED_FIELD, DERIVED_WINDOW, compute_derived
+from .storage_backend import (
+    BATCH_WRITE_LIMIT,
+    DEDUP_MODE,
+    DELETED_RETENTION_DAYS,
+    ORDER_FIELD,
+    PATIENT_FIELD,
+    MeasurementConflictError,
+    MeasurementExistsError,
+    MeasurementNotFoundError,
+    MeasurementStore,
+    build_patient_summary,
+    measurement_key,
+    new_measurement_id,
+    patient_id_of,
+    stamp_exam_timestamp
+)
 
 logger = logging.getLogger(__name__)
 
-class FirestoreService:
+# Read-through cache settings
+FIRESTORE_CACHE_ITEMS = int(os.getenv("FIRESTORE_CACHE_ITEMS", "1024"))
+FIRESTORE_CACHE_LIST_ITEMS = int(os.getenv("FIRESTORE_CACHE_LIST_ITEMS", "32"))
+FIRESTORE_CACHE_TTL_SECONDS = float(os.getenv("FIRESTORE_CACHE_TTL_SECONDS", "30"))
+FIRESTORE_CACHE_LISTEN = os.getenv("FIRESTORE_CACHE_LISTEN", "false").lower() == "true"
+
+# Collection of per-patient summary documents; defaults to "<firestore_collection>_patients"
+FIRESTORE_PATIENTS_COLLECTION = os.getenv("FIRESTORE_PATIENTS_COLLECTION")
+
+# Collection of deleted measurement tombstones; defaults to "<firestore_collection>_deleted"
+FIRESTORE_DELETED_COLLECTION = os.getenv("FIRESTORE_DELETED_COLLECTION")
+
+# Times a patient refresh is redone when a measurement changes while it runs
+_REFRESH_ATTEMPTS = 3
+
+
+def make_etag(update_time) -> str:
+    """Build an ETag from a document's update time."""
+    return f'"{update_time.rfc3339()}"'
+
+
+def parse_etag(etag: str) -> DatetimeWithNanoseconds:
+    """
+    Parse an ETag produced by make_etag.
+    
+    Raises:
+        MeasurementConflictError: If the ETag is not one of ours, so it cannot match
+    """
+    value = etag.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return DatetimeWithNanoseconds.from_rfc3339(value.strip('"'))
+    except ValueError as e:
+        raise MeasurementConflictError(f"ETag {etag} does not match") from e
+
+
+def _position_of(measurement_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[datetime]]:
+    """Where a measurement sits in its patient's history: (patient ID, exam time)."""
+    return patient_id_of(measurement_data), measurement_data.get(ORDER_FIELD)
+
+
+def _field_paths(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested maps into dotted field paths, so update() merges them like set(merge=True)."""
+    fields = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            fields.update(_field_paths(value, f"{path}."))
+        else:
+            fields[path] = value
+    return fields
+
+
+class _PatientChangedError(Exception):
+    """Raised when a measurement changed between a patient refresh's reads and its commit."""
+
+
+class FirestoreService(MeasurementStore):
     """Service for interacting with Firestore database."""
     
     def __init__(self):
@@ -15,40 +100,494 @@ class FirestoreService:
         self.collection_name = os.getenv('firestore_collection')
         self.db = firestore.Client(project=self.project_id)
         self.collection = self.db.collection(self.collection_name)
+        self.patients = self.db.collection(FIRESTORE_PATIENTS_COLLECTION or f"{self.collection_name}_patients")
+        self.deleted = self.db.collection(FIRESTORE_DELETED_COLLECTION or f"{self.collection_name}_deleted")
+        
+        # Read-through caches for single documents and for ordered listings
+        self._doc_cache = LRUCache(max_items=FIRESTORE_CACHE_ITEMS, ttl_seconds=FIRESTORE_CACHE_TTL_SECONDS)
+        self._list_cache = LRUCache(max_items=FIRESTORE_CACHE_LIST_ITEMS, ttl_seconds=FIRESTORE_CACHE_TTL_SECONDS)
+        self._watch = None
+        # Monotonic time of the last check for measurements without exam_timestamp; None once there are none
+        self._exam_timestamps_checked = 0.0
+        # Derived data refreshes after updates and deletes, off the request path and one at a time
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="derived-refresh")
+        if FIRESTORE_CACHE_LISTEN:
+            self.start_cache_listener()
+        
         logger.info(f"Initialized Firestore service with collection: {self.collection_name}")
     
+    def _invalidate(self, doc_id=None):
+        """
+        Drop cache entries affected by a write.
+        
+        Args:
+            doc_id (str, optional): The document that changed. Listings are always dropped.
+        """
+        if doc_id:
+            self._doc_cache.delete(doc_id)
+        self._list_cache.clear()
+    
+    def _listing_order_field(self):
+        """
+        Field unfiltered listings are ordered by.
+        
+        Queries ordered by exam_timestamp leave out documents without it, so
+        until scripts/backfill_exam_timestamps.py has stamped every measurement
+        listings fall back to the creation timestamp. Completion is checked with
+        two count aggregations, at most once per FIRESTORE_CACHE_TTL_SECONDS,
+        and never again once it is done.
+        """
+        if self._exam_timestamps_checked is None:
+            return ORDER_FIELD
+        now = time.monotonic()
+        if self._exam_timestamps_checked and now - self._exam_timestamps_checked < FIRESTORE_CACHE_TTL_SECONDS:
+            return 'timestamp'
+        total = self.collection.count().get()[0][0].value
+        stamped = self.collection.order_by(ORDER_FIELD).count().get()[0][0].value
+        if stamped >= total:
+            self._exam_timestamps_checked = None
+            return ORDER_FIELD
+        logger.warning(f"{total - stamped} measurements have no {ORDER_FIELD}; listing by creation time "
+                       f"until scripts/backfill_exam_timestamps.py has run")
+        self._exam_timestamps_checked = now
+        return 'timestamp'
+    
+    def _patient_query(self, patient_id):
+        """Query one patient's measurements by exam time (composite index on patient ID + exam_timestamp)."""
+        return self.collection.where(PATIENT_FIELD, '==', patient_id).order_by(ORDER_FIELD)
+    
+    @staticmethod
+    def _exam_range(query, exam_from=None, exam_to=None):
+        """Restrict a query to an inclusive exam time range."""
+        if exam_from is not None:
+            query = query.where(ORDER_FIELD, '>=', exam_from)
+        if exam_to is not None:
+            query = query.where(ORDER_FIELD, '<=', exam_to)
+        return query
+    
+    def _patient_summary_ref(self, patient_id):
+        # Patient IDs are free text, so hash them into a valid document ID
+        return self.patients.document(hashlib.sha1(patient_id.encode()).hexdigest())
+    
+    def _record_deletion(self, batch, doc_id):
+        """Add the tombstone of a deleted measurement to a batch; expire_at is meant for a Firestore TTL policy."""
+        now = datetime.now(timezone.utc)
+        batch.set(self.deleted.document(doc_id), {
+            'deleted_at': now,
+            'expire_at': now + timedelta(days=DELETED_RETENTION_DAYS),
+        })
+    
+    def _cached_position(self, doc_id, if_match: Optional[str]):
+        """(patient ID, exam time) of a cached measurement, if the cache holds the version if_match names."""
+        cached = self._doc_cache.get(doc_id)
+        if cached is None or not if_match or cached[1] != if_match:
+            return None
+        return _position_of(cached[0])
+    
+    def _locate_measurements(self, doc_ids, deleted: bool = False):
+        """
+        Find where in their patients' histories measurements are, and were before a write.
+        
+        The current position is read from each document with a field mask.
+        The position a measurement was moved or deleted from is found without
+        reading it: through the measurement whose derived data names it as the
+        previous scan, and the patient summary that names it as the latest.
+        
+        Args:
+            doc_ids (iterable): IDs of measurements that were updated or deleted
+            deleted (bool): The measurements no longer exist, so only their old positions are looked up
+            
+        Returns:
+            list: (patient ID, exam time) positions for _refresh_patients
+        """
+        doc_ids = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id]
+        positions = []
+        if not doc_ids:
+            return positions
+        refs = [] if deleted else [self.collection.document(doc_id) for doc_id in doc_ids]
+        for snapshot in self.db.get_all(refs, field_paths=[PATIENT_FIELD, ORDER_FIELD]) if refs else ():
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                positions.append((patient_id_of(data), data.get(ORDER_FIELD)))
+        for doc_id in doc_ids:
+            successors = self.collection.where(f'{DERIVED_FIELD}.medicao_anterior_id', '==', doc_id)
+            for doc in successors.select([PATIENT_FIELD, ORDER_FIELD]).limit(1).stream():
+                data = doc.to_dict()
+                positions.append((patient_id_of(data), data.get(ORDER_FIELD)))
+            for doc in self.patients.where('latest_measurement_id', '==', doc_id).limit(1).stream():
+                summary = doc.to_dict()
+                positions.append((summary.get('patient_id'), summary.get('latest_exam_timestamp')))
+        return positions
+    
+    def _refresh_patients(self, positions):
+        """
+        Bring derived data and patient summaries up to date around changed measurements.
+        
+        Only the measurements whose derived data can depend on a changed
+        position are read: from DERIVED_WINDOW before the earliest to
+        DERIVED_WINDOW after the latest, plus one on either side. The summary
+        is rebuilt from the latest measurement and a count aggregation, so the
+        cost of a write does not grow with the patient's history.
+        
+        Each patient's rewrites are committed in one batch, each with the
+        update time it was computed from as a precondition; if another write
+        got in between, the refresh is redone from fresh reads.
+        
+        Args:
+            positions (iterable): (patient ID, exam time) pairs where a measurement was
+                written, moved or removed. A None exam time rebuilds the whole history;
+                None patient IDs are ignored.
+            
+        Returns:
+            dict: Update time of each measurement whose derived data was rewritten
+            
+        Raises:
+            Exception: If a patient could not be refreshed. The measurement writes are
+                already committed; the next write for the patient repairs its data.
+        """
+        exam_times = {}
+        for patient_id, exam_time in positions:
+            if patient_id:
+                exam_times.setdefault(patient_id, []).append(exam_time)
+        
+        update_times = {}
+        error = None
+        for patient_id, times in exam_times.items():
+            for attempt in range(_REFRESH_ATTEMPTS):
+                try:
+                    update_times.update(self._refresh_patient(patient_id, times))
+                    break
+                except _PatientChangedError:
+                    if attempt + 1 < _REFRESH_ATTEMPTS:
+                        logger.info(f"Patient {patient_id} changed during refresh, retrying")
+                        continue
+                    logger.error(f"Error refreshing patient {patient_id}: kept changing during refresh")
+                    error = error or MeasurementConflictError(f"Patient {patient_id} changed during refresh")
+                except Exception as e:
+                    logger.error(f"Error refreshing patient {patient_id}: {str(e)}")
+                    error = error or e
+                    break
+        if error is not None:
+            raise error
+        return update_times
+    
+    def _refresh_in_background(self, positions=(), located_ids=(), deleted=False):
+        """
+        Queue a derived data refresh after a committed write; see _refresh_patients.
+        
+        Failures are logged rather than raised: the write itself is committed,
+        and the patient's next write repairs its derived data.
+        
+        Args:
+            positions (list): (patient ID, exam time) pairs known when the write was made
+            located_ids (list): Measurement IDs whose positions are found with _locate_measurements first
+            deleted (bool): Whether located_ids were deleted
+        """
+        def refresh():
+            all_positions = list(positions)
+            try:
+                if located_ids:
+                    all_positions.extend(self._locate_measurements(list(located_ids), deleted=deleted))
+                self._refresh_patients(all_positions)
+            except Exception as e:
+                logger.error(f"Error refreshing derived data in the background: {str(e)}")
+        
+        self._refresh_executor.submit(refresh)
+    
+    def _refresh_patient(self, patient_id, exam_times):
+        """
+        Refresh one patient's derived data and summary; see _refresh_patients.
+        
+        Raises:
+            _PatientChangedError: If a measurement changed after it was read
+        """
+        query = self._patient_query(patient_id)
+        if any(exam_time is None for exam_time in exam_times):
+            first_changed = None
+            docs = list(query.stream())
+        else:
+            first_changed = min(exam_times)
+            lower, upper = first_changed - DERIVED_WINDOW, max(exam_times) + DERIVED_WINDOW
+            docs = list(query.where(ORDER_FIELD, '<', lower).limit_to_last(1).get())
+            docs.extend(self._exam_range(query, lower, upper).stream())
+            docs.extend(query.where(ORDER_FIELD, '>', upper).limit(1).stream())
+        history = []
+        for doc in docs:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            history.append(data)
+        
+        batch = self.db.batch()
+        rewritten = []
+        now = datetime.now(timezone.utc)
+        for doc, data, derived in zip(docs, history, compute_derived(history)):
+            # Earlier measurements are only read as context; their own windows are incomplete
+            if first_changed is not None and data[ORDER_FIELD] < first_changed:
+                continue
+            if data.get(DERIVED_FIELD) != derived:
+                batch.update(doc.reference, {DERIVED_FIELD: derived, 'updated_at': now},
+                             option=self.db.write_option(last_update_time=doc.update_time))
+                rewritten.append(doc.id)
+        
+        latest = query.limit_to_last(1).get()
+        summary_ref = self._patient_summary_ref(patient_id)
+        if latest:
+            measurement = latest[0].to_dict()
+            measurement['id'] = latest[0].id
+            measurement_count = query.count().get()[0][0].value
+            batch.set(summary_ref, build_patient_summary(measurement, measurement_count))
+        else:
+            batch.delete(summary_ref)
+        
+        try:
+            results = batch.commit()
+        except FailedPrecondition as e:
+            raise _PatientChangedError(patient_id) from e
+        update_times = {}
+        for doc_id, result in zip(rewritten, results):
+            update_times[doc_id] = result.update_time
+            self._invalidate(doc_id)
+        return update_times
+    
+    def start_cache_listener(self):
+        """
+        Keep the cache coherent with writes from other workers by listening to collection changes.
+        """
+        def on_snapshot(collection_snapshot, changes, read_time):
+            for change in changes:
+                self._doc_cache.delete(change.document.id)
+            if changes:
+                self._list_cache.clear()
+        
+        self._watch = self.collection.on_snapshot(on_snapshot)
+        logger.info(f"Listening for changes to collection: {self.collection_name}")
+    
+    def stop_cache_listener(self):
+        """Stop the collection change listener, if running."""
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+    
+    def close(self):
+        """Stop the cache listener and wait for queued derived data refreshes."""
+        self.stop_cache_listener()
+        self._refresh_executor.shutdown(wait=True)
+    
+    def cache_stats(self):
+        """
+        Get read-through cache counters.
+        
+        Returns:
+            dict: Hit/miss counters for the document and listing caches
+        """
+        return {
+            "documents": self._doc_cache.stats(),
+            "lists": self._list_cache.stats(),
+            "listening": self._watch is not None,
+        }
+    
     def save_measurement(self, measurement_data, doc_id=None):
         """
         Save measurement data to Firestore.
         
         Args:
             measurement_data (dict): The measurement data to save
-            doc_id (str, optional): The document ID to update. If None, a new document is created.
+            doc_id (str, optional): The document ID to update. If None, a new document is created
+                under the measurement's key (see DEDUP_MODE).
             
         Returns:
             str: The document ID of the saved measurement
+            
+        Raises:
+            MeasurementExistsError: If DEDUP_MODE is 'reject' and the scan is already stored
         """
         try:
             # Add timestamp if not present
             if 'timestamp' not in measurement_data:
                 measurement_data['timestamp'] = datetime.now()
+            # Track changes for incremental sync
+            measurement_data['updated_at'] = datetime.now(timezone.utc)
+            stamp_exam_timestamp(measurement_data)
+            
+            key = None if doc_id else new_measurement_id(measurement_data)
+            if key and DEDUP_MODE == 'reject':
+                # create() fails if the scan is already stored, in the same round trip
+                try:
+                    self.collection.document(key).create(measurement_data)
+                except AlreadyExists as e:
+                    raise MeasurementExistsError(key) from e
+                self._invalidate()
+                self._refresh_patients([_position_of(measurement_data)])
+                logger.info(f"Saved new measurement with ID: {key}")
+                return key
+            # Saving the same scan again merges into the stored document, at the same position
+            moved_id = doc_id
+            doc_id = doc_id or key
             
             if doc_id:
                 # Update existing document
                 doc_ref = self.collection.document(doc_id)
                 doc_ref.set(measurement_data, merge=True)
+                self._invalidate(doc_id)
+                self._refresh_patients([_position_of(measurement_data), *self._locate_measurements([moved_id])])
                 logger.info(f"Updated measurement with ID: {doc_id}")
                 return doc_id
             else:
                 # Add new document to collection
                 doc_ref = self.collection.document()
                 doc_ref.set(measurement_data)
+                self._invalidate()
+                self._refresh_patients([_position_of(measurement_data)])
                 logger.info(f"Saved new measurement with ID: {doc_ref.id}")
                 return doc_ref.id
+        except MeasurementExistsError:
+            raise
         except Exception as e:
             logger.error(f"Error saving measurement: {str(e)}")
             raise
     
+    def save_measurements_batch(self, measurements):
+        """
+        Save many new measurements using Firestore batched writes.
+        
+        Measurements are stored under their keys like save_measurement. In
+        DEDUP_MODE=reject the keys are checked with one batched read per
+        chunk, and duplicates (also within the input) are skipped.
+        
+        Args:
+            measurements (list): Measurement data dictionaries to save
+            
+        Returns:
+            list: The document IDs of the saved measurements, in input order;
+                None for duplicates rejected in DEDUP_MODE=reject
+        """
+        try:
+            doc_ids = []
+            for start in range(0, len(measurements), BATCH_WRITE_LIMIT):
+                chunk = measurements[start:start + BATCH_WRITE_LIMIT]
+                keys = [new_measurement_id(measurement_data) for measurement_data in chunk]
+                taken = set()
+                if DEDUP_MODE == 'reject':
+                    refs = [self.collection.document(key) for key in set(keys) if key]
+                    taken = {snapshot.id for snapshot in self.db.get_all(refs, field_paths=[PATIENT_FIELD])
+                             if snapshot.exists}
+                batch = self.db.batch()
+                chunk_ids = []
+                for measurement_data, key in zip(chunk, keys):
+                    if key in taken:
+                        chunk_ids.append(None)
+                        continue
+                    if 'timestamp' not in measurement_data:
+                        measurement_data['timestamp'] = datetime.now()
+                    measurement_data['updated_at'] = datetime.now(timezone.utc)
+                    stamp_exam_timestamp(measurement_data)
+                    if key:
+                        doc_ref = self.collection.document(key)
+                        batch.set(doc_ref, measurement_data, merge=True)
+                        if DEDUP_MODE == 'reject':
+                            taken.add(key)
+                    else:
+                        doc_ref = self.collection.document()
+                        batch.set(doc_ref, measurement_data)
+                    chunk_ids.append(doc_ref.id)
+                batch.commit()
+                self._invalidate()
+                for doc_id in chunk_ids:
+                    if doc_id:
+                        self._doc_cache.delete(doc_id)
+                doc_ids.extend(chunk_ids)
+            self._refresh_patients(
+                _position_of(measurement_data)
+                for measurement_data, doc_id in zip(measurements, doc_ids) if doc_id
+            )
+            logger.info(f"Saved {sum(1 for doc_id in doc_ids if doc_id)} measurements in batches")
+            return doc_ids
+        except Exception as e:
+            logger.error(f"Error saving measurement batch: {str(e)}")
+            raise
+    
+    def upsert_measurements(self, measurements):
+        """
+        Save many measurements with batched writes, deduplicating on the measurement key.
+        
+        Each measurement is stored under measurement_key, like uploads, so an
+        imported scan and an uploaded copy of it end up in the same document.
+        Exam dates without a time of day are keyed on the date, so importing
+        the same export again updates its records instead of duplicating them.
+        Which keys already exist is read with one batched, field-masked read
+        per chunk; a measurement matching one is merged into that document.
+        Later duplicates within the input are merged into the earlier one.
+        
+        Args:
+            measurements (list): Measurement data dictionaries, each with a patient ID and exam date
+            
+        Returns:
+            list: (document ID, whether it was created) for each measurement, in input order
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            results = []
+            seen = set()
+            for start in range(0, len(measurements), BATCH_WRITE_LIMIT):
+                chunk = measurements[start:start + BATCH_WRITE_LIMIT]
+                keys = [measurement_key(measurement_data, allow_date_only=True) for measurement_data in chunk]
+                refs = [self.collection.document(key) for key in set(keys) if key and key not in seen]
+                existing = {snapshot.id for snapshot in self.db.get_all(refs, field_paths=[PATIENT_FIELD])
+                            if snapshot.exists} if refs else set()
+                batch = self.db.batch()
+                for measurement_data, key in zip(chunk, keys):
+                    measurement_data['updated_at'] = now
+                    stamp_exam_timestamp(measurement_data)
+                    if key in existing or key in seen:
+                        batch.set(self.collection.document(key), measurement_data, merge=True)
+                        results.append((key, False))
+                    else:
+                        if 'timestamp' not in measurement_data:
+                            measurement_data['timestamp'] = datetime.now()
+                        doc_ref = self.collection.document(key) if key else self.collection.document()
+                        batch.set(doc_ref, measurement_data)
+                        if key:
+                            seen.add(key)
+                        results.append((doc_ref.id, True))
+                batch.commit()
+                self._invalidate()
+            for doc_id, created in results:
+                if not created:
+                    self._doc_cache.delete(doc_id)
+            self._refresh_patients(_position_of(measurement_data) for measurement_data in measurements)
+            logger.info(f"Upserted {len(results)} measurements in batches")
+            return results
+        except Exception as e:
+            logger.error(f"Error upserting measurements: {str(e)}")
+            raise
+    
+    def consolidate_measurements(self, doc_id, measurement_data, duplicate_ids):
+        """
+        Replace duplicates with one measurement in a single batched write.
+        
+        Args:
+            doc_id (str): The document ID to store the measurement under
+            measurement_data (dict): The consolidated measurement
+            duplicate_ids (list): Document IDs to delete
+        """
+        try:
+            measurement_data['updated_at'] = datetime.now(timezone.utc)
+            batch = self.db.batch()
+            batch.set(self.collection.document(doc_id), measurement_data)
+            for duplicate_id in duplicate_ids:
+                batch.delete(self.collection.document(duplicate_id))
+                self._record_deletion(batch, duplicate_id)
+            batch.commit()
+            for changed_id in [doc_id, *duplicate_ids]:
+                self._invalidate(changed_id)
+            self._refresh_patients([_position_of(measurement_data),
+                                    *self._locate_measurements([doc_id]),
+                                    *self._locate_measurements(duplicate_ids, deleted=True)])
+            logger.info(f"Consolidated {len(duplicate_ids)} duplicates into measurement {doc_id}")
+        except Exception as e:
+            logger.error(f"Error consolidating measurement {doc_id}: {str(e)}")
+            raise
+    
     def get_all_measurements(self):
         """
         Get all measurements, ordered by date.
@@ -57,8 +596,12 @@ class FirestoreService:
             list: List of measurement dictionaries
         """
         try:
+            cached = self._list_cache.get(('all',))
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
             # Get all documents ordered by date
-            query = self.collection.order_by('informacoes_basicas.data_exame')
+            query = self.collection.order_by(self._listing_order_field())
             docs = query.stream()
             
             # Convert to list of dictionaries with ID
@@ -68,52 +611,356 @@ class FirestoreService:
                 data['id'] = doc.id
                 measurements.append(data)
                 
+            self._list_cache.set(('all',), copy.deepcopy(measurements))
             logger.info(f"Retrieved {len(measurements)} measurements")
             return measurements
         except Exception as e:
             logger.error(f"Error getting measurements: {str(e)}")
             raise
     
-    def get_measurement(self, doc_id):
+    def list_measurements(self, page_size: int, cursor: Optional[str] = None,
+                          since: Optional[datetime] = None, exam_from: Optional[datetime] = None,
+                          exam_to: Optional[datetime] = None, use_cache: bool = True):
         """
-        Get a specific measurement by ID.
+        Get one page of measurements.
+        
+        Without `since`, measurements are ordered by exam time, optionally
+        restricted to an exam time range. With `since`, only documents changed
+        after that time are returned, ordered by change time, so clients can
+        sync incrementally.
+        
+        Args:
+            page_size (int): Maximum number of measurements to return
+            cursor (str, optional): Cursor returned with the previous page
+            since (datetime, optional): Only return documents updated after this time
+            exam_from (datetime, optional): Earliest exam time to return
+            exam_to (datetime, optional): Latest exam time to return
+            use_cache (bool): Serve and keep the page in the listing cache; bulk readers
+                such as exports pass False so every page is not copied into it
+            
+        Returns:
+            tuple: (list of measurement dictionaries, next cursor or None if this is the last page)
+            
+        Raises:
+            ValueError: If the cursor is invalid or an exam range is combined with `since`
+        """
+        if since is not None and (exam_from is not None or exam_to is not None):
+            raise ValueError("exam_from/exam_to cannot be combined with since")
+        try:
+            cache_key = ('page', page_size, cursor) + tuple(
+                value.isoformat() if value else None for value in (since, exam_from, exam_to)
+            )
+            cached = self._list_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
+            if since is not None:
+                order_field = 'updated_at'
+                query = self.collection.where('updated_at', '>', since)
+            elif exam_from is None and exam_to is None:
+                order_field = self._listing_order_field()
+                query = self.collection
+            else:
+                order_field = ORDER_FIELD
+                query = self._exam_range(self.collection, exam_from, exam_to)
+            # Order by document ID as well so the cursor is unique
+            query = query.order_by(order_field).order_by(firestore.FieldPath.document_id())
+            
+            if cursor:
+                value, last_id = decode_cursor(cursor)
+                query = query.start_after({
+                    order_field: value,
+                    '__name__': self.collection.document(last_id),
+                })
+            
+            # Fetch one extra document to know whether there is a next page
+            docs = list(query.limit(page_size + 1).stream())
+            
+            measurements = []
+            for doc in docs[:page_size]:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                measurements.append(data)
+            
+            next_cursor = None
+            if len(docs) > page_size:
+                last = docs[page_size - 1]
+                next_cursor = encode_cursor(last.get(order_field), last.id)
+            
+            if use_cache:
+                self._list_cache.set(cache_key, copy.deepcopy((measurements, next_cursor)))
+            logger.info(f"Retrieved page of {len(measurements)} measurements")
+            return measurements, next_cursor
+        except Exception as e:
+            logger.error(f"Error listing measurements: {str(e)}")
+            raise
+    
+    def get_patient_measurements(self, patient_id, exam_from: Optional[datetime] = None,
+                                 exam_to: Optional[datetime] = None):
+        """
+        Get one patient's measurements, ordered by exam time.
+        
+        Args:
+            patient_id (str): The patient ID (informacoes_basicas.id)
+            exam_from (datetime, optional): Earliest exam time to return
+            exam_to (datetime, optional): Latest exam time to return
+            
+        Returns:
+            list: List of measurement dictionaries, empty if the patient is unknown
+        """
+        try:
+            cache_key = ('patient', patient_id) + tuple(
+                value.isoformat() if value else None for value in (exam_from, exam_to)
+            )
+            cached = self._list_cache.get(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
+            measurements = []
+            for doc in self._exam_range(self._patient_query(patient_id), exam_from, exam_to).stream():
+                data = doc.to_dict()
+                data['id'] = doc.id
+                measurements.append(data)
+            
+            self._list_cache.set(cache_key, copy.deepcopy(measurements))
+            logger.info(f"Retrieved {len(measurements)} measurements for patient {patient_id}")
+            return measurements
+        except Exception as e:
+            logger.error(f"Error getting measurements for patient {patient_id}: {str(e)}")
+            raise
+    
+    def list_patients(self):
+        """
+        Get every patient with a summary of their latest measurement.
+        
+        Reads the summary documents maintained on write, one per patient.
+        
+        Returns:
+            list: Patient summaries ordered by patient ID
+        """
+        try:
+            cached = self._list_cache.get(('patients',))
+            if cached is not None:
+                return copy.deepcopy(cached)
+            
+            patients = [doc.to_dict() for doc in self.patients.order_by('patient_id').stream()]
+            
+            self._list_cache.set(('patients',), copy.deepcopy(patients))
+            logger.info(f"Retrieved {len(patients)} patients")
+            return patients
+        except Exception as e:
+            logger.error(f"Error listing patients: {str(e)}")
+            raise
+    
+    def list_deleted_ids(self, since: datetime):
+        """
+        Get the IDs of measurements deleted after a time, for incremental sync.
+        
+        Args:
+            since (datetime): Only return deletions after this time
+            
+        Returns:
+            list: Measurement IDs, oldest deletion first
+        """
+        try:
+            query = self.deleted.where('deleted_at', '>', since).order_by('deleted_at')
+            return [doc.id for doc in query.select(['deleted_at']).stream()]
+        except Exception as e:
+            logger.error(f"Error listing deleted measurements: {str(e)}")
+            raise
+    
+    def backfill_exam_timestamps(self, start_after: Optional[str] = None, limit: int = BATCH_WRITE_LIMIT):
+        """
+        Derive exam_timestamp for one batch of existing measurements.
+        
+        Documents are scanned in ID order with a field mask and the changed
+        ones are written in a single batch, so a stopped run can resume from
+        the last ID returned.
+        
+        Args:
+            start_after (str, optional): Last document ID handled by the previous batch
+            limit (int): Number of documents to scan (at most BATCH_WRITE_LIMIT)
+            
+        Returns:
+            tuple: (documents updated, last document ID scanned or None when there are no more)
+        """
+        try:
+            query = self.collection.select(
+                [ORDER_FIELD, PATIENT_FIELD, 'informacoes_basicas.data_exame', 'timestamp']
+            ).order_by(firestore.FieldPath.document_id())
+            if start_after:
+                query = query.start_after({'__name__': self.collection.document(start_after)})
+            docs = list(query.limit(min(limit, BATCH_WRITE_LIMIT)).stream())
+            if not docs:
+                return 0, None
+            
+            batch = self.db.batch()
+            positions = []
+            updated = 0
+            for doc in docs:
+                data = doc.to_dict()
+                current = data.get(ORDER_FIELD)
+                stamp_exam_timestamp(data)
+                if data.get(ORDER_FIELD) is not None and data.get(ORDER_FIELD) != current:
+                    batch.update(doc.reference, {
+                        ORDER_FIELD: data[ORDER_FIELD],
+                        'updated_at': datetime.now(timezone.utc),
+                    })
+                    updated += 1
+                    # Measurements without exam_timestamp were not part of any history yet
+                    positions.append(_position_of(data))
+                    if current is not None:
+                        positions.append((patient_id_of(data), current))
+            if positions:
+                batch.commit()
+                self._invalidate()
+                # Ordering may have changed, which can change each patient's latest measurement
+                self._refresh_patients(positions)
+            logger.info(f"Backfilled exam_timestamp on {updated} of {len(docs)} measurements")
+            return updated, docs[-1].id
+        except Exception as e:
+            logger.error(f"Error backfilling exam timestamps: {str(e)}")
+            raise
+    
+    def get_measurement_with_etag(self, doc_id) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Get a specific measurement by ID together with its version.
         
         Args:
             doc_id (str): The document ID
             
         Returns:
-            dict: The measurement data or None if not found
+            tuple: (measurement data, ETag), or (None, None) if not found
         """
         try:
+            cached = self._doc_cache.get(doc_id)
+            if cached is not None:
+                data, etag = cached
+                return copy.deepcopy(data), etag
+            
             doc_ref = self.collection.document(doc_id)
             doc = doc_ref.get()
             
             if doc.exists:
                 data = doc.to_dict()
                 data['id'] = doc.id
-                return data
+                etag = make_etag(doc.update_time)
+                self._doc_cache.set(doc_id, (copy.deepcopy(data), etag))
+                return data, etag
             else:
                 logger.warning(f"Measurement with ID {doc_id} not found")
-                return None
+                return None, None
         except Exception as e:
             logger.error(f"Error getting measurement {doc_id}: {str(e)}")
             raise
     
-    def delete_measurement(self, doc_id):
+    def update_measurement(self, doc_id, measurement_data, if_match: Optional[str] = None) -> str:
+        """
+        Update an existing measurement in a single write.
+        
+        The existence check (and the version check, if given) is a precondition
+        of the write itself, so there is no separate read and no race window.
+        Nested fields are merged like save_measurement does. The write is the
+        only round trip: derived data and the patient summary are refreshed in
+        the background afterwards (see _refresh_in_background), so a failed
+        refresh never fails the committed update. When the cache holds the
+        version named by if_match, the positions to refresh come from it and
+        the update; otherwise the refresh locates them first.
+        
+        Args:
+            doc_id (str): The document ID
+            measurement_data (dict): The fields to update
+            if_match (str, optional): ETag the stored document must still have
+            
+        Returns:
+            str: The ETag of the write; the background refresh gives the document
+                a newer one if it rewrites its derived data
+            
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
+        """
+        try:
+            measurement_data['updated_at'] = datetime.now(timezone.utc)
+            stamp_exam_timestamp(measurement_data, partial=True)
+            option = self.db.write_option(last_update_time=parse_etag(if_match)) if if_match else None
+            # Where the measurement was; the write's precondition guarantees it is still there
+            previous = self._cached_position(doc_id, if_match)
+            doc_ref = self.collection.document(doc_id)
+            try:
+                # update() always requires the document to exist
+                result = doc_ref.update(_field_paths(measurement_data), option=option)
+            except NotFound as e:
+                raise MeasurementNotFoundError(f"Measurement with ID {doc_id} not found") from e
+            except FailedPrecondition as e:
+                raise MeasurementConflictError(f"Measurement {doc_id} was modified by another request") from e
+            finally:
+                self._invalidate(doc_id)
+            # Derived data has to follow the new values, and the old position if the measurement moved
+            if previous is not None:
+                patient_id, exam_time = _position_of(measurement_data)
+                self._refresh_in_background([previous, (patient_id or previous[0], exam_time or previous[1])])
+            else:
+                self._refresh_in_background(located_ids=[doc_id])
+            logger.info(f"Updated measurement with ID: {doc_id}")
+            return make_etag(result.update_time)
+        except (MeasurementNotFoundError, MeasurementConflictError):
+            raise
+        except Exception as e:
+            logger.error(f"Error updating measurement {doc_id}: {str(e)}")
+            raise
+    
+    def delete_measurement(self, doc_id, if_match: Optional[str] = None):
         """
         Delete a measurement by ID.
         
+        The existence check (and the version check, if given) is a precondition
+        of the delete itself, so the delete is the only round trip; derived
+        data and the patient summary are refreshed in the background
+        afterwards (see _refresh_in_background). The position it leaves comes
+        from the cache when it holds the version named by if_match, and
+        otherwise from its neighbours afterwards (see _locate_measurements),
+        never from a read that could race the delete.
+        
         Args:
             doc_id (str): The document ID
+            if_match (str, optional): ETag the stored document must still have
             
         Returns:
             bool: True if deleted successfully
+            
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
         """
         try:
-            doc_ref = self.collection.document(doc_id)
-            doc_ref.delete()
+            if if_match:
+                option = self.db.write_option(last_update_time=parse_etag(if_match))
+            else:
+                option = self.db.write_option(exists=True)
+            previous = self._cached_position(doc_id, if_match)
+            # The tombstone is committed with the delete, under the same precondition
+            batch = self.db.batch()
+            batch.delete(self.collection.document(doc_id), option=option)
+            self._record_deletion(batch, doc_id)
+            try:
+                batch.commit()
+            except NotFound as e:
+                raise MeasurementNotFoundError(f"Measurement with ID {doc_id} not found") from e
+            except FailedPrecondition as e:
+                if not if_match:
+                    raise MeasurementNotFoundError(f"Measurement with ID {doc_id} not found") from e
+                raise MeasurementConflictError(f"Measurement {doc_id} was modified or deleted by another request") from e
+            finally:
+                self._invalidate(doc_id)
+            if previous is not None:
+                self._refresh_in_background([previous])
+            else:
+                self._refresh_in_background(located_ids=[doc_id], deleted=True)
             logger.info(f"Deleted measurement with ID: {doc_id}")
             return True
+        except (MeasurementNotFoundError, MeasurementConflictError):
+            raise
         except Exception as e:
             logger.error(f"Error deleting measurement {doc_id}: {str(e)}")
             raise
@@ -1,7 +1,11 @@
 import os
+import time
 import logging
-from typing import Union, List, Any
-from google.api_core.exceptions import ResourceExhausted
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, Union, List, Any, Optional
+from google.api_core.exceptions import ClientError, ResourceExhausted, ServerError
 
 import vertexai
 from vertexai.generative_models import (
@@ -17,20 +21,75 @@ from vertexai.preview.vision_models import (
 )
 
 # Import tenacity for retry logic
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from .region_router import RegionRouter
+from .rate_limiter import RegionRateLimiter, RateLimitTimeout, GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+from ..utils.file_utils import detect_mime_type
+
+# Warm-up of the per-region model handles at startup
+GEMINI_WARMUP = os.getenv("GEMINI_WARMUP", "true").lower() == "true"
+GEMINI_WARMUP_PING = os.getenv("GEMINI_WARMUP_PING", "false").lower() == "true"
+
+# Hedged requests: fire the next region if the current one is slower than the latency percentile
+GEMINI_HEDGING = os.getenv("GEMINI_HEDGING", "false").lower() == "true"
+GEMINI_HEDGE_DELAY_SECONDS = float(os.getenv("GEMINI_HEDGE_DELAY_SECONDS", "15"))
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+GEMINI_REGION_MAX_INFLIGHT = int(os.getenv("GEMINI_REGION_MAX_INFLIGHT", "8"))
+
+# Output tokens assumed per request when charging the tokens-per-minute budget
+GEMINI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "1024"))
+
+# Approximate input token cost of one image part
+_IMAGE_TOKENS = 258
+
+# Number of recent successful latencies used to estimate the hedge deadline
+_LATENCY_WINDOW = 200
+_LATENCY_MIN_SAMPLES = 20
+
+
+class RegionBusyError(Exception):
+    """Raised when a region cannot take another request (in-flight limit or circuit breaker)."""
+
+
+def is_region_error(error: Exception) -> bool:
+    """
+    Tell whether an error reflects on the region that raised it.
+
+    Server errors (ServiceUnavailable, InternalServerError, DeadlineExceeded,
+    ...), quota errors and dropped connections count against a region's health;
+    anything else is about the request and leaves the circuit breaker alone.
+    """
+    return isinstance(error, (ServerError, ResourceExhausted, ConnectionError))
+
+
+def is_request_error(error: Exception) -> bool:
+    """
+    Tell whether the request itself was rejected (a 4xx other than quota, e.g. InvalidArgument for a corrupt image).
+
+    Such a request fails the same way in every region, so it is neither
+    retried nor sent to another region.
+    """
+    return isinstance(error, ClientError) and not isinstance(error, ResourceExhausted)
+
 
 class GeminiRegionClient:
     """
     A client for interacting with Gemini API with region fallback capabilities.
     """
     
-    def __init__(self, project_id: str = None, logger: logging.Logger = None):
+    def __init__(self, project_id: str = None, logger: logging.Logger = None,
+                 model_factory: Callable[[str], Any] = None,
+                 clock: Callable[[], float] = time.monotonic):
         """
         Initialize the GeminiRegionClient.
         
         Args:
             project_id (str, optional): Google Cloud Project ID. If None, will try to get from environment.
             logger (logging.Logger, optional): Custom logger instance. If None, will create a new one.
+            model_factory (callable, optional): Builds the model handle for a region. Defaults to a
+                Vertex AI GenerativeModel; tests can pass a fake backend instead.
+            clock (callable, optional): Monotonic time source for routing, rate limits and latencies
         """
         self.project_id = project_id or os.environ.get("GCP_PROJECT")
         if not self.project_id:
@@ -38,6 +97,9 @@ class GeminiRegionClient:
             
         self.logger = logger or logging.getLogger(__name__)
         
+        # Gemini model used for all requests
+        self.model_name = "gemini-2.0-flash-001"
+        
         # List of regions to try
         self.regions = [
             "us-central1",
@@ -64,16 +126,316 @@ class GeminiRegionClient:
             response_mime_type="application/json",
             response_schema={"type":"OBJECT","properties":{"response":{"type":"STRING"}}},
         )
+        
+        # Region-keyed pool of model handles, created once and reused across requests
+        self._model_factory = model_factory or self._create_model
+        self._models: Dict[str, GenerativeModel] = {}
+        self._models_lock = threading.Lock()
+        
+        # Health-based routing and circuit breakers
+        self.clock = clock
+        self.router = RegionRouter(self.regions, clock=clock)
+        
+        # Client-side request and token budgets per region
+        self.rate_limiter = RegionRateLimiter(self.regions, clock=clock)
+        self.rate_limit_max_wait = GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+        
+        # Hedging and per-region in-flight limits
+        self.hedging = GEMINI_HEDGING
+        self.hedge_delay_seconds = GEMINI_HEDGE_DELAY_SECONDS
+        self.hedge_percentile = GEMINI_HEDGE_PERCENTILE
+        self._inflight = {
+            region: threading.BoundedSemaphore(GEMINI_REGION_MAX_INFLIGHT) for region in self.regions
+        }
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._latencies_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=len(self.regions) * GEMINI_REGION_MAX_INFLIGHT,
+            thread_name_prefix="gemini-hedge"
+        )
 
     def _initialize_region(self, region: str) -> None:
         """Initialize Vertex AI with the specified region."""
         vertexai.init(project=self.project_id, location=region)
         
-    def _get_model(self) -> GenerativeModel:
-        """Get the Gemini model instance."""
-        return GenerativeModel("gemini-2.0-flash-001")
+    def _create_model(self, region: str) -> GenerativeModel:
+        """Build a Vertex AI model handle bound to a region."""
+        # vertexai.init mutates global state, so callers serialise handle creation
+        self._initialize_region(region)
+        return GenerativeModel(self.model_name)
+        
+    def _get_model(self, region: str) -> GenerativeModel:
+        """
+        Get the pooled Gemini model handle for a region, creating it on first use.
+        
+        A GenerativeModel captures the location configured when it is built and
+        lazily creates its own prediction client, so each pooled handle keeps a
+        persistent transport to its region.
+        
+        Args:
+            region: The Vertex AI region
+            
+        Returns:
+            GenerativeModel: The model handle bound to the region
+        """
+        model = self._models.get(region)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(region)
+                if model is None:
+                    model = self._model_factory(region)
+                    self._models[region] = model
+        return model
+
+    def warm_up(self, regions: Optional[List[str]] = None, ping: bool = False) -> None:
+        """
+        Pre-create model handles and their transports so the first request does not pay for them.
+        
+        Args:
+            regions: Regions to warm up. Defaults to all configured regions.
+            ping: If True, also send a count_tokens request to complete the TLS handshake.
+        """
+        for region in regions or self.regions:
+            try:
+                model = self._get_model(region)
+                # Touch the lazily created prediction client to open its channel
+                getattr(model, "_prediction_client", None)
+                if ping:
+                    model.count_tokens("ping")
+                self.logger.info(f"Warmed up Gemini model handle for region {region}")
+            except Exception as e:
+                self.logger.warning(f"Could not warm up region {region}: {str(e)}")
+
+    def hedge_delay(self) -> float:
+        """
+        Get the current hedge deadline.
+        
+        Uses the configured percentile of recent successful latencies once enough
+        samples are available, and the configured fixed delay before that.
+        
+        Returns:
+            float: Seconds to wait for a region before firing the next one
+        """
+        with self._latencies_lock:
+            samples = sorted(self._latencies)
+        if len(samples) < _LATENCY_MIN_SAMPLES:
+            return self.hedge_delay_seconds
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+
+    def _prepare_prompt(self, prompt: Union[str, List[Union[str, Part]]]) -> Union[str, List[Union[str, Part]]]:
+        """Wrap raw image bytes of a multimodal prompt in a Part."""
+        if isinstance(prompt, list) and len(prompt) == 2:
+            image_content, text_prompt = prompt
+            if not isinstance(image_content, Part):
+                image_content = Part.from_data(image_content, mime_type=detect_mime_type(image_content))
+            return [image_content, text_prompt]
+        return prompt
+
+    def _estimate_tokens(self, prompt) -> int:
+        """Roughly estimate the tokens a request will use, for the tokens-per-minute budget."""
+        parts = prompt if isinstance(prompt, list) else [prompt]
+        tokens = GEMINI_EXPECTED_OUTPUT_TOKENS
+        for part in parts:
+            tokens += len(part) // 4 if isinstance(part, str) else _IMAGE_TOKENS
+        return tokens
+
+    def _call_region(self, region: str, prompt, gen_config: GenerationConfig,
+                     max_wait: Optional[float] = None, **kwargs) -> str:
+        """
+        Send a single request to one region, respecting its rate limit, in-flight
+        limit and circuit breaker, and record the outcome for routing.
+        
+        Args:
+            max_wait: Maximum seconds to wait for the region's rate limit budget;
+                defaults to rate_limit_max_wait
+        
+        Raises:
+            RateLimitTimeout: If the region's budget did not free up in time
+            RegionBusyError: If the region is at its in-flight limit or its breaker is open
+        """
+        tokens = self._estimate_tokens(prompt)
+        self.rate_limiter.acquire(region, tokens, timeout=self.rate_limit_max_wait if max_wait is None else max_wait)
+        
+        semaphore = self._inflight[region]
+        if not semaphore.acquire(blocking=False):
+            # Nothing was sent, so the budget goes back to the next caller
+            self.rate_limiter.refund(region, tokens)
+            raise RegionBusyError(f"Region {region} has too many requests in flight")
+        try:
+            if not self.router.begin(region):
+                self.rate_limiter.refund(region, tokens)
+                raise RegionBusyError(f"Region {region} circuit is half-open with a trial in flight")
+            start = self.clock()
+            try:
+                model = self._get_model(region)
+                response = model.generate_content(
+                    prompt,
+                    generation_config=gen_config,
+                    safety_settings=self.safety_settings,
+                    **kwargs
+                )
+                text = response.text
+            except Exception as e:
+                self._record_error(region, e)
+                raise
+            latency = self.clock() - start
+            self.router.record_success(region, latency)
+            with self._latencies_lock:
+                self._latencies.append(latency)
+            return text
+        finally:
+            semaphore.release()
+
+    def _record_error(self, region: str, error: Exception) -> None:
+        """Record a failed attempt against the region, unless the request itself was at fault."""
+        if not is_region_error(error):
+            self.router.release(region)
+            return
+        quota_error = isinstance(error, ResourceExhausted)
+        if quota_error:
+            # Back off on this region through the limiter instead of hammering it
+            self.rate_limiter.penalize(region)
+        self.router.record_failure(region, error, quota_error=quota_error)
+
+    def _stream_region(self, region: str, prompt, gen_config: GenerationConfig, **kwargs) -> Iterator[str]:
+        """
+        Stream a single request from one region, under the same limits as _call_region.
+        
+        The in-flight slot is held until the stream is exhausted or closed, and
+        the outcome is recorded for routing once the stream ends.
+        
+        Raises:
+            RateLimitTimeout: If the region's budget did not free up in time
+            RegionBusyError: If the region is at its in-flight limit or its breaker is open
+        """
+        tokens = self._estimate_tokens(prompt)
+        self.rate_limiter.acquire(region, tokens, timeout=self.rate_limit_max_wait)
+        
+        semaphore = self._inflight[region]
+        if not semaphore.acquire(blocking=False):
+            # Nothing was sent, so the budget goes back to the next caller
+            self.rate_limiter.refund(region, tokens)
+            raise RegionBusyError(f"Region {region} has too many requests in flight")
+        try:
+            if not self.router.begin(region):
+                self.rate_limiter.refund(region, tokens)
+                raise RegionBusyError(f"Region {region} circuit is half-open with a trial in flight")
+            start = self.clock()
+            try:
+                model = self._get_model(region)
+                responses = model.generate_content(
+                    prompt,
+                    generation_config=gen_config,
+                    safety_settings=self.safety_settings,
+                    stream=True,
+                    **kwargs
+                )
+                for response in responses:
+                    yield response.text
+            except GeneratorExit:
+                # The consumer went away mid-stream: no outcome for the region either way
+                self.router.release(region)
+                raise
+            except Exception as e:
+                self._record_error(region, e)
+                raise
+            latency = self.clock() - start
+            self.router.record_success(region, latency)
+            with self._latencies_lock:
+                self._latencies.append(latency)
+        finally:
+            semaphore.release()
+
+    def _log_region_error(self, region: str, error: Exception) -> None:
+        """Log a failed region attempt."""
+        if isinstance(error, ResourceExhausted):
+            self.logger.warning(f"Region {region} exhausted. Trying next region...")
+        elif isinstance(error, RegionBusyError):
+            self.logger.warning(f"Region {region} busy ({str(error)}). Trying next region...")
+        elif isinstance(error, RateLimitTimeout):
+            self.logger.warning(f"Region {region} out of rate limit budget. Trying next region...")
+        else:
+            self.logger.warning(f"Unexpected error with region {region}: {str(error)}")
 
-    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3))
+    def _generate_serial(self, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """Try each region in turn, healthiest first, until one succeeds."""
+        last_error = None
+        
+        for region in self.router.ordered_regions():
+            try:
+                return self._call_region(region, prompt, gen_config, **kwargs)
+            except Exception as e:
+                if is_request_error(e):
+                    raise
+                self._log_region_error(region, e)
+                last_error = e
+        
+        raise Exception(f"All regions failed. Last error: {str(last_error)}") from last_error
+
+    def _generate_hedged(self, prompt, gen_config: GenerationConfig, **kwargs) -> str:
+        """
+        Race regions: start the next region when the current ones miss the hedge deadline
+        or fail, and return the first successful response.
+        
+        An attempt waits for its region's rate limit budget for at most the hedge
+        deadline, so a region without budget fails over instead of sitting in the
+        limiter while the race goes on. Requests that lose the race are cancelled
+        if they have not started yet; a request already sent cannot be cancelled,
+        so it runs to completion in the background, keeping its in-flight slot and
+        the quota it was charged, and its result is discarded.
+        """
+        remaining = iter(self.router.ordered_regions())
+        pending = {}
+        last_error = None
+        
+        def launch_next() -> bool:
+            region = next(remaining, None)
+            if region is None:
+                return False
+            max_wait = min(self.rate_limit_max_wait, self.hedge_delay())
+            future = self._hedge_executor.submit(
+                self._call_region, region, prompt, gen_config, max_wait=max_wait, **kwargs
+            )
+            pending[future] = region
+            return True
+        
+        launch_next()
+        exhausted = False
+        while pending:
+            timeout = None if exhausted else self.hedge_delay()
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                # Deadline missed: hedge with the next region in parallel
+                self.logger.info(f"Hedging request after {timeout:.1f}s")
+                exhausted = not launch_next()
+                continue
+            
+            for future in done:
+                region = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if is_request_error(e):
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    self._log_region_error(region, e)
+                    last_error = e
+                    continue
+                for other in pending:
+                    other.cancel()
+                return result
+            
+            # Every finished attempt failed; move on to the next region right away
+            if not exhausted:
+                exhausted = not launch_next()
+        
+        raise Exception(f"All regions failed. Last error: {str(last_error)}") from last_error
+
+    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3),
+           retry=retry_if_exception(lambda e: not is_request_error(e)))
     def generate_content(self, 
                         prompt: Union[str, List[Union[str, Part]]], 
                         response_mime_type: str = None,
@@ -81,6 +443,9 @@ class GeminiRegionClient:
         """
         Generate content using Gemini model with region fallback.
         
+        In hedged mode, the next region is fired in parallel whenever the current
+        attempts have not answered within the hedge deadline.
+        
         Args:
             prompt: The input prompt (string or list of string/Part for multimodal)
             response_mime_type: Optional MIME type for the response
@@ -90,44 +455,62 @@ class GeminiRegionClient:
             str: Generated content
             
         Raises:
+            ClientError: If the request was rejected (e.g. InvalidArgument); not retried
             Exception: If all regions fail
         """
+        # Prepare generation config once; it is shared by every region attempt
+        gen_config = kwargs.pop('generation_config', self.default_generation_config)
+        if response_mime_type:
+            gen_config = GenerationConfig(
+                **gen_config.to_dict(),
+                response_mime_type=response_mime_type
+            )
+        
+        # Process multimodal input if needed
+        prompt = self._prepare_prompt(prompt)
+        
+        if self.hedging:
+            return self._generate_hedged(prompt, gen_config, **kwargs)
+        return self._generate_serial(prompt, gen_config, **kwargs)
+
+    def generate_content_stream(self,
+                                prompt: Union[str, List[Union[str, Part]]],
+                                **kwargs) -> Iterator[str]:
+        """
+        Generate content using Gemini model with region fallback, yielding text as it is produced.
+        
+        Regions are tried healthiest first until one produces its first chunk;
+        after that the stream is committed to that region, so a failure part way
+        through is raised instead of restarting elsewhere. Hedging does not apply.
+        
+        Args:
+            prompt: The input prompt (string or list of string/Part for multimodal)
+            **kwargs: Additional arguments to pass to generate_content
+            
+        Yields:
+            str: Chunks of generated text
+            
+        Raises:
+            Exception: If all regions fail before producing any output, or the chosen region fails mid-stream
+        """
+        gen_config = kwargs.pop('generation_config', self.default_generation_config)
+        prompt = self._prepare_prompt(prompt)
         last_error = None
         
-        for region in self.regions:
+        for region in self.router.ordered_regions():
+            chunks = self._stream_region(region, prompt, gen_config, **kwargs)
             try:
-                self._initialize_region(region)
-                model = self._get_model()
-                
-                # Prepare generation config
-                gen_config = kwargs.pop('generation_config', self.default_generation_config)
-                if response_mime_type:
-                    gen_config = GenerationConfig(
-                        **gen_config.to_dict(),
-                        response_mime_type=response_mime_type
-                    )
-                
-                # Process multimodal input if needed
-                if isinstance(prompt, list) and len(prompt) == 2:
-                    image_content, text_prompt = prompt
-                    if not isinstance(image_content, Part):
-                        image_content = Part.from_data(image_content, mime_type="image/jpeg")
-                    prompt = [image_content, text_prompt]
-                
-                response = model.generate_content(
-                    prompt,
-                    generation_config=gen_config,
-                    safety_settings=self.safety_settings,
-                    **kwargs
-                )
-                
-                return response.text
-                
-            except ResourceExhausted as e:
-                self.logger.warning(f"Region {region} exhausted. Trying next region...")
-                last_error = e
+                first = next(chunks)
+            except StopIteration:
+                return
             except Exception as e:
-                self.logger.warning(f"Unexpected error with region {region}: {str(e)}")
+                if is_request_error(e):
+                    raise
+                self._log_region_error(region, e)
                 last_error = e
+                continue
+            yield first
+            yield from chunks
+            return
         
         raise Exception(f"All regions failed. Last error: {str(last_error)}") from last_error
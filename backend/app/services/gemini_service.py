@@ -1,21 +1,78 @@
 import os
-import json
+import copy
 import logging
-import time
-from datetime import datetime
 from pathlib import Path
 import base64
-from typing import Union, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Iterator, List, Dict, Any, Optional, Tuple
 
 from vertexai.generative_models import GenerationConfig, Part
 import vertexai.generative_models as generative_models
 from pydantic import ValidationError
 
 from .gemini_client import GeminiRegionClient
-from ..schemas.measurement import MeasurementData
+from .extraction_cache import ExtractionCache
+from .executor import run_in_process_pool
+from .image_preprocessor import IMAGE_PREPROCESS, PREPROCESSABLE_MIME_TYPES, preprocess_image
+from .pdf_splitter import PDF_PAGE_CONCURRENCY, split_result_sheets
+from .extraction_prompt import EXTRACTION_INSTRUCTIONS, PROMPT_VERSION, RESPONSE_SCHEMA
+from .response_parser import SectionStream, parse_measurement
 
 logger = logging.getLogger(__name__)
 
+# Mock data returned when extraction fails, for demonstration purposes
+MOCK_MEASUREMENT_DATA = {
+    "informacoes_basicas": {
+        "nome": "Demo User",
+        "id": "DEMO123",
+        "data_exame": "2025-03-06T14:30:00",
+        "idade": 35,
+        "sexo": "Masculino",
+        "altura": 175.0
+    },
+    "composicao_corporal": {
+        "peso": 75.5,
+        "agua_corporal_total": 45.3,
+        "proteina": 12.8,
+        "minerais": 4.2,
+        "massa_gordura": 15.2,
+        "massa_muscular_esqueletica": 35.6,
+        "massa_livre_gordura": 60.3
+    },
+    "indices_corporais": {
+        "imc": 24.7,
+        "pgc": 20.1,
+        "taxa_metabolica_basal": 1750,
+        "relacao_cintura_quadril": 0.85,
+        "nivel_gordura_visceral": 8,
+        "grau_obesidade": 112.5
+    },
+    "analise_segmentar": {
+        "massa_magra": {
+            "braco_esquerdo": 3.2,
+            "braco_direito": 3.3,
+            "tronco": 28.5,
+            "perna_esquerda": 9.8,
+            "perna_direita": 9.9
+        },
+        "massa_gorda": {
+            "braco_esquerdo": 1.1,
+            "braco_direito": 1.0,
+            "tronco": 8.5,
+            "perna_esquerda": 2.3,
+            "perna_direita": 2.3
+        }
+    },
+    "pontuacao_inbody": 85,
+    "controle_peso": {
+        "peso_ideal": 72.0,
+        "controle_peso": -3.5,
+        "controle_gordura": -5.0,
+        "controle_musculo": 1.5
+    },
+    "modelo_inbody": "InBody 770"
+}
+
 
 class GeminiService:
     """Service for processing InBody measurement images using Vertex AI Gemini."""
@@ -24,24 +81,25 @@ class GeminiService:
         """Initialize the Gemini service."""
         self.project_id = os.getenv("project_id")
         self.client = GeminiRegionClient(project_id=self.project_id)
+        self.cache = ExtractionCache()
 
-        # Load the schema
-        schema_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "../schemas/json.schema")
-        )
-        with open(schema_path, "r") as f:
-            self.schema = json.load(f)
-
-        # Configure generation settings
+        # Configure generation settings; the output schema is enforced natively by the model
         self.generation_config = {
             "max_output_tokens": 8192,
             "temperature": 0.2,
             "top_p": 0.95,
             "response_mime_type": "application/json",
-            "response_schema": {"type": "OBJECT", "properties": {"response": {"type": "STRING"}}},
+            "response_schema": RESPONSE_SCHEMA,
         }
+        self._generation_config = GenerationConfig(**self.generation_config)
+
+        # Pages of a multi-page PDF are extracted in parallel, each as its own request
+        self._page_executor = ThreadPoolExecutor(
+            max_workers=PDF_PAGE_CONCURRENCY,
+            thread_name_prefix="pdf-page"
+        )
 
-        logger.info("Initialized Gemini service")
+        logger.info(f"Initialized Gemini service (prompt version {PROMPT_VERSION})")
 
     def _get_mime_type(self, file_path: str) -> str:
         """
@@ -63,15 +121,196 @@ class GeminiService:
         # Default to image/jpeg for unknown file types, as we expect images
         return mime_types.get(extension, 'image/jpeg')
 
-    def process_inbody_image(self, file_path: str) -> Dict[str, Any]:
+    def _build_prompt(self, image_data: Union[bytes, memoryview], mime_type: str) -> List[Union[str, Part]]:
         """
-        Process an InBody measurement image and extract structured data.
+        Build the multimodal extraction prompt, shrinking photos first.
         
         Args:
-            file_path (str): Path to the image file
+            image_data (bytes | memoryview): The file contents
+            mime_type (str): MIME type of the file
+            
+        Returns:
+            list: The image part followed by the text instructions
+        """
+        if isinstance(image_data, memoryview):
+            # The request proto needs bytes; this is the only copy of a spilled upload
+            image_data = image_data.tobytes()
+        if IMAGE_PREPROCESS and mime_type in PREPROCESSABLE_MIME_TYPES:
+            try:
+                original_size = len(image_data)
+                image_data, mime_type = run_in_process_pool(preprocess_image, image_data, mime_type)
+                logger.info(f"Preprocessed image from {original_size} to {len(image_data)} bytes")
+            except Exception as e:
+                # Unreadable or unusual images still go to the model as uploaded
+                logger.warning(f"Image preprocessing failed, sending the original: {str(e)}")
+        return [Part.from_data(image_data, mime_type=mime_type), EXTRACTION_INSTRUCTIONS]
+
+    def _extract(self, image_data: Union[bytes, memoryview], mime_type: str) -> Dict[str, Any]:
+        """
+        Call the model and return validated measurement data.
+        
+        Args:
+            image_data (bytes | memoryview): The file contents
+            mime_type (str): MIME type of the file
             
         Returns:
             dict: Extracted measurement data
+            
+        Raises:
+            Exception: If the model call, parsing or validation fails
+        """
+        prompt = self._build_prompt(image_data, mime_type)
+
+        # Generate content with Gemini
+        response = self.client.generate_content(
+            prompt=prompt,
+            generation_config=self._generation_config
+        )
+        
+        return parse_measurement(response)
+
+    def extract_inbody_bytes(self, image_data: Union[bytes, memoryview], mime_type: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Extract structured data from InBody file contents, using the extraction cache.
+        
+        Unlike process_inbody_bytes, failures are raised rather than replaced
+        with mock data, for callers that report them per item.
+        
+        Args:
+            image_data (bytes | memoryview): The file contents
+            mime_type (str): MIME type of the file
+            
+        Returns:
+            Tuple[dict, bool]: (extracted measurement data, whether it was served from the cache)
+            
+        Raises:
+            Exception: If the model call, parsing or validation fails
+        """
+        cache_key = self.cache.make_key(image_data, PROMPT_VERSION, self.client.model_name)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {cache_key[:12]}")
+            return cached, True
+
+        result = self._extract(image_data, mime_type)
+        logger.info("Successfully extracted data from InBody image")
+        self.cache.set(cache_key, result)
+        return result, False
+
+    def process_inbody_bytes(self, image_data: Union[bytes, memoryview], mime_type: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Extract structured data from InBody file contents, using the extraction cache.
+        
+        Args:
+            image_data (bytes | memoryview): The file contents
+            mime_type (str): MIME type of the file
+            
+        Returns:
+            Tuple[dict, bool]: (extracted measurement data, whether it was served from the cache)
+        """
+        try:
+            return self.extract_inbody_bytes(image_data, mime_type)
+        except ValidationError as e:
+            logger.error(f"Data validation error: {e}. Using mock data.")
+            return copy.deepcopy(MOCK_MEASUREMENT_DATA), False
+        except Exception as e:
+            logger.warning(f"Error with Vertex AI: {str(e)}. Using mock data for demonstration.")
+            return copy.deepcopy(MOCK_MEASUREMENT_DATA), False
+
+    def stream_inbody_bytes(self, image_data: Union[bytes, memoryview],
+                            mime_type: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Extract structured data from InBody file contents, reporting each top-level section as the model finishes it.
+        
+        Sections are previews of the raw model output. The final item carries
+        the validated data, which is what gets saved and may differ from the
+        previews (defaults applied, or mock data if the extraction failed).
+        
+        Args:
+            image_data (bytes | memoryview): The file contents
+            mime_type (str): MIME type of the file
+            
+        Yields:
+            Tuple[str, Any]: ('section', (name, value)) for each completed section, then
+                ('measurement', (extracted measurement data, whether it was served from the cache))
+        """
+        cache_key = self.cache.make_key(image_data, PROMPT_VERSION, self.client.model_name)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {cache_key[:12]}")
+            for section in cached.items():
+                yield 'section', section
+            yield 'measurement', (cached, True)
+            return
+
+        sections = SectionStream()
+        chunks = []
+        try:
+            for chunk in self.client.generate_content_stream(
+                prompt=self._build_prompt(image_data, mime_type),
+                generation_config=self._generation_config
+            ):
+                chunks.append(chunk)
+                for section in sections.feed(chunk):
+                    yield 'section', section
+            result = parse_measurement(''.join(chunks))
+            logger.info("Successfully extracted data from InBody image")
+        except ValidationError as e:
+            logger.error(f"Data validation error: {e}. Using mock data.")
+            yield 'measurement', (copy.deepcopy(MOCK_MEASUREMENT_DATA), False)
+            return
+        except Exception as e:
+            logger.warning(f"Error with Vertex AI: {str(e)}. Using mock data for demonstration.")
+            yield 'measurement', (copy.deepcopy(MOCK_MEASUREMENT_DATA), False)
+            return
+
+        self.cache.set(cache_key, result)
+        yield 'measurement', (result, False)
+
+    def process_inbody_pdf(self, pdf_data: Union[bytes, memoryview]
+                           ) -> List[Tuple[int, Optional[Dict[str, Any]], bool, Optional[str]]]:
+        """
+        Extract one measurement per InBody result sheet in a PDF.
+        
+        The PDF is split locally and its result sheets are extracted
+        concurrently, so a long export takes about as long as its slowest page.
+        Each page goes through the extraction cache on its own. A page that
+        cannot be extracted is reported with its error, never as mock data.
+        
+        Args:
+            pdf_data (bytes | memoryview): The PDF file contents
+            
+        Returns:
+            list: (1-based page number, extracted measurement data or None, whether it was
+                served from the cache, error message or None) for each result sheet, in page order
+            
+        Raises:
+            ValueError: If the file cannot be read as a PDF
+        """
+        if isinstance(pdf_data, memoryview):
+            pdf_data = pdf_data.tobytes()
+        sheets = split_result_sheets(pdf_data)
+
+        def extract(sheet):
+            number, page_data = sheet
+            try:
+                data, cached = self.extract_inbody_bytes(page_data, 'application/pdf')
+                return number, data, cached, None
+            except Exception as e:
+                logger.error(f"Error extracting PDF page {number}: {str(e)}")
+                return number, None, False, str(e)
+
+        return list(self._page_executor.map(extract, sheets))
+
+    def process_inbody_file(self, file_path: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Process an InBody measurement file, reporting whether the result was cached.
+        
+        Args:
+            file_path (str): Path to the image file
+            
+        Returns:
+            Tuple[dict, bool]: (extracted measurement data, whether it was served from the cache)
         """
         try:
             logger.info(f"Processing InBody image: {file_path}")
@@ -80,293 +319,23 @@ class GeminiService:
             with open(file_path, 'rb') as f:
                 image_data = f.read()
             
-            try:
-                # Create prompt with instructions
-                prompt = [
-                    Part.from_data(image_data, mime_type=self._get_mime_type(file_path)),
-                    """
-                    Extract all available InBody measurement data from this image.
-                    The image contains an InBody scale measurement report.
-                    Extract all the metrics and values visible in the image.
-                    Format the data according to the following JSON schema:
-
-                    ```json
-                    {schema}
-                    ```
-
-                    Return only the JSON data without any additional text or explanation.
-                    """.format(schema=self.schema)
-                ]
-
-                # Generate content with Gemini
-                generation_config = GenerationConfig(
-                    max_output_tokens=self.generation_config["max_output_tokens"],
-                    temperature=self.generation_config["temperature"],
-                    top_p=self.generation_config["top_p"],
-                    response_mime_type=self.generation_config["response_mime_type"]
-                )
-                
-                response = self.client.generate_content(
-                    prompt=prompt,
-                    generation_config=generation_config
-                )
-                
-                # Parse the response
-                try:
-                    result = json.loads(response)
-                    logger.info("Successfully extracted data from InBody image")
-                    # Validate the extracted data
-                    try:
-                        # Ensure required fields are present and not None
-                        if 'informacoes_basicas' in result:
-                            if result['informacoes_basicas'] is None:
-                                result['informacoes_basicas'] = {}
-                            
-                            # Set default values for required fields if missing or None
-                            if not result['informacoes_basicas'].get('nome'):
-                                result['informacoes_basicas']['nome'] = "Unknown Patient"
-                            if not result['informacoes_basicas'].get('id'):
-                                result['informacoes_basicas']['id'] = f"ID-{int(time.time())}"
-                            if not result['informacoes_basicas'].get('data_exame'):
-                                result['informacoes_basicas']['data_exame'] = datetime.now().isoformat()
-                        else:
-                            result['informacoes_basicas'] = {
-                                'nome': "Unknown Patient",
-                                'id': f"ID-{int(time.time())}",
-                                'data_exame': datetime.now().isoformat()
-                            }
-                        
-                        # Ensure other required sections are present
-                        if 'composicao_corporal' not in result or result['composicao_corporal'] is None:
-                            result['composicao_corporal'] = {
-                                'peso': 70.0,
-                                'massa_gordura': 15.0,
-                                'massa_muscular_esqueletica': 30.0
-                            }
-                        
-                        if 'indices_corporais' not in result or result['indices_corporais'] is None:
-                            result['indices_corporais'] = {
-                                'imc': 24.0,
-                                'pgc': 20.0
-                            }
-                        
-                        # Validate the data
-                        MeasurementData.model_validate(result)
-                        return result
-                    except ValidationError as e:
-                        logger.error(f"Data validation error: {e}. Using mock data.")
-                        # Return mock data for demonstration purposes
-                        return {
-                            "informacoes_basicas": {
-                                "nome": "Demo User",
-                                "id": "DEMO123",
-                                "data_exame": "2025-03-06T14:30:00",
-                                "idade": 35,
-                                "sexo": "Masculino",
-                                "altura": 175.0
-                            },
-                            "composicao_corporal": {
-                                "peso": 75.5,
-                                "agua_corporal_total": 45.3,
-                                "proteina": 12.8,
-                                "minerais": 4.2,
-                                "massa_gordura": 15.2,
-                                "massa_muscular_esqueletica": 35.6,
-                                "massa_livre_gordura": 60.3
-                            },
-                            "indices_corporais": {
-                                "imc": 24.7,
-                                "pgc": 20.1,
-                                "taxa_metabolica_basal": 1750,
-                                "relacao_cintura_quadril": 0.85,
-                                "nivel_gordura_visceral": 8,
-                                "grau_obesidade": 112.5
-                            },
-                            "analise_segmentar": {
-                                "massa_magra": {
-                                    "braco_esquerdo": 3.2,
-                                    "braco_direito": 3.3,
-                                    "tronco": 28.5,
-                                    "perna_esquerda": 9.8,
-                                    "perna_direita": 9.9
-                                },
-                                "massa_gorda": {
-                                    "braco_esquerdo": 1.1,
-                                    "braco_direito": 1.0,
-                                    "tronco": 8.5,
-                                    "perna_esquerda": 2.3,
-                                    "perna_direita": 2.3
-                                }
-                            },
-                            "pontuacao_inbody": 85,
-                            "controle_peso": {
-                                "peso_ideal": 72.0,
-                                "controle_peso": -3.5,
-                                "controle_gordura": -5.0,
-                                "controle_musculo": 1.5
-                            },
-                            "modelo_inbody": "InBody 770"
-                        }
-                except json.JSONDecodeError:
-                    # If the response is not valid JSON, try to extract JSON from the text
-                    logger.warning("Response is not valid JSON, attempting to extract JSON from text")
-                    import re
-                    json_match = re.search(r'({.*})', response, re.DOTALL)
-                    if json_match:
-                        result = json.loads(json_match.group(1))
-                        try:
-                            # Ensure required fields are present and not None
-                            if 'informacoes_basicas' in result:
-                                if result['informacoes_basicas'] is None:
-                                    result['informacoes_basicas'] = {}
-                                
-                                # Set default values for required fields if missing or None
-                                if not result['informacoes_basicas'].get('nome'):
-                                    result['informacoes_basicas']['nome'] = "Unknown Patient"
-                                if not result['informacoes_basicas'].get('id'):
-                                    result['informacoes_basicas']['id'] = f"ID-{int(time.time())}"
-                                if not result['informacoes_basicas'].get('data_exame'):
-                                    result['informacoes_basicas']['data_exame'] = datetime.now().isoformat()
-                            else:
-                                result['informacoes_basicas'] = {
-                                    'nome': "Unknown Patient",
-                                    'id': f"ID-{int(time.time())}",
-                                    'data_exame': datetime.now().isoformat()
-                                }
-                            
-                            # Ensure other required sections are present
-                            if 'composicao_corporal' not in result or result['composicao_corporal'] is None:
-                                result['composicao_corporal'] = {
-                                    'peso': 70.0,
-                                    'massa_gordura': 15.0,
-                                    'massa_muscular_esqueletica': 30.0
-                                }
-                            
-                            if 'indices_corporais' not in result or result['indices_corporais'] is None:
-                                result['indices_corporais'] = {
-                                    'imc': 24.0,
-                                    'pgc': 20.0
-                                }
-                            
-                            # Validate the data
-                            MeasurementData.model_validate(result)
-                            return result
-                        except ValidationError as e:
-                            logger.error(f"Data validation error: {e}. Using mock data.")
-                            # Return mock data for demonstration purposes
-                            return {
-                                "informacoes_basicas": {
-                                    "nome": "Demo User",
-                                    "id": "DEMO123",
-                                    "data_exame": "2025-03-06T14:30:00",
-                                    "idade": 35,
-                                    "sexo": "Masculino",
-                                    "altura": 175.0
-                                },
-                                "composicao_corporal": {
-                                    "peso": 75.5,
-                                    "agua_corporal_total": 45.3,
-                                    "proteina": 12.8,
-                                    "minerais": 4.2,
-                                    "massa_gordura": 15.2,
-                                    "massa_muscular_esqueletica": 35.6,
-                                    "massa_livre_gordura": 60.3
-                                },
-                                "indices_corporais": {
-                                    "imc": 24.7,
-                                    "pgc": 20.1,
-                                    "taxa_metabolica_basal": 1750,
-                                    "relacao_cintura_quadril": 0.85,
-                                    "nivel_gordura_visceral": 8,
-                                    "grau_obesidade": 112.5
-                                },
-                                "analise_segmentar": {
-                                    "massa_magra": {
-                                        "braco_esquerdo": 3.2,
-                                        "braco_direito": 3.3,
-                                        "tronco": 28.5,
-                                        "perna_esquerda": 9.8,
-                                        "perna_direita": 9.9
-                                    },
-                                    "massa_gorda": {
-                                        "braco_esquerdo": 1.1,
-                                        "braco_direito": 1.0,
-                                        "tronco": 8.5,
-                                        "perna_esquerda": 2.3,
-                                        "perna_direita": 2.3
-                                    }
-                                },
-                                "pontuacao_inbody": 85,
-                                "controle_peso": {
-                                    "peso_ideal": 72.0,
-                                    "controle_peso": -3.5,
-                                    "controle_gordura": -5.0,
-                                    "controle_musculo": 1.5
-                                },
-                                "modelo_inbody": "InBody 770"
-                            }
-                    else:
-                        raise ValueError("Could not extract valid JSON from response")
-
-            except Exception as e:
-                logger.warning(f"Error with Vertex AI: {str(e)}. Using mock data for demonstration.")
-                # Return mock data for demonstration purposes
-                return {
-                    "informacoes_basicas": {
-                        "nome": "Demo User",
-                        "id": "DEMO123",
-                        "data_exame": "2025-03-06T14:30:00",
-                        "idade": 35,
-                        "sexo": "Masculino",
-                        "altura": 175.0
-                    },
-                    "composicao_corporal": {
-                        "peso": 75.5,
-                        "agua_corporal_total": 45.3,
-                        "proteina": 12.8,
-                        "minerais": 4.2,
-                        "massa_gordura": 15.2,
-                        "massa_muscular_esqueletica": 35.6,
-                        "massa_livre_gordura": 60.3
-                    },
-                    "indices_corporais": {
-                        "imc": 24.7,
-                        "pgc": 20.1,
-                        "taxa_metabolica_basal": 1750,
-                        "relacao_cintura_quadril": 0.85,
-                        "nivel_gordura_visceral": 8,
-                        "grau_obesidade": 112.5
-                    },
-                    "analise_segmentar": {
-                        "massa_magra": {
-                            "braco_esquerdo": 3.2,
-                            "braco_direito": 3.3,
-                            "tronco": 28.5,
-                            "perna_esquerda": 9.8,
-                            "perna_direita": 9.9
-                        },
-                        "massa_gorda": {
-                            "braco_esquerdo": 1.1,
-                            "braco_direito": 1.0,
-                            "tronco": 8.5,
-                            "perna_esquerda": 2.3,
-                            "perna_direita": 2.3
-                        }
-                    },
-                    "pontuacao_inbody": 85,
-                    "controle_peso": {
-                        "peso_ideal": 72.0,
-                        "controle_peso": -3.5,
-                        "controle_gordura": -5.0,
-                        "controle_musculo": 1.5
-                    },
-                    "modelo_inbody": "InBody 770"
-                }
-
+            return self.process_inbody_bytes(image_data, self._get_mime_type(file_path))
         except Exception as e:
             logger.error(f"Error processing InBody image: {str(e)}")
             raise
 
+    def process_inbody_image(self, file_path: str) -> Dict[str, Any]:
+        """
+        Process an InBody measurement image and extract structured data.
+        
+        Args:
+            file_path (str): Path to the image file
+            
+        Returns:
+            dict: Extracted measurement data
+        """
+        return self.process_inbody_file(file_path)[0]
+
     def process_inbody_image_base64(self, base64_image: str, file_type: str) -> Dict[str, Any]:
         """
         Process a base64-encoded InBody measurement image and extract structured data, validating it against the MeasurementData schema.
@@ -384,291 +353,10 @@ class GeminiService:
             # Decode base64 image
             image_data = base64.b64decode(base64_image)
 
-            try:
-                # Determine MIME type
-                mime_type = f"image/{file_type}" if file_type in ['jpeg', 'png'] else f"application/{file_type}"
-
-                # Create prompt with instructions
-                prompt = [
-                    Part.from_data(image_data, mime_type=mime_type),
-                    """
-                    Extract all available InBody measurement data from this image.
-                    The image contains an InBody scale measurement report.
-                    Extract all the metrics and values visible in the image.
-                    Format the data according to the following JSON schema:
-
-                    ```json
-                    {schema}
-                    ```
-
-                    Return only the JSON data without any additional text or explanation.
-                    """.format(schema=self.schema)
-                ]
-
-                # Generate content with Gemini
-                generation_config = GenerationConfig(
-                    max_output_tokens=self.generation_config["max_output_tokens"],
-                    temperature=self.generation_config["temperature"],
-                    top_p=self.generation_config["top_p"],
-                    response_mime_type=self.generation_config["response_mime_type"]
-                )
-
-                response = self.client.generate_content(
-                    prompt=prompt,
-                    generation_config=generation_config
-                )
-
-                # Parse the response
-                try:
-                    result = json.loads(response)
-                    logger.info("Successfully extracted data from base64 InBody image")
-                    # Validate the extracted data
-                    try:
-                        # Ensure required fields are present and not None
-                        if 'informacoes_basicas' in result:
-                            if result['informacoes_basicas'] is None:
-                                result['informacoes_basicas'] = {}
-                            
-                            # Set default values for required fields if missing or None
-                            if not result['informacoes_basicas'].get('nome'):
-                                result['informacoes_basicas']['nome'] = "Unknown Patient"
-                            if not result['informacoes_basicas'].get('id'):
-                                result['informacoes_basicas']['id'] = f"ID-{int(time.time())}"
-                            if not result['informacoes_basicas'].get('data_exame'):
-                                result['informacoes_basicas']['data_exame'] = datetime.now().isoformat()
-                        else:
-                            result['informacoes_basicas'] = {
-                                'nome': "Unknown Patient",
-                                'id': f"ID-{int(time.time())}",
-                                'data_exame': datetime.now().isoformat()
-                            }
-                        
-                        # Ensure other required sections are present
-                        if 'composicao_corporal' not in result or result['composicao_corporal'] is None:
-                            result['composicao_corporal'] = {
-                                'peso': 70.0,
-                                'massa_gordura': 15.0,
-                                'massa_muscular_esqueletica': 30.0
-                            }
-                        
-                        if 'indices_corporais' not in result or result['indices_corporais'] is None:
-                            result['indices_corporais'] = {
-                                'imc': 24.0,
-                                'pgc': 20.0
-                            }
-                        
-                        # Validate the data
-                        MeasurementData.model_validate(result)
-                        return result
-                    except ValidationError as e:
-                        logger.error(f"Data validation error: {e}. Using mock data.")
-                        # Return mock data for demonstration purposes
-                        return {
-                            "informacoes_basicas": {
-                                "nome": "Demo User",
-                                "id": "DEMO123",
-                                "data_exame": "2025-03-06T14:30:00",
-                                "idade": 35,
-                                "sexo": "Masculino",
-                                "altura": 175.0
-                            },
-                            "composicao_corporal": {
-                                "peso": 75.5,
-                                "agua_corporal_total": 45.3,
-                                "proteina": 12.8,
-                                "minerais": 4.2,
-                                "massa_gordura": 15.2,
-                                "massa_muscular_esqueletica": 35.6,
-                                "massa_livre_gordura": 60.3
-                            },
-                            "indices_corporais": {
-                                "imc": 24.7,
-                                "pgc": 20.1,
-                                "taxa_metabolica_basal": 1750,
-                                "relacao_cintura_quadril": 0.85,
-                                "nivel_gordura_visceral": 8,
-                                "grau_obesidade": 112.5
-                            },
-                            "analise_segmentar": {
-                                "massa_magra": {
-                                    "braco_esquerdo": 3.2,
-                                    "braco_direito": 3.3,
-                                    "tronco": 28.5,
-                                    "perna_esquerda": 9.8,
-                                    "perna_direita": 9.9
-                                },
-                                "massa_gorda": {
-                                    "braco_esquerdo": 1.1,
-                                    "braco_direito": 1.0,
-                                    "tronco": 8.5,
-                                    "perna_esquerda": 2.3,
-                                    "perna_direita": 2.3
-                                }
-                            },
-                            "pontuacao_inbody": 85,
-                            "controle_peso": {
-                                "peso_ideal": 72.0,
-                                "controle_peso": -3.5,
-                                "controle_gordura": -5.0,
-                                "controle_musculo": 1.5
-                            },
-                            "modelo_inbody": "InBody 770"
-                        }
-                except json.JSONDecodeError:
-                    # If the response is not valid JSON, try to extract JSON from the text
-                    logger.warning("Response is not valid JSON, attempting to extract JSON from text")
-                    import re
-                    json_match = re.search(r'({.*})', response, re.DOTALL)
-                    if json_match:
-                        result = json.loads(json_match.group(1))
-                        try:
-                            # Ensure required fields are present and not None
-                            if 'informacoes_basicas' in result:
-                                if result['informacoes_basicas'] is None:
-                                    result['informacoes_basicas'] = {}
-                                
-                                # Set default values for required fields if missing or None
-                                if not result['informacoes_basicas'].get('nome'):
-                                    result['informacoes_basicas']['nome'] = "Unknown Patient"
-                                if not result['informacoes_basicas'].get('id'):
-                                    result['informacoes_basicas']['id'] = f"ID-{int(time.time())}"
-                                if not result['informacoes_basicas'].get('data_exame'):
-                                    result['informacoes_basicas']['data_exame'] = datetime.now().isoformat()
-                            else:
-                                result['informacoes_basicas'] = {
-                                    'nome': "Unknown Patient",
-                                    'id': f"ID-{int(time.time())}",
-                                    'data_exame': datetime.now().isoformat()
-                                }
-                            
-                            # Ensure other required sections are present
-                            if 'composicao_corporal' not in result or result['composicao_corporal'] is None:
-                                result['composicao_corporal'] = {
-                                    'peso': 70.0,
-                                    'massa_gordura': 15.0,
-                                    'massa_muscular_esqueletica': 30.0
-                                }
-                            
-                            if 'indices_corporais' not in result or result['indices_corporais'] is None:
-                                result['indices_corporais'] = {
-                                    'imc': 24.0,
-                                    'pgc': 20.0
-                                }
-                            
-                            # Validate the data
-                            MeasurementData.model_validate(result)
-                            return result
-                        except ValidationError as e:
-                            logger.error(f"Data validation error: {e}. Using mock data.")
-                            # Return mock data for demonstration purposes
-                            return {
-                                "informacoes_basicas": {
-                                    "nome": "Demo User",
-                                    "id": "DEMO123",
-                                    "data_exame": "2025-03-06T14:30:00",
-                                    "idade": 35,
-                                    "sexo": "Masculino",
-                                    "altura": 175.0
-                                },
-                                "composicao_corporal": {
-                                    "peso": 75.5,
-                                    "agua_corporal_total": 45.3,
-                                    "proteina": 12.8,
-                                    "minerais": 4.2,
-                                    "massa_gordura": 15.2,
-                                    "massa_muscular_esqueletica": 35.6,
-                                    "massa_livre_gordura": 60.3
-                                },
-                                "indices_corporais": {
-                                    "imc": 24.7,
-                                    "pgc": 20.1,
-                                    "taxa_metabolica_basal": 1750,
-                                    "relacao_cintura_quadril": 0.85,
-                                    "nivel_gordura_visceral": 8,
-                                    "grau_obesidade": 112.5
-                                },
-                                "analise_segmentar": {
-                                    "massa_magra": {
-                                        "braco_esquerdo": 3.2,
-                                        "braco_direito": 3.3,
-                                        "tronco": 28.5,
-                                        "perna_esquerda": 9.8,
-                                        "perna_direita": 9.9
-                                    },
-                                    "massa_gorda": {
-                                        "braco_esquerdo": 1.1,
-                                        "braco_direito": 1.0,
-                                        "tronco": 8.5,
-                                        "perna_esquerda": 2.3,
-                                        "perna_direita": 2.3
-                                    }
-                                },
-                                "pontuacao_inbody": 85,
-                                "controle_peso": {
-                                    "peso_ideal": 72.0,
-                                    "controle_peso": -3.5,
-                                    "controle_gordura": -5.0,
-                                    "controle_musculo": 1.5
-                                },
-                                "modelo_inbody": "InBody 770"
-                            }
-                    else:
-                        raise ValueError("Could not extract valid JSON from response")
+            # Determine MIME type
+            mime_type = f"image/{file_type}" if file_type in ['jpeg', 'png'] else f"application/{file_type}"
 
-            except Exception as e:
-                logger.warning(f"Error with Vertex AI: {str(e)}. Using mock data for demonstration.")
-                # Return mock data for demonstration purposes
-                return {
-                    "informacoes_basicas": {
-                        "nome": "Demo User",
-                        "id": "DEMO123",
-                        "data_exame": "2025-03-06T14:30:00",
-                        "idade": 35,
-                        "sexo": "Masculino",
-                        "altura": 175.0
-                    },
-                    "composicao_corporal": {
-                        "peso": 75.5,
-                        "agua_corporal_total": 45.3,
-                        "proteina": 12.8,
-                        "minerais": 4.2,
-                        "massa_gordura": 15.2,
-                        "massa_muscular_esqueletica": 35.6,
-                        "massa_livre_gordura": 60.3
-                    },
-                    "indices_corporais": {
-                        "imc": 24.7,
-                        "pgc": 20.1,
-                        "taxa_metabolica_basal": 1750,
-                        "relacao_cintura_quadril": 0.85,
-                        "nivel_gordura_visceral": 8,
-                        "grau_obesidade": 112.5
-                    },
-                    "analise_segmentar": {
-                        "massa_magra": {
-                            "braco_esquerdo": 3.2,
-                            "braco_direito": 3.3,
-                            "tronco": 28.5,
-                            "perna_esquerda": 9.8,
-                            "perna_direita": 9.9
-                        },
-                        "massa_gorda": {
-                            "braco_esquerdo": 1.1,
-                            "braco_direito": 1.0,
-                            "tronco": 8.5,
-                            "perna_esquerda": 2.3,
-                            "perna_direita": 2.3
-                        }
-                    },
-                    "pontuacao_inbody": 85,
-                    "controle_peso": {
-                        "peso_ideal": 72.0,
-                        "controle_peso": -3.5,
-                        "controle_gordura": -5.0,
-                        "controle_musculo": 1.5
-                    },
-                    "modelo_inbody": "InBody 770"
-                }
+            return self.process_inbody_bytes(image_data, mime_type)[0]
 
         except Exception as e:
             logger.error(f"Error processing base64 InBody image: {str(e)}")
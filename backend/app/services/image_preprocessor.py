@@ -0,0 +1,150 @@
+import io
+import os
+import logging
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Preprocessing of uploaded photos before they are sent to the model
+IMAGE_PREPROCESS = os.getenv("IMAGE_PREPROCESS", "true").lower() == "true"
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(1024 * 1024)))
+
+PREPROCESSABLE_MIME_TYPES = ('image/jpeg', 'image/png')
+
+# Lowest JPEG quality tried while fitting an image under IMAGE_MAX_BYTES
+_MIN_JPEG_QUALITY = 50
+
+# Side of the thumbnail the document area is detected on
+_DETECTION_SIZE = 256
+
+# Only crop when the page covers between these fractions of the photo
+_MIN_DOCUMENT_AREA = 0.25
+_MAX_DOCUMENT_AREA = 0.92
+
+_CROP_MARGIN = 0.02
+
+_EXIF_ORIENTATION = 0x0112
+
+
+def _otsu_threshold(histogram) -> int:
+    """Grey level that best separates the histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 0, 0.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def find_document_box(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the printed page in a photo, as the bounding box of its bright pixels.
+
+    Args:
+        image (Image): The photo, already upright
+
+    Returns:
+        tuple: (left, upper, right, lower) in image pixels, or None if the page
+            fills the photo or cannot be told apart from the background
+    """
+    thumbnail = image.convert('L')
+    thumbnail.thumbnail((_DETECTION_SIZE, _DETECTION_SIZE))
+    threshold = _otsu_threshold(thumbnail.histogram())
+    box = thumbnail.point(lambda level: 255 if level > threshold else 0).getbbox()
+    if box is None:
+        return None
+
+    width, height = thumbnail.size
+    left, upper, right, lower = box
+    area = (right - left) * (lower - upper) / (width * height)
+    if not _MIN_DOCUMENT_AREA <= area <= _MAX_DOCUMENT_AREA:
+        return None
+
+    scale_x, scale_y = image.width / width, image.height / height
+    margin_x, margin_y = image.width * _CROP_MARGIN, image.height * _CROP_MARGIN
+    return (
+        max(0, int(left * scale_x - margin_x)),
+        max(0, int(upper * scale_y - margin_y)),
+        min(image.width, int(right * scale_x + margin_x)),
+        min(image.height, int(lower * scale_y + margin_y)),
+    )
+
+
+def _encode_jpeg(image: Image.Image, max_bytes: int) -> bytes:
+    """Encode as JPEG, lowering the quality until the result fits max_bytes (or the floor is reached)."""
+    quality = IMAGE_JPEG_QUALITY
+    while True:
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+        if output.tell() <= max_bytes or quality <= _MIN_JPEG_QUALITY:
+            return output.getvalue()
+        quality = max(_MIN_JPEG_QUALITY, quality - 10)
+
+
+def preprocess_image(image_data: bytes, mime_type: str,
+                     max_dimension: int = IMAGE_MAX_DIMENSION,
+                     max_bytes: int = IMAGE_MAX_BYTES) -> Tuple[bytes, str]:
+    """
+    Shrink a photo of an InBody report before it is sent to the model.
+
+    Rotates it upright from its EXIF orientation, crops it to the printed page,
+    downscales it so its longest side is at most max_dimension and re-encodes
+    it as JPEG within max_bytes. Runs in the preprocessing process pool (see
+    executor.run_in_process_pool), so it only takes and returns bytes.
+
+    Args:
+        image_data (bytes): The uploaded file contents
+        mime_type (str): MIME type of the file
+        max_dimension (int): Longest side of the result, in pixels
+        max_bytes (int): Target size of the result
+
+    Returns:
+        Tuple[bytes, str]: (image data, MIME type); the input is returned unchanged
+            for non-image files and when it is already smaller than the result
+    """
+    if mime_type not in PREPROCESSABLE_MIME_TYPES:
+        return image_data, mime_type
+
+    with Image.open(io.BytesIO(image_data)) as original:
+        changed = original.getexif().get(_EXIF_ORIENTATION, 1) != 1
+        # JPEGs much larger than the target are decoded at a reduced scale, which is far cheaper
+        original.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(original)
+
+        box = find_document_box(image)
+        if box is not None:
+            image = image.crop(box)
+            changed = True
+
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            changed = True
+
+        if image.mode not in ('RGB', 'L'):
+            # Flatten transparency onto white, like the printed page
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+
+        encoded = _encode_jpeg(image, max_bytes)
+
+    if not changed and len(encoded) >= len(image_data):
+        return image_data, mime_type
+    return encoded, 'image/jpeg'
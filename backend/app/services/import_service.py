@@ -0,0 +1,128 @@
+import csv
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from ..schemas.measurement import MeasurementData
+from ..utils.date_utils import has_time_of_day, parse_exam_date
+from .storage_backend import BATCH_WRITE_LIMIT, MeasurementStore
+
+logger = logging.getLogger(__name__)
+
+# Valid records written per storage call; one Firestore batch
+IMPORT_BATCH_SIZE = BATCH_WRITE_LIMIT
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# Fields the server sets on write; imported values are ignored
+_SERVER_FIELDS = {'id', 'updated_at', 'exam_timestamp', 'derivados'}
+
+
+def parse_csv_header(line: str) -> List[str]:
+    """Parse the CSV header row into column names (dotted paths, as produced by the export)."""
+    return next(csv.reader([line]))
+
+
+def is_empty_csv_row(record: str) -> bool:
+    """Tell whether a CSV record parses to an empty row (a blank line between records)."""
+    return not next(csv.reader([record]), [])
+
+
+def _unflatten(columns: Sequence[str], values: Sequence[str]) -> Dict[str, Any]:
+    """Turn a CSV row with dotted column names into a nested document; empty cells are skipped."""
+    if len(values) != len(columns):
+        raise ValueError(f"Expected {len(columns)} columns, got {len(values)}")
+    record = {}
+    for column, value in zip(columns, values):
+        if value == '':
+            continue
+        *parents, leaf = column.split('.')
+        node = record
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return record
+
+
+def _error_message(error: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def parse_record(line: str, import_format: str, columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Parse and validate one NDJSON line or CSV row.
+
+    Args:
+        line (str): The raw line
+        import_format (str): 'ndjson' or 'csv'
+        columns (list, optional): CSV column names
+
+    Returns:
+        dict: Measurement data ready to store, without server-maintained fields
+
+    Raises:
+        ValueError: If the record cannot be parsed, fails validation or has no usable exam date
+    """
+    try:
+        if import_format == 'csv':
+            raw = _unflatten(columns, next(csv.reader([line])))
+        else:
+            raw = json.loads(line)
+        measurement = MeasurementData.model_validate(raw)
+    except ValidationError as e:
+        raise ValueError(_error_message(e)) from e
+    except (json.JSONDecodeError, csv.Error) as e:
+        raise ValueError(f"Malformed {import_format} record: {str(e)}") from e
+
+    if parse_exam_date(measurement.informacoes_basicas.data_exame) is None:
+        # Without an exam time the record cannot be deduplicated
+        raise ValueError(f"Unrecognised exam date: {measurement.informacoes_basicas.data_exame}")
+    return measurement.model_dump(exclude_none=True, exclude=_SERVER_FIELDS)
+
+
+class ImportService:
+    """Bulk import of measurements that were already extracted elsewhere (e.g. LookinBody exports)."""
+
+    def __init__(self, storage: MeasurementStore):
+        """
+        Initialize the service.
+
+        Args:
+            storage (MeasurementStore): Where measurements are saved
+        """
+        self.storage = storage
+
+    def import_lines(self, lines: List[Tuple[int, str]], import_format: str,
+                     columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Validate and upsert one chunk of records.
+
+        Args:
+            lines (list): (line number, raw line) pairs
+            import_format (str): 'ndjson' or 'csv'
+            columns (list, optional): CSV column names
+
+        Returns:
+            dict: inserted and updated counts, the number of records matched on
+                their exam date alone (no time of day), and (line number, error)
+                for each rejected line
+        """
+        measurements, rejected = [], []
+        for line_number, line in lines:
+            try:
+                measurements.append(parse_record(line, import_format, columns))
+            except ValueError as e:
+                rejected.append((line_number, str(e)))
+
+        inserted = updated = 0
+        date_only = sum(1 for measurement in measurements
+                        if not has_time_of_day(measurement['informacoes_basicas']['data_exame']))
+        if measurements:
+            results = self.storage.upsert_measurements(measurements)
+            inserted = sum(1 for _, created in results if created)
+            updated = len(results) - inserted
+        return {'inserted': inserted, 'updated': updated, 'date_only': date_only, 'rejected': rejected}
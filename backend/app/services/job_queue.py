@@ -0,0 +1,312 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .executor import run_storage
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Attempts (claims) a job gets before it is marked failed, counting runs interrupted by a restart
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Hours finished jobs are kept for status polling before they are deleted
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+
+# Seconds between sweeps for expired finished jobs
+_SWEEP_INTERVAL_SECONDS = 3600
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+FINAL_STATUSES = {STATUS_COMPLETED, STATUS_FAILED}
+
+
+class JobQueue:
+    """Persistent, SQLite-backed queue of extraction jobs."""
+
+    def __init__(self, db_path: str = JOB_QUEUE_PATH):
+        """
+        Initialize the queue, creating the database if needed.
+
+        Jobs left in the running state by a previous process are put back
+        in the queue so they are picked up again after a restart, unless
+        they have used up JOB_MAX_ATTEMPTS (a job that keeps crashing the
+        process must not be retried forever); those are marked failed.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    file_name TEXT,
+                    file_type TEXT,
+                    payload BLOB,
+                    result TEXT,
+                    doc_id TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            now = datetime.now().isoformat()
+            abandoned = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, payload = NULL, updated_at = ? "
+                "WHERE status = ? AND attempts >= ?",
+                (STATUS_FAILED, f"Interrupted {JOB_MAX_ATTEMPTS} times", now, STATUS_RUNNING, JOB_MAX_ATTEMPTS),
+            ).rowcount
+            recovered = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, now, STATUS_RUNNING),
+            ).rowcount
+        if abandoned:
+            logger.error(f"Marked {abandoned} jobs failed after {JOB_MAX_ATTEMPTS} interrupted attempts")
+        if recovered:
+            logger.info(f"Re-queued {recovered} interrupted jobs")
+        logger.info(f"Initialized job queue at: {self.db_path}")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived autocommit connection."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, payload: bytes, file_name: str, file_type: Optional[str] = None) -> str:
+        """
+        Add a new extraction job to the queue.
+
+        Args:
+            payload (bytes): The uploaded file contents
+            file_name (str): The original filename
+            file_type (str, optional): The file type (e.g. 'jpeg', 'pdf')
+
+        Returns:
+            str: The job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, file_name, file_type, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_PENDING, file_name, file_type, payload, now, now),
+            )
+        logger.info(f"Enqueued job {job_id} for file {file_name}")
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the oldest pending job.
+
+        Returns:
+            dict: The claimed job including its payload, or None if the queue is empty
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (STATUS_PENDING,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, datetime.now().isoformat(), row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row)
+
+    def complete(self, job_id: str, result: Dict[str, Any], doc_id: str) -> None:
+        """Mark a job as completed and drop its payload."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, doc_id = ?, payload = NULL, updated_at = ? WHERE id = ?",
+                (STATUS_COMPLETED, json.dumps(result, default=str), doc_id, datetime.now().isoformat(), job_id),
+            )
+        logger.info(f"Completed job {job_id} as measurement {doc_id}")
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """
+        Record a failed attempt: re-queue the job, or mark it failed and drop its payload once it has used up JOB_MAX_ATTEMPTS.
+
+        Returns:
+            bool: True if the job was re-queued
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            retried = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND attempts < ?",
+                (STATUS_PENDING, error, now, job_id, JOB_MAX_ATTEMPTS),
+            ).rowcount
+            if not retried:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, payload = NULL, updated_at = ? WHERE id = ?",
+                    (STATUS_FAILED, error, now, job_id),
+                )
+        if retried:
+            logger.warning(f"Job {job_id} attempt failed, re-queued: {error}")
+        else:
+            logger.error(f"Job {job_id} failed: {error}")
+        return bool(retried)
+
+    def purge_finished(self, retention_hours: float = JOB_RETENTION_HOURS) -> int:
+        """
+        Delete completed and failed jobs last updated more than retention_hours ago.
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        cutoff = (datetime.now() - timedelta(hours=retention_hours)).isoformat()
+        with self._connect() as conn:
+            deleted = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' for _ in FINAL_STATUSES)}) AND updated_at < ?",
+                (*FINAL_STATUSES, cutoff),
+            ).rowcount
+        if deleted:
+            logger.info(f"Deleted {deleted} finished jobs older than {retention_hours} hours")
+        return deleted
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status without its payload.
+
+        Args:
+            job_id (str): The job ID
+
+        Returns:
+            dict: The job, or None if not found
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, file_name, file_type, result, doc_id, error, attempts, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobWorkerPool:
+    """Pool of asyncio workers draining a JobQueue."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Tuple[Dict[str, Any], str]]],
+        workers: int = JOB_WORKERS,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Initialize the worker pool.
+
+        Args:
+            queue (JobQueue): The queue to drain
+            handler: Coroutine taking a claimed job and returning (measurement data, document ID)
+            workers (int): Number of concurrent workers
+            poll_interval (float): Seconds to sleep when the queue is empty
+        """
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Optional[asyncio.Condition] = None
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._finished = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; running jobs are re-queued on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait_for_update(self, timeout: float) -> None:
+        """Wait until any job finishes or the timeout elapses."""
+        if self._finished is None:
+            await asyncio.sleep(timeout)
+            return
+        async with self._finished:
+            try:
+                await asyncio.wait_for(self._finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sweeper(self) -> None:
+        """Delete expired finished jobs every _SWEEP_INTERVAL_SECONDS until cancelled."""
+        while True:
+            try:
+                await run_storage(self.queue.purge_finished)
+            except Exception as e:
+                logger.error(f"Could not delete expired jobs: {str(e)}")
+            await asyncio.sleep(_SWEEP_INTERVAL_SECONDS)
+
+    async def _worker(self, index: int) -> None:
+        """Claim and process jobs until cancelled."""
+        while True:
+            try:
+                job = await run_storage(self.queue.claim_next)
+            except Exception as e:
+                logger.error(f"Job worker {index} could not claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result, doc_id = await self.handler(job)
+                await run_storage(self.queue.complete, job["id"], result, doc_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if await run_storage(self.queue.fail, job["id"], str(e)):
+                    # Re-queued for another attempt; no final status to report yet
+                    continue
+
+            async with self._finished:
+                self._finished.notify_all()
@@ -0,0 +1,88 @@
+import io
+import os
+import logging
+from typing import List, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+# Pages of one PDF extracted at the same time
+PDF_PAGE_CONCURRENCY = int(os.getenv("PDF_PAGE_CONCURRENCY", "8"))
+
+# Text found on InBody result sheets (Portuguese and English printouts), lower case
+RESULT_SHEET_MARKERS = (
+    'inbody',
+    'composição corporal',
+    'análise músculo-gordura',
+    'body composition',
+    'muscle-fat analysis',
+)
+
+
+def is_result_sheet(text: str) -> bool:
+    """
+    Tell whether a page's text layer belongs to an InBody result sheet.
+
+    Args:
+        text (str): Text extracted from the page
+
+    Returns:
+        bool: True if the page carries a result sheet marker, or has no text
+            layer at all (a scan, which only the model can read)
+    """
+    text = text.strip().lower()
+    if not text:
+        return True
+    return any(marker in text for marker in RESULT_SHEET_MARKERS)
+
+
+def split_result_sheets(pdf_data: bytes) -> List[Tuple[int, bytes]]:
+    """
+    Split a PDF into single-page PDFs, keeping the pages that are InBody result sheets.
+
+    Cover pages, notes and other pages whose text has no result sheet marker
+    are skipped. If no page looks like a result sheet, every page is kept, so
+    an unusual layout is still sent to the model rather than dropped.
+
+    Args:
+        pdf_data (bytes): The PDF file contents
+
+    Returns:
+        list: (1-based page number, single-page PDF) pairs, in page order; a
+            one-page PDF is returned as is
+
+    Raises:
+        ValueError: If the file cannot be read as a PDF
+    """
+    try:
+        reader = PdfReader(io.BytesIO(pdf_data))
+        pages = list(reader.pages)
+    except Exception as e:
+        raise ValueError(f"Could not read PDF: {str(e)}") from e
+    if len(pages) <= 1:
+        return [(1, pdf_data)]
+
+    selected = []
+    for number, page in enumerate(pages, start=1):
+        try:
+            text = page.extract_text() or ''
+        except Exception as e:
+            logger.warning(f"Could not read the text of PDF page {number}: {str(e)}")
+            text = ''
+        if is_result_sheet(text):
+            selected.append(number)
+    if not selected:
+        logger.warning(f"No page of a {len(pages)}-page PDF looks like an InBody result sheet; keeping all")
+        selected = list(range(1, len(pages) + 1))
+    else:
+        logger.info(f"Found {len(selected)} result sheets in a {len(pages)}-page PDF")
+
+    sheets = []
+    for number in selected:
+        writer = PdfWriter()
+        writer.add_page(pages[number - 1])
+        output = io.BytesIO()
+        writer.write(output)
+        sheets.append((number, output.getvalue()))
+    return sheets
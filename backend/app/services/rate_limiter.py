@@ -0,0 +1,221 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-region budgets; 0 disables the corresponding limit
+GEMINI_RPM_PER_REGION = float(os.getenv("GEMINI_RPM_PER_REGION", "60"))
+GEMINI_TPM_PER_REGION = float(os.getenv("GEMINI_TPM_PER_REGION", "0"))
+GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS", "30"))
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request could not get budget on a region within the allowed wait."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float]):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.available = capacity
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """Return tokens taken for a request that was never sent."""
+        self._refill()
+        self.available = min(self.capacity, self.available + min(amount, self.capacity))
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the server reported the quota exhausted."""
+        self._refill()
+        self.available = 0.0
+
+
+class _RegionBudget:
+    """Request and token buckets for one region with a FIFO queue of waiters."""
+
+    def __init__(self, rpm: float, tpm: float, clock: Callable[[], float]):
+        self.requests = TokenBucket(rpm, rpm / 60, clock) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, tpm / 60, clock) if tpm > 0 else None
+        self.waiters = deque()
+        self.condition = threading.Condition()
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def time_until(self, tokens: float) -> float:
+        waits = [0.0]
+        if self.requests:
+            waits.append(self.requests.time_until(1))
+        if self.tokens:
+            waits.append(self.tokens.time_until(tokens))
+        return max(waits)
+
+    def consume(self, tokens: float) -> None:
+        if self.requests:
+            self.requests.consume(1)
+        if self.tokens:
+            self.tokens.consume(tokens)
+
+    def refund(self, tokens: float) -> None:
+        if self.requests:
+            self.requests.refund(1)
+        if self.tokens:
+            self.tokens.refund(tokens)
+
+
+class RegionRateLimiter:
+    """
+    Client-side limiter for Gemini requests.
+
+    Each region has a requests-per-minute and a tokens-per-minute bucket.
+    Callers queue in arrival order per region, so a large request at the head
+    of the queue is not starved by smaller ones behind it, and the time spent
+    waiting is recorded per region.
+    """
+
+    def __init__(
+        self,
+        regions: List[str],
+        rpm: float = GEMINI_RPM_PER_REGION,
+        tpm: float = GEMINI_TPM_PER_REGION,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            regions: Region names
+            rpm: Requests per minute per region (0 disables)
+            tpm: Tokens per minute per region (0 disables)
+            clock: Monotonic time source
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.clock = clock
+        self._budgets = {region: _RegionBudget(rpm, tpm, clock) for region in regions}
+
+    def acquire(self, region: str, tokens: float = 0, timeout: Optional[float] = None) -> float:
+        """
+        Wait for budget on a region and consume it.
+
+        Args:
+            region: The region to send the request to
+            tokens: Estimated tokens for the request
+            timeout: Maximum seconds to wait; None waits indefinitely
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If budget did not become available within the timeout
+        """
+        budget = self._budgets[region]
+        start = self.clock()
+        deadline = start + timeout if timeout is not None else None
+        ticket = object()
+
+        with budget.condition:
+            budget.waiters.append(ticket)
+            try:
+                while True:
+                    wait = None
+                    if budget.waiters[0] is ticket:
+                        wait = budget.time_until(tokens)
+                        if wait <= 0:
+                            budget.consume(tokens)
+                            break
+                    if deadline is not None:
+                        remaining = deadline - self.clock()
+                        if remaining <= 0:
+                            budget.timeouts += 1
+                            raise RateLimitTimeout(
+                                f"Region {region} rate limit: no budget within {timeout:.1f}s"
+                            )
+                        wait = remaining if wait is None else min(wait, remaining)
+                    budget.condition.wait(wait)
+            finally:
+                budget.waiters.remove(ticket)
+                budget.condition.notify_all()
+
+            waited = self.clock() - start
+            budget.acquired += 1
+            budget.total_wait += waited
+            budget.max_wait = max(budget.max_wait, waited)
+
+        if waited > 0.1:
+            logger.info(f"Waited {waited:.2f}s for rate limit budget on region {region}")
+        return waited
+
+    def refund(self, region: str, tokens: float = 0) -> None:
+        """
+        Give back budget acquired for a request that was not sent after all.
+
+        Args:
+            region: The region the budget was acquired on
+            tokens: The estimated tokens passed to acquire
+        """
+        budget = self._budgets[region]
+        with budget.condition:
+            budget.refund(tokens)
+            budget.acquired -= 1
+            budget.condition.notify_all()
+
+    def penalize(self, region: str) -> None:
+        """Drain a region's buckets after a quota error so callers back off smoothly."""
+        budget = self._budgets[region]
+        with budget.condition:
+            if budget.requests:
+                budget.requests.drain()
+            if budget.tokens:
+                budget.tokens.drain()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get limiter metrics per region.
+
+        Returns:
+            list: Budget availability, queue length and wait-time metrics per region
+        """
+        result = []
+        for region, budget in self._budgets.items():
+            with budget.condition:
+                result.append({
+                    "region": region,
+                    "rpm_limit": self.rpm or None,
+                    "tpm_limit": self.tpm or None,
+                    "requests_available": budget.requests.available if budget.requests else None,
+                    "tokens_available": budget.tokens.available if budget.tokens else None,
+                    "queued": len(budget.waiters),
+                    "acquired": budget.acquired,
+                    "timeouts": budget.timeouts,
+                    "total_wait_seconds": budget.total_wait,
+                    "mean_wait_seconds": budget.total_wait / budget.acquired if budget.acquired else 0.0,
+                    "max_wait_seconds": budget.max_wait,
+                })
+        return result
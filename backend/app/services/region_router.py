@@ -0,0 +1,242 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_ERROR_RATE = float(os.getenv("GEMINI_BREAKER_ERROR_RATE", "0.5"))
+GEMINI_BREAKER_MIN_REQUESTS = int(os.getenv("GEMINI_BREAKER_MIN_REQUESTS", "10"))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "60"))
+GEMINI_HEALTH_WINDOW_SECONDS = float(os.getenv("GEMINI_HEALTH_WINDOW_SECONDS", "300"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Weight of the newest sample in the latency moving average
+_LATENCY_ALPHA = 0.2
+
+
+class RegionHealth:
+    """Rolling latency, error and quota statistics plus circuit breaker state for one region."""
+
+    def __init__(self, region: str):
+        self.region = region
+        # (timestamp, succeeded, quota_error)
+        self.outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.state = STATE_CLOSED
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.last_error: Optional[str] = None
+
+    def prune(self, now: float, window: float) -> None:
+        """Drop outcomes older than the rolling window."""
+        while self.outcomes and now - self.outcomes[0][0] > window:
+            self.outcomes.popleft()
+
+    def counts(self) -> Tuple[int, int, int]:
+        """Return (requests, errors, quota errors) within the window."""
+        errors = sum(1 for _, ok, _ in self.outcomes if not ok)
+        quota_errors = sum(1 for _, _, quota in self.outcomes if quota)
+        return len(self.outcomes), errors, quota_errors
+
+    def error_rate(self) -> float:
+        requests, errors, _ = self.counts()
+        return errors / requests if requests else 0.0
+
+    def score(self) -> float:
+        """Lower is healthier: latency penalised by error and quota rates."""
+        requests, errors, quota_errors = self.counts()
+        latency = self.latency_ewma or 0.0
+        if not requests:
+            return latency
+        return latency * (1 + 4 * errors / requests) + 10 * quota_errors / requests
+
+
+class RegionRouter:
+    """
+    Routes Gemini requests to the healthiest region.
+
+    Tracks rolling latency, error rate and quota errors per region and keeps
+    a circuit breaker for each. A breaker opens after consecutive failures or
+    a high error rate, stays open for a cool-down, then lets a single trial
+    request through (half-open) to decide whether to close again. The policy
+    only depends on the recorded outcomes and an injectable clock, so it can be
+    exercised without any network access.
+    """
+
+    def __init__(
+        self,
+        regions: List[str],
+        failure_threshold: int = GEMINI_BREAKER_FAILURES,
+        error_rate_threshold: float = GEMINI_BREAKER_ERROR_RATE,
+        min_requests: int = GEMINI_BREAKER_MIN_REQUESTS,
+        cooldown_seconds: float = GEMINI_BREAKER_COOLDOWN_SECONDS,
+        window_seconds: float = GEMINI_HEALTH_WINDOW_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            regions: Regions in preference order, used to break ties
+            failure_threshold: Consecutive failures that open a breaker
+            error_rate_threshold: Windowed error rate that opens a breaker
+            min_requests: Requests needed in the window before the error rate is considered
+            cooldown_seconds: Time a breaker stays open before a trial request
+            window_seconds: Length of the rolling statistics window
+            clock: Monotonic time source
+        """
+        self.regions = list(regions)
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.cooldown_seconds = cooldown_seconds
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._health = {region: RegionHealth(region) for region in self.regions}
+        self._lock = threading.Lock()
+
+    def _refresh(self, health: RegionHealth, now: float) -> None:
+        """Expire old outcomes and move open breakers to half-open after the cool-down."""
+        health.prune(now, self.window_seconds)
+        if health.state == STATE_OPEN and now - health.opened_at >= self.cooldown_seconds:
+            health.state = STATE_HALF_OPEN
+            health.trial_in_flight = False
+            logger.info(f"Circuit for region {health.region} half-open")
+
+    def ordered_regions(self) -> List[str]:
+        """
+        Get the regions to try, healthiest first.
+
+        Regions with an open breaker are left out. If every breaker is open, the
+        region that opened first is returned alone so traffic keeps probing.
+
+        Returns:
+            list: Region names in the order they should be tried
+        """
+        now = self.clock()
+        with self._lock:
+            candidates = []
+            for index, region in enumerate(self.regions):
+                health = self._health[region]
+                self._refresh(health, now)
+                if health.state == STATE_CLOSED:
+                    candidates.append((health.score(), index, region))
+                elif health.state == STATE_HALF_OPEN and not health.trial_in_flight:
+                    # Only try a recovering region after the healthy ones
+                    candidates.append((float("inf"), index, region))
+
+            if candidates:
+                return [region for _, _, region in sorted(candidates)]
+
+            probe = min(self._health.values(), key=lambda health: health.opened_at or 0.0)
+            return [probe.region]
+
+    def begin(self, region: str) -> bool:
+        """
+        Reserve a request slot on a region.
+
+        Returns:
+            bool: False if the region is half-open and its trial request is already in flight
+        """
+        with self._lock:
+            health = self._health[region]
+            self._refresh(health, self.clock())
+            if health.state == STATE_HALF_OPEN:
+                if health.trial_in_flight:
+                    return False
+                health.trial_in_flight = True
+            return True
+
+    def release(self, region: str) -> None:
+        """
+        Give back a request slot without recording an outcome.
+
+        Used when a request ended for reasons that say nothing about the
+        region's health, such as a rejected request or a caller that went away.
+        """
+        with self._lock:
+            self._health[region].trial_in_flight = False
+
+    def record_success(self, region: str, latency: float) -> None:
+        """Record a successful request and its latency."""
+        now = self.clock()
+        with self._lock:
+            health = self._health[region]
+            health.outcomes.append((now, True, False))
+            health.prune(now, self.window_seconds)
+            if health.latency_ewma is None:
+                health.latency_ewma = latency
+            else:
+                health.latency_ewma = _LATENCY_ALPHA * latency + (1 - _LATENCY_ALPHA) * health.latency_ewma
+            health.consecutive_failures = 0
+            if health.state != STATE_CLOSED:
+                logger.info(f"Circuit for region {region} closed")
+            health.state = STATE_CLOSED
+            health.trial_in_flight = False
+
+    def record_failure(self, region: str, error: Exception, quota_error: bool = False) -> None:
+        """
+        Record a failed request, opening the region's breaker if thresholds are crossed.
+
+        Args:
+            region: The region that failed
+            error: The error raised
+            quota_error: Whether the failure was a quota (ResourceExhausted) error
+        """
+        now = self.clock()
+        with self._lock:
+            health = self._health[region]
+            health.outcomes.append((now, False, quota_error))
+            health.prune(now, self.window_seconds)
+            health.consecutive_failures += 1
+            health.last_error = str(error)
+            health.trial_in_flight = False
+
+            requests, _, _ = health.counts()
+            should_open = (
+                health.state == STATE_HALF_OPEN
+                or health.consecutive_failures >= self.failure_threshold
+                or (requests >= self.min_requests and health.error_rate() >= self.error_rate_threshold)
+            )
+            if should_open:
+                if health.state != STATE_OPEN:
+                    logger.warning(f"Circuit for region {region} opened: {str(error)}")
+                health.state = STATE_OPEN
+                health.opened_at = now
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get the current health of every region.
+
+        Returns:
+            list: One dictionary per region with breaker state and rolling statistics
+        """
+        now = self.clock()
+        with self._lock:
+            result = []
+            for region in self.regions:
+                health = self._health[region]
+                self._refresh(health, now)
+                requests, errors, quota_errors = health.counts()
+                result.append({
+                    "region": region,
+                    "state": health.state,
+                    "score": health.score(),
+                    "requests": requests,
+                    "errors": errors,
+                    "quota_errors": quota_errors,
+                    "error_rate": errors / requests if requests else 0.0,
+                    "latency_ewma_seconds": health.latency_ewma,
+                    "consecutive_failures": health.consecutive_failures,
+                    "open_for_seconds": now - health.opened_at if health.state == STATE_OPEN else None,
+                    "last_error": health.last_error,
+                })
+            return result
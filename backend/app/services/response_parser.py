@@ -0,0 +1,253 @@
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from ..schemas.measurement import MeasurementData
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Compiled once; validating through it skips the per-call model lookup
+_MEASUREMENT_ADAPTER = TypeAdapter(MeasurementData)
+
+_DECODER = json.JSONDecoder()
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _loads(text: str) -> Any:
+    """Decode a complete JSON document, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def repair_truncated(text: str, start: int = 0) -> Optional[Any]:
+    """
+    Recover the complete part of a JSON document cut off mid-way (e.g. at the output token limit).
+
+    The text is cut after the last complete value inside an object or array and
+    the open brackets are closed; a value that was being written when the
+    output stopped is dropped rather than guessed.
+
+    Args:
+        text (str): The model output
+        start (int): Index of the opening brace
+
+    Returns:
+        The decoded document, or None if nothing could be recovered
+    """
+    stack = []
+    in_string = escaped = False
+    # (cut position, closers needed there) of the last place the document could end
+    cut = None
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            cut = (i + 1, stack[::-1])
+        elif char in '}]':
+            if not stack or stack.pop() != char:
+                return None
+            if not stack:
+                # Complete after all; the caller's decoder rejected it for another reason
+                return None
+            cut = (i + 1, stack[::-1])
+        elif char == ',' and stack:
+            cut = (i, stack[::-1])
+
+    if cut is None:
+        return None
+    position, closers = cut
+    try:
+        return json.loads(text[start:position] + ''.join(closers))
+    except json.JSONDecodeError:
+        return None
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """
+    Decode the JSON object in a model response.
+
+    Tries, in order: the whole response (the usual case with a native response
+    schema), the first object in surrounding text such as markdown fences, and
+    the complete part of a truncated object.
+
+    Args:
+        text (str): The raw model response
+
+    Returns:
+        dict: The decoded object
+
+    Raises:
+        ValueError: If no JSON object can be recovered from the response
+    """
+    try:
+        result = _loads(text)
+    except ValueError:
+        result = None
+        start = text.find('{')
+        if start == -1:
+            raise ValueError("Could not extract valid JSON from response")
+        logger.warning("Response is not valid JSON, attempting to extract JSON from text")
+        try:
+            # Stops at the end of the object, unlike a greedy regex over the whole text
+            result, _ = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            result = repair_truncated(text, start)
+            if result is None:
+                raise ValueError("Could not extract valid JSON from response")
+            logger.warning("Recovered the complete part of a truncated response")
+
+    if not isinstance(result, dict):
+        raise ValueError(f"Expected a JSON object, got {type(result).__name__}")
+    return result
+
+
+class SectionStream:
+    """
+    Incremental parser that reports the top-level members of a streamed JSON object as they complete.
+
+    Feed it the chunks of a model response in order; each call returns the
+    (name, value) pairs whose value finished in that chunk. Text before the
+    opening brace (e.g. a markdown fence) is skipped.
+    """
+
+    def __init__(self):
+        """Initialize an empty stream."""
+        self._text = ''
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Start of the member being read, just after the opening brace or a comma
+        self._member_start = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next chunk of the response.
+
+        Args:
+            chunk (str): Text generated since the previous call
+
+        Returns:
+            list: (name, value) pairs of the members completed by this chunk
+        """
+        self._text += chunk
+        text = self._text
+        completed = []
+        while self._position < len(text) and not self._done:
+            i = self._position
+            char = text[i]
+            self._position += 1
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._member_start = i + 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._decode_member(text, i))
+                    self._done = True
+                elif self._depth == 1:
+                    # An object or array value is complete without waiting for the next comma
+                    completed.extend(self._decode_member(text, i + 1))
+            elif char == ',' and self._depth == 1:
+                completed.extend(self._decode_member(text, i))
+                self._member_start = i + 1
+        return completed
+
+    def _decode_member(self, text: str, end: int) -> List[Tuple[str, Any]]:
+        """Decode the member that started at _member_start and ends at end, once."""
+        if self._member_start is None:
+            return []
+        member = text[self._member_start:end]
+        self._member_start = None
+        if not member.strip():
+            return []
+        try:
+            return list(_loads('{' + member + '}').items())
+        except ValueError:
+            logger.warning("Skipping a streamed member that is not valid JSON")
+            return []
+
+
+def apply_defaults(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill in required fields the model left missing or empty.
+
+    Args:
+        result (dict): The decoded measurement data
+
+    Returns:
+        dict: The same dictionary with defaults applied
+    """
+    basic = result.get('informacoes_basicas') or {}
+    if not basic.get('nome'):
+        basic['nome'] = "Unknown Patient"
+    if not basic.get('id'):
+        basic['id'] = f"ID-{int(time.time())}"
+    if not basic.get('data_exame'):
+        basic['data_exame'] = datetime.now().isoformat()
+    result['informacoes_basicas'] = basic
+
+    if result.get('composicao_corporal') is None:
+        result['composicao_corporal'] = {
+            'peso': 70.0,
+            'massa_gordura': 15.0,
+            'massa_muscular_esqueletica': 30.0
+        }
+    if result.get('indices_corporais') is None:
+        result['indices_corporais'] = {
+            'imc': 24.0,
+            'pgc': 20.0
+        }
+    return result
+
+
+def parse_measurement(text: str) -> Dict[str, Any]:
+    """
+    Turn a raw model response into validated measurement data.
+
+    Args:
+        text (str): The raw model response
+
+    Returns:
+        dict: Measurement data with defaults applied
+
+    Raises:
+        ValueError: If no JSON object can be recovered from the response
+        ValidationError: If the data does not match the MeasurementData schema
+    """
+    result = apply_defaults(extract_json(text))
+    _MEASUREMENT_ADAPTER.validate_python(result)
+    return result
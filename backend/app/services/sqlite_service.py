@@ -0,0 +1,738 @@
+import os
+import json
+import uuid
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.pagination import encode_cursor, decode_cursor
+from .derived_metrics import DERIVED_FIELD, DERIVED_WINDOW, compute_derived
+from .storage_backend import (
+    DEDUP_MODE,
+    DELETED_RETENTION_DAYS,
+    MeasurementConflictError,
+    MeasurementExistsError,
+    MeasurementNotFoundError,
+    BATCH_WRITE_LIMIT,
+    EXAM_TIMESTAMP_FIELD,
+    MeasurementStore,
+    build_patient_summary,
+    deep_merge,
+    measurement_key,
+    new_measurement_id,
+    patient_id_of,
+    stamp_exam_timestamp
+)
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "measurements.sqlite3")
+
+# Top-level fields stored as ISO strings and turned back into datetimes on read
+_DATETIME_FIELDS = ('timestamp', 'updated_at', EXAM_TIMESTAMP_FIELD)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _utc_text(value: datetime) -> str:
+    """Format a datetime as a fixed-width UTC string, so text order matches time order."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _position_of(measurement_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[datetime]]:
+    """Where a measurement sits in its patient's history: (patient ID, exam time)."""
+    return patient_id_of(measurement_data), measurement_data.get(EXAM_TIMESTAMP_FIELD)
+
+
+def _make_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _parse_etag(etag: str) -> int:
+    value = etag.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError as e:
+        raise MeasurementConflictError(f"ETag {etag} does not match") from e
+
+
+class SQLiteService(MeasurementStore):
+    """
+    Local measurement store on SQLite.
+
+    Each measurement is one row with the document as a JSON column. Patient ID,
+    exam time and change time are copied into indexed columns on write, so
+    listings and per-patient lookups never parse JSON. Each storage worker
+    thread keeps its own connection; WAL mode lets reads proceed while a write
+    is in progress.
+    """
+
+    def __init__(self, db_path: str = SQLITE_PATH):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS measurements (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                patient_id TEXT,
+                exam_timestamp TEXT,
+                updated_at TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
+            )
+            """
+        )
+        # Databases created before exam_timestamp existed ordered by the raw exam date;
+        # the new column is filled by scripts/backfill_exam_timestamps.py
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(measurements)")}
+        if 'exam_timestamp' not in columns:
+            conn.execute("ALTER TABLE measurements ADD COLUMN exam_timestamp TEXT")
+        conn.execute("DROP INDEX IF EXISTS idx_measurements_patient")
+        conn.execute("DROP INDEX IF EXISTS idx_measurements_data_exame")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_measurements_patient_exam ON measurements (patient_id, exam_timestamp)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_measurements_exam ON measurements (exam_timestamp, id)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_measurements_updated_at ON measurements (updated_at, id)"
+        )
+        # Tombstones of deleted measurements, for incremental sync
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS deleted_measurements (id TEXT PRIMARY KEY, deleted_at TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_deleted_measurements_deleted_at ON deleted_measurements (deleted_at)"
+        )
+        # Listings leave out rows without exam_timestamp, so stamp them before serving any
+        if conn.execute("SELECT 1 FROM measurements WHERE exam_timestamp IS NULL LIMIT 1").fetchone():
+            logger.info("Backfilling exam_timestamp on measurements saved before it existed")
+            start_after = None
+            while True:
+                _, start_after = self.backfill_exam_timestamps(start_after)
+                if start_after is None:
+                    break
+        logger.info(f"Initialized SQLite storage at: {self.db_path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get the calling thread's autocommit connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction on the calling thread's connection."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _row_values(doc_id: str, data: Dict[str, Any], version: int) -> Tuple:
+        """Serialize a document and extract its indexed columns."""
+        exam_timestamp = data.get(EXAM_TIMESTAMP_FIELD)
+        return (
+            doc_id,
+            json.dumps(data, default=_json_default),
+            patient_id_of(data),
+            _utc_text(exam_timestamp) if exam_timestamp is not None else None,
+            _utc_text(data['updated_at']),
+            version,
+        )
+
+    @staticmethod
+    def _to_measurement(row: sqlite3.Row) -> Dict[str, Any]:
+        data = json.loads(row['data'])
+        for field in _DATETIME_FIELDS:
+            if isinstance(data.get(field), str):
+                try:
+                    data[field] = datetime.fromisoformat(data[field])
+                except ValueError:
+                    pass
+        data['id'] = row['id']
+        return data
+
+    def _write(self, conn: sqlite3.Connection, doc_id: str, data: Dict[str, Any], version: int) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO measurements (id, data, patient_id, exam_timestamp, updated_at, version) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self._row_values(doc_id, data, version),
+        )
+
+    def _refresh_derived(self, conn: sqlite3.Connection, positions) -> None:
+        """
+        Recompute derived data around measurements that changed.
+
+        Runs inside the caller's write transaction. Like the Firestore backend,
+        only the rows whose derived data can depend on a changed position are
+        read: from DERIVED_WINDOW before the earliest to DERIVED_WINDOW after
+        the latest, plus one on either side. Only the rows whose derived data
+        changed are rewritten.
+
+        Args:
+            conn: Connection with an open transaction
+            positions (iterable): (patient ID, exam time) pairs where a measurement was
+                written, moved or removed. A None exam time rebuilds the whole history;
+                None patient IDs are ignored.
+        """
+        exam_times = {}
+        for patient_id, exam_time in positions:
+            if patient_id:
+                exam_times.setdefault(patient_id, []).append(exam_time)
+
+        now = datetime.now(timezone.utc)
+        for patient_id, times in exam_times.items():
+            columns = "SELECT id, data, version, exam_timestamp FROM measurements WHERE patient_id = ? "
+            if any(exam_time is None for exam_time in times):
+                first_changed = None
+                rows = conn.execute(
+                    columns + "AND exam_timestamp IS NOT NULL ORDER BY exam_timestamp, id", (patient_id,)
+                ).fetchall()
+            else:
+                first_changed = _utc_text(min(times))
+                lower, upper = _utc_text(min(times) - DERIVED_WINDOW), _utc_text(max(times) + DERIVED_WINDOW)
+                rows = conn.execute(
+                    columns + "AND exam_timestamp < ? ORDER BY exam_timestamp DESC, id DESC LIMIT 1",
+                    (patient_id, lower),
+                ).fetchall()
+                rows += conn.execute(
+                    columns + "AND exam_timestamp BETWEEN ? AND ? ORDER BY exam_timestamp, id",
+                    (patient_id, lower, upper),
+                ).fetchall()
+                rows += conn.execute(
+                    columns + "AND exam_timestamp > ? ORDER BY exam_timestamp, id LIMIT 1",
+                    (patient_id, upper),
+                ).fetchall()
+            history = [self._to_measurement(row) for row in rows]
+            for row, data, derived in zip(rows, history, compute_derived(history)):
+                # Earlier measurements are only read as context; their own windows are incomplete
+                if first_changed is not None and row['exam_timestamp'] < first_changed:
+                    continue
+                if data.get(DERIVED_FIELD) != derived:
+                    data[DERIVED_FIELD] = derived
+                    data['updated_at'] = now
+                    self._write(conn, row['id'], data, row['version'] + 1)
+
+    @staticmethod
+    def _record_deletion(conn: sqlite3.Connection, doc_id: str) -> None:
+        """Leave a tombstone for a deleted measurement, dropping those past DELETED_RETENTION_DAYS."""
+        now = datetime.now(timezone.utc)
+        conn.execute(
+            "INSERT OR REPLACE INTO deleted_measurements (id, deleted_at) VALUES (?, ?)",
+            (doc_id, _utc_text(now)),
+        )
+        conn.execute(
+            "DELETE FROM deleted_measurements WHERE deleted_at < ?",
+            (_utc_text(now - timedelta(days=DELETED_RETENTION_DAYS)),),
+        )
+
+    @staticmethod
+    def _exam_range(exam_from: Optional[datetime], exam_to: Optional[datetime]) -> Tuple[List[str], List[str]]:
+        """Build WHERE clauses for an inclusive exam time range."""
+        where, params = ["exam_timestamp IS NOT NULL"], []
+        if exam_from is not None:
+            where.append("exam_timestamp >= ?")
+            params.append(_utc_text(exam_from))
+        if exam_to is not None:
+            where.append("exam_timestamp <= ?")
+            params.append(_utc_text(exam_to))
+        return where, params
+
+    @staticmethod
+    def _stamp(measurement_data: Dict[str, Any]) -> None:
+        if 'timestamp' not in measurement_data:
+            measurement_data['timestamp'] = datetime.now()
+        measurement_data['updated_at'] = datetime.now(timezone.utc)
+        stamp_exam_timestamp(measurement_data)
+
+    def _insert(self, conn: sqlite3.Connection, measurement_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Write a new measurement under its key, following DEDUP_MODE if the key is taken.
+
+        Returns:
+            str: The document ID, or None if it duplicates a stored measurement and DEDUP_MODE is 'reject'
+        """
+        key = new_measurement_id(measurement_data)
+        if key is None:
+            doc_id = uuid.uuid4().hex
+            self._write(conn, doc_id, measurement_data, 1)
+            return doc_id
+        row = conn.execute("SELECT id, data, version FROM measurements WHERE id = ?", (key,)).fetchone()
+        if row is None:
+            self._write(conn, key, measurement_data, 1)
+        elif DEDUP_MODE == 'reject':
+            return None
+        else:
+            self._write(conn, key, deep_merge(self._to_measurement(row), measurement_data), row['version'] + 1)
+        return key
+
+    def save_measurement(self, measurement_data, doc_id=None):
+        """
+        Save measurement data.
+
+        Args:
+            measurement_data (dict): The measurement data to save
+            doc_id (str, optional): The document ID to update. If None, a new document is created
+                under the measurement's key (see DEDUP_MODE).
+
+        Returns:
+            str: The document ID of the saved measurement
+
+        Raises:
+            MeasurementExistsError: If DEDUP_MODE is 'reject' and the scan is already stored
+        """
+        try:
+            self._stamp(measurement_data)
+            with self._transaction() as conn:
+                if doc_id:
+                    row = conn.execute(
+                        "SELECT id, data, version FROM measurements WHERE id = ?", (doc_id,)
+                    ).fetchone()
+                    data, version, previous_position = measurement_data, 1, (None, None)
+                    if row is not None:
+                        previous = self._to_measurement(row)
+                        previous_position = _position_of(previous)
+                        data = deep_merge(previous, measurement_data)
+                        version = row['version'] + 1
+                    self._write(conn, doc_id, data, version)
+                    self._refresh_derived(conn, [_position_of(data), previous_position])
+                    logger.info(f"Updated measurement with ID: {doc_id}")
+                else:
+                    doc_id = self._insert(conn, measurement_data)
+                    if doc_id is None:
+                        raise MeasurementExistsError(new_measurement_id(measurement_data))
+                    self._refresh_derived(conn, [_position_of(measurement_data)])
+                    logger.info(f"Saved new measurement with ID: {doc_id}")
+            return doc_id
+        except MeasurementExistsError:
+            raise
+        except Exception as e:
+            logger.error(f"Error saving measurement: {str(e)}")
+            raise
+
+    def save_measurements_batch(self, measurements):
+        """
+        Save many new measurements in one transaction.
+
+        Args:
+            measurements (list): Measurement data dictionaries to save
+
+        Returns:
+            list: The document IDs of the saved measurements, in input order;
+                None for duplicates rejected in DEDUP_MODE=reject
+        """
+        try:
+            with self._transaction() as conn:
+                doc_ids = []
+                for measurement_data in measurements:
+                    self._stamp(measurement_data)
+                    doc_ids.append(self._insert(conn, measurement_data))
+                self._refresh_derived(conn, [_position_of(measurement_data) for measurement_data in measurements])
+            logger.info(f"Saved {sum(1 for doc_id in doc_ids if doc_id)} measurements in batches")
+            return doc_ids
+        except Exception as e:
+            logger.error(f"Error saving measurement batch: {str(e)}")
+            raise
+
+    def upsert_measurements(self, measurements):
+        """
+        Save many measurements in one transaction, deduplicating on the measurement key.
+
+        Each measurement is stored under measurement_key, like uploads, so an
+        imported scan and an uploaded copy of it end up in the same row.
+        Exam dates without a time of day are keyed on the date, so importing
+        the same export again updates its records instead of duplicating them.
+
+        Args:
+            measurements (list): Measurement data dictionaries, each with a patient ID and exam date
+
+        Returns:
+            list: (document ID, whether it was created) for each measurement, in input order
+        """
+        try:
+            results, positions = [], []
+            with self._transaction() as conn:
+                for measurement_data in measurements:
+                    measurement_data['updated_at'] = datetime.now(timezone.utc)
+                    stamp_exam_timestamp(measurement_data)
+                    key = measurement_key(measurement_data, allow_date_only=True)
+                    row = conn.execute(
+                        "SELECT id, data, version FROM measurements WHERE id = ?", (key,)
+                    ).fetchone() if key else None
+                    positions.append(_position_of(measurement_data))
+                    if row is not None:
+                        previous = self._to_measurement(row)
+                        positions.append(_position_of(previous))
+                        data = deep_merge(previous, measurement_data)
+                        self._write(conn, row['id'], data, row['version'] + 1)
+                        results.append((row['id'], False))
+                    else:
+                        if 'timestamp' not in measurement_data:
+                            measurement_data['timestamp'] = datetime.now()
+                        doc_id = key or uuid.uuid4().hex
+                        self._write(conn, doc_id, measurement_data, 1)
+                        results.append((doc_id, True))
+                self._refresh_derived(conn, positions)
+            logger.info(f"Upserted {len(results)} measurements")
+            return results
+        except Exception as e:
+            logger.error(f"Error upserting measurements: {str(e)}")
+            raise
+
+    def consolidate_measurements(self, doc_id, measurement_data, duplicate_ids):
+        """
+        Replace duplicates with one measurement in one transaction.
+
+        Args:
+            doc_id (str): The document ID to store the measurement under
+            measurement_data (dict): The consolidated measurement
+            duplicate_ids (list): Document IDs to delete
+        """
+        try:
+            with self._transaction() as conn:
+                positions = []
+                for duplicate_id in duplicate_ids:
+                    row = conn.execute(
+                        "SELECT data FROM measurements WHERE id = ?", (duplicate_id,)
+                    ).fetchone()
+                    if row is not None:
+                        positions.append(_position_of(self._to_measurement(row)))
+                        conn.execute("DELETE FROM measurements WHERE id = ?", (duplicate_id,))
+                        self._record_deletion(conn, duplicate_id)
+                row = conn.execute("SELECT version FROM measurements WHERE id = ?", (doc_id,)).fetchone()
+                measurement_data['updated_at'] = datetime.now(timezone.utc)
+                self._write(conn, doc_id, measurement_data, row['version'] + 1 if row else 1)
+                self._refresh_derived(conn, positions + [_position_of(measurement_data)])
+            logger.info(f"Consolidated {len(duplicate_ids)} duplicates into measurement {doc_id}")
+        except Exception as e:
+            logger.error(f"Error consolidating measurement {doc_id}: {str(e)}")
+            raise
+
+    def get_all_measurements(self):
+        """
+        Get all measurements, ordered by date.
+
+        Returns:
+            list: List of measurement dictionaries
+        """
+        try:
+            rows = self._conn().execute(
+                "SELECT id, data FROM measurements WHERE exam_timestamp IS NOT NULL ORDER BY exam_timestamp, id"
+            ).fetchall()
+            measurements = [self._to_measurement(row) for row in rows]
+            logger.info(f"Retrieved {len(measurements)} measurements")
+            return measurements
+        except Exception as e:
+            logger.error(f"Error getting measurements: {str(e)}")
+            raise
+
+    def list_measurements(self, page_size: int, cursor: Optional[str] = None,
+                          since: Optional[datetime] = None, exam_from: Optional[datetime] = None,
+                          exam_to: Optional[datetime] = None, use_cache: bool = True):
+        """
+        Get one page of measurements.
+
+        Args:
+            page_size (int): Maximum number of measurements to return
+            cursor (str, optional): Cursor returned with the previous page
+            since (datetime, optional): Only return documents updated after this time
+            exam_from (datetime, optional): Earliest exam time to return
+            exam_to (datetime, optional): Latest exam time to return
+            use_cache (bool): Accepted for compatibility; SQLite pages are never cached
+
+        Returns:
+            tuple: (list of measurement dictionaries, next cursor or None if this is the last page)
+
+        Raises:
+            ValueError: If the cursor is invalid or an exam range is combined with `since`
+        """
+        if since is not None and (exam_from is not None or exam_to is not None):
+            raise ValueError("exam_from/exam_to cannot be combined with since")
+        try:
+            # Same documents and order as the Firestore queries
+            if since is not None:
+                order_column = 'updated_at'
+                where, params = ["updated_at > ?"], [_utc_text(since)]
+            else:
+                order_column = 'exam_timestamp'
+                where, params = self._exam_range(exam_from, exam_to)
+
+            if cursor:
+                value, last_id = decode_cursor(cursor)
+                if isinstance(value, datetime):
+                    value = _utc_text(value)
+                where.append(f"({order_column}, id) > (?, ?)")
+                params.extend([value, last_id])
+
+            # Fetch one extra row to know whether there is a next page
+            rows = self._conn().execute(
+                f"SELECT id, data, {order_column} AS position FROM measurements "
+                f"WHERE {' AND '.join(where)} ORDER BY {order_column}, id LIMIT ?",
+                (*params, page_size + 1),
+            ).fetchall()
+
+            measurements = [self._to_measurement(row) for row in rows[:page_size]]
+            next_cursor = None
+            if len(rows) > page_size:
+                last = rows[page_size - 1]
+                next_cursor = encode_cursor(last['position'], last['id'])
+
+            logger.info(f"Retrieved page of {len(measurements)} measurements")
+            return measurements, next_cursor
+        except Exception as e:
+            logger.error(f"Error listing measurements: {str(e)}")
+            raise
+
+    def get_patient_measurements(self, patient_id, exam_from: Optional[datetime] = None,
+                                 exam_to: Optional[datetime] = None):
+        """
+        Get one patient's measurements, ordered by exam time.
+
+        Args:
+            patient_id (str): The patient ID (informacoes_basicas.id)
+            exam_from (datetime, optional): Earliest exam time to return
+            exam_to (datetime, optional): Latest exam time to return
+
+        Returns:
+            list: List of measurement dictionaries, empty if the patient is unknown
+        """
+        try:
+            where, params = self._exam_range(exam_from, exam_to)
+            rows = self._conn().execute(
+                f"SELECT id, data FROM measurements WHERE patient_id = ? AND {' AND '.join(where)} "
+                "ORDER BY exam_timestamp, id",
+                (patient_id, *params),
+            ).fetchall()
+            measurements = [self._to_measurement(row) for row in rows]
+            logger.info(f"Retrieved {len(measurements)} measurements for patient {patient_id}")
+            return measurements
+        except Exception as e:
+            logger.error(f"Error getting measurements for patient {patient_id}: {str(e)}")
+            raise
+
+    def list_patients(self):
+        """
+        Get every patient with a summary of their latest measurement.
+
+        Grouping walks the (patient_id, exam_timestamp) index; with MAX() SQLite
+        returns the other columns from the row holding the maximum, i.e. the
+        latest measurement.
+
+        Returns:
+            list: Patient summaries ordered by patient ID
+        """
+        try:
+            rows = self._conn().execute(
+                "SELECT id, data, MAX(exam_timestamp) AS latest, COUNT(*) AS measurement_count "
+                "FROM measurements WHERE patient_id IS NOT NULL AND exam_timestamp IS NOT NULL "
+                "GROUP BY patient_id ORDER BY patient_id"
+            ).fetchall()
+            patients = [build_patient_summary(self._to_measurement(row), row['measurement_count']) for row in rows]
+            logger.info(f"Retrieved {len(patients)} patients")
+            return patients
+        except Exception as e:
+            logger.error(f"Error listing patients: {str(e)}")
+            raise
+
+    def backfill_exam_timestamps(self, start_after: Optional[str] = None, limit: int = BATCH_WRITE_LIMIT):
+        """
+        Derive exam_timestamp for one batch of existing measurements.
+
+        Args:
+            start_after (str, optional): Last document ID handled by the previous batch
+            limit (int): Number of documents to scan
+
+        Returns:
+            tuple: (documents updated, last document ID scanned or None when there are no more)
+        """
+        try:
+            with self._transaction() as conn:
+                rows = conn.execute(
+                    "SELECT id, data, version FROM measurements WHERE id > ? ORDER BY id LIMIT ?",
+                    (start_after or "", limit),
+                ).fetchall()
+                if not rows:
+                    return 0, None
+                updated, positions = 0, []
+                for row in rows:
+                    data = self._to_measurement(row)
+                    current = data.get(EXAM_TIMESTAMP_FIELD)
+                    stamp_exam_timestamp(data)
+                    if data.get(EXAM_TIMESTAMP_FIELD) is not None and data.get(EXAM_TIMESTAMP_FIELD) != current:
+                        data['updated_at'] = datetime.now(timezone.utc)
+                        self._write(conn, row['id'], data, row['version'] + 1)
+                        positions.append(_position_of(data))
+                        if current is not None:
+                            positions.append((patient_id_of(data), current))
+                        updated += 1
+                self._refresh_derived(conn, positions)
+            logger.info(f"Backfilled exam_timestamp on {updated} of {len(rows)} measurements")
+            return updated, rows[-1]['id']
+        except Exception as e:
+            logger.error(f"Error backfilling exam timestamps: {str(e)}")
+            raise
+
+    def get_measurement_with_etag(self, doc_id):
+        """
+        Get a specific measurement by ID together with its version.
+
+        Args:
+            doc_id (str): The document ID
+
+        Returns:
+            tuple: (measurement data, ETag), or (None, None) if not found
+        """
+        try:
+            row = self._conn().execute(
+                "SELECT id, data, version FROM measurements WHERE id = ?", (doc_id,)
+            ).fetchone()
+            if row is None:
+                logger.warning(f"Measurement with ID {doc_id} not found")
+                return None, None
+            return self._to_measurement(row), _make_etag(row['version'])
+        except Exception as e:
+            logger.error(f"Error getting measurement {doc_id}: {str(e)}")
+            raise
+
+    def update_measurement(self, doc_id, measurement_data, if_match: Optional[str] = None):
+        """
+        Merge fields into an existing measurement.
+
+        Args:
+            doc_id (str): The document ID
+            measurement_data (dict): The fields to update
+            if_match (str, optional): ETag the stored document must still have
+
+        Returns:
+            str: The ETag of the updated document
+
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
+        """
+        try:
+            expected = _parse_etag(if_match) if if_match else None
+            measurement_data['updated_at'] = datetime.now(timezone.utc)
+            stamp_exam_timestamp(measurement_data, partial=True)
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT id, data, version FROM measurements WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None:
+                    raise MeasurementNotFoundError(f"Measurement with ID {doc_id} not found")
+                if expected is not None and expected != row['version']:
+                    raise MeasurementConflictError(f"Measurement {doc_id} was modified by another request")
+                previous = self._to_measurement(row)
+                data = deep_merge(previous, measurement_data)
+                self._write(conn, doc_id, data, row['version'] + 1)
+                self._refresh_derived(conn, [_position_of(data), _position_of(previous)])
+                # Rewriting the derived data may have bumped the version again
+                version = conn.execute("SELECT version FROM measurements WHERE id = ?", (doc_id,)).fetchone()[0]
+            logger.info(f"Updated measurement with ID: {doc_id}")
+            return _make_etag(version)
+        except (MeasurementNotFoundError, MeasurementConflictError):
+            raise
+        except Exception as e:
+            logger.error(f"Error updating measurement {doc_id}: {str(e)}")
+            raise
+
+    def delete_measurement(self, doc_id, if_match: Optional[str] = None):
+        """
+        Delete a measurement by ID.
+
+        Args:
+            doc_id (str): The document ID
+            if_match (str, optional): ETag the stored document must still have
+
+        Returns:
+            bool: True if deleted successfully
+
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
+        """
+        try:
+            expected = _parse_etag(if_match) if if_match else None
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT patient_id, exam_timestamp, version FROM measurements WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None:
+                    raise MeasurementNotFoundError(f"Measurement with ID {doc_id} not found")
+                if expected is not None and expected != row['version']:
+                    raise MeasurementConflictError(
+                        f"Measurement {doc_id} was modified or deleted by another request"
+                    )
+                conn.execute("DELETE FROM measurements WHERE id = ?", (doc_id,))
+                self._record_deletion(conn, doc_id)
+                exam_time = datetime.fromisoformat(row['exam_timestamp']) if row['exam_timestamp'] else None
+                self._refresh_derived(conn, [(row['patient_id'], exam_time)])
+            logger.info(f"Deleted measurement with ID: {doc_id}")
+            return True
+        except (MeasurementNotFoundError, MeasurementConflictError):
+            raise
+        except Exception as e:
+            logger.error(f"Error deleting measurement {doc_id}: {str(e)}")
+            raise
+
+    def list_deleted_ids(self, since: datetime):
+        """
+        Get the IDs of measurements deleted after a time, for incremental sync.
+
+        Args:
+            since (datetime): Only return deletions after this time
+
+        Returns:
+            list: Measurement IDs, oldest deletion first
+        """
+        try:
+            rows = self._conn().execute(
+                "SELECT id FROM deleted_measurements WHERE deleted_at > ? ORDER BY deleted_at, id",
+                (_utc_text(since),),
+            ).fetchall()
+            return [row['id'] for row in rows]
+        except Exception as e:
+            logger.error(f"Error listing deleted measurements: {str(e)}")
+            raise
+
+    def close(self):
+        """Close every worker thread's connection."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
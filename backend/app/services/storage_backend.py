@@ -0,0 +1,364 @@
+import os
+import re
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.date_utils import has_time_of_day, parse_exam_date
+
+logger = logging.getLogger(__name__)
+
+# Which MeasurementStore implementation get_storage_service returns
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore").lower()
+
+# Maximum number of writes committed together (Firestore's batch limit)
+BATCH_WRITE_LIMIT = 500
+
+# Typed exam time derived from informacoes_basicas.data_exame on write; measurements are listed by it
+EXAM_TIMESTAMP_FIELD = 'exam_timestamp'
+ORDER_FIELD = EXAM_TIMESTAMP_FIELD
+
+# Field identifying the patient a measurement belongs to
+PATIENT_FIELD = 'informacoes_basicas.id'
+
+# What saving a measurement that is already stored does: 'upsert' merges it into the stored one,
+# 'reject' raises MeasurementExistsError, 'off' stores a duplicate under a random ID
+DEDUP_MODE = os.getenv("DEDUP_MODE", "upsert").lower()
+
+# How long deleted measurements are remembered for incremental sync (see list_deleted_ids)
+DELETED_RETENTION_DAYS = int(os.getenv("DELETED_RETENTION_DAYS", "90"))
+
+
+class MeasurementNotFoundError(Exception):
+    """Raised when a conditional write targets a measurement that does not exist."""
+
+
+class MeasurementConflictError(Exception):
+    """Raised when a conditional write's If-Match version no longer matches the stored one."""
+
+
+class MeasurementExistsError(Exception):
+    """Raised in DEDUP_MODE=reject when a new measurement duplicates a stored one."""
+
+    def __init__(self, doc_id: str):
+        super().__init__(f"Measurement already stored with ID {doc_id}")
+        self.doc_id = doc_id
+
+
+def deep_merge(base: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge nested maps the way Firestore's set(merge=True) does, without changing either input."""
+    merged = dict(base)
+    for key, value in updates.items():
+        if isinstance(value, dict) and value and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def patient_id_of(measurement_data: Dict[str, Any]) -> Optional[str]:
+    """Get the patient ID of a measurement, if it has one."""
+    patient_id = (measurement_data.get('informacoes_basicas') or {}).get('id')
+    return str(patient_id) if patient_id is not None else None
+
+
+def measurement_key(measurement_data: Dict[str, Any], allow_date_only: bool = False) -> Optional[str]:
+    """
+    Build the stable document ID of a scan from what identifies it.
+
+    The key hashes the patient ID, the exam time normalised to UTC and the
+    device model (case, spaces and punctuation ignored), so uploading the
+    same scan again yields the same ID. An exam date without a time of day
+    does not identify an uploaded scan (a patient may be scanned twice that
+    day), so by default such measurements get no key and are never
+    deduplicated. Imports pass allow_date_only, since export files are
+    usually date-only and re-importing one must not duplicate every row;
+    their records are then keyed on the patient, date and model.
+
+    Args:
+        measurement_data (dict): The measurement
+        allow_date_only (bool): Also key exam dates without a time of day
+
+    Returns:
+        str: The document ID, or None without a patient ID or a usable exam date
+    """
+    patient_id = patient_id_of(measurement_data)
+    exam_date = (measurement_data.get('informacoes_basicas') or {}).get('data_exame')
+    exam_time = parse_exam_date(exam_date)
+    if patient_id is None or exam_time is None:
+        return None
+    if not allow_date_only and not has_time_of_day(exam_date):
+        return None
+    model = re.sub(r'[^0-9a-z]', '', str(measurement_data.get('modelo_inbody') or '').lower())
+    return hashlib.sha1(f"{patient_id}\x1f{exam_time.isoformat()}\x1f{model}".encode()).hexdigest()
+
+
+def new_measurement_id(measurement_data: Dict[str, Any]) -> Optional[str]:
+    """The document ID for a new measurement: its key, or None for a random ID (DEDUP_MODE=off or no key)."""
+    return measurement_key(measurement_data) if DEDUP_MODE != 'off' else None
+
+
+def stamp_exam_timestamp(measurement_data: Dict[str, Any], partial: bool = False) -> None:
+    """
+    Set the typed exam timestamp from the free-form exam date.
+
+    Measurements whose exam date is missing or cannot be parsed fall back to
+    their creation timestamp so they still appear in date-ordered listings,
+    which leave out documents without exam_timestamp. Partial updates without
+    an exam date leave the stored value alone.
+
+    Args:
+        measurement_data (dict): The measurement about to be written
+        partial (bool): measurement_data only holds the fields being updated
+    """
+    basic = measurement_data.get('informacoes_basicas')
+    if partial and (not isinstance(basic, dict) or 'data_exame' not in basic):
+        return
+    exam_date = basic.get('data_exame') if isinstance(basic, dict) else None
+    exam_timestamp = parse_exam_date(exam_date) or parse_exam_date(measurement_data.get('timestamp'))
+    if exam_timestamp is not None:
+        measurement_data[EXAM_TIMESTAMP_FIELD] = exam_timestamp
+
+
+def build_patient_summary(latest: Dict[str, Any], measurement_count: int) -> Dict[str, Any]:
+    """
+    Summarise a patient from their most recent measurement.
+
+    Args:
+        latest (dict): The patient's latest measurement, including 'id'
+        measurement_count (int): Number of measurements the patient has
+
+    Returns:
+        dict: Patient summary matching schemas.patient.PatientSummary
+    """
+    basic = latest.get('informacoes_basicas') or {}
+    composition = latest.get('composicao_corporal') or {}
+    indices = latest.get('indices_corporais') or {}
+    return {
+        'patient_id': patient_id_of(latest),
+        'nome': basic.get('nome'),
+        'measurement_count': measurement_count,
+        'latest_measurement_id': latest.get('id'),
+        'latest_exam_date': basic.get('data_exame'),
+        'latest_exam_timestamp': latest.get(EXAM_TIMESTAMP_FIELD),
+        'peso': composition.get('peso'),
+        'massa_gordura': composition.get('massa_gordura'),
+        'massa_muscular_esqueletica': composition.get('massa_muscular_esqueletica'),
+        'imc': indices.get('imc'),
+        'pgc': indices.get('pgc'),
+    }
+
+
+class MeasurementStore(ABC):
+    """
+    Storage interface for measurements.
+
+    Implementations are synchronous and are called from the storage worker
+    pool (see executor.run_storage). Returned dictionaries include the
+    document ID under 'id' and are owned by the caller.
+    """
+
+    @abstractmethod
+    def save_measurement(self, measurement_data: Dict[str, Any], doc_id: Optional[str] = None) -> str:
+        """
+        Save measurement data, creating a new document if doc_id is None.
+
+        New documents are stored under their measurement_key, so saving the
+        same scan twice follows DEDUP_MODE.
+
+        Returns:
+            str: The document ID of the saved measurement
+
+        Raises:
+            MeasurementExistsError: If DEDUP_MODE is 'reject' and the scan is already stored
+        """
+
+    @abstractmethod
+    def save_measurements_batch(self, measurements: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Save many new measurements, following DEDUP_MODE like save_measurement.
+
+        Returns:
+            list: The document IDs of the saved measurements, in input order;
+                None for measurements rejected as duplicates (DEDUP_MODE=reject)
+        """
+
+    @abstractmethod
+    def upsert_measurements(self, measurements: List[Dict[str, Any]]) -> List[Tuple[str, bool]]:
+        """
+        Save many measurements, merging each into the patient's existing
+        measurement with the same exam time instead of creating a duplicate.
+
+        Every measurement must have a patient ID and a parseable exam date.
+        Measurements are matched on measurement_key with allow_date_only, so
+        records whose exam date has no time of day match on the date alone.
+
+        Returns:
+            list: (document ID, whether it was created) for each measurement, in input order
+        """
+
+    @abstractmethod
+    def consolidate_measurements(self, doc_id: str, measurement_data: Dict[str, Any],
+                                 duplicate_ids: List[str]) -> None:
+        """
+        Replace duplicates with one measurement in a single write.
+
+        Stores measurement_data under doc_id (replacing any document there)
+        and deletes duplicate_ids. Used by the deduplication sweep.
+        """
+
+    @abstractmethod
+    def get_all_measurements(self) -> List[Dict[str, Any]]:
+        """
+        Get all measurements, ordered by exam date.
+
+        Returns:
+            list: List of measurement dictionaries
+        """
+
+    @abstractmethod
+    def list_measurements(self, page_size: int, cursor: Optional[str] = None,
+                          since: Optional[datetime] = None, exam_from: Optional[datetime] = None,
+                          exam_to: Optional[datetime] = None, use_cache: bool = True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of measurements, by exam time or, with `since`, by change time.
+
+        `exam_from`/`exam_to` restrict the exam time range (inclusive) and
+        cannot be combined with `since`. Bulk readers that walk every page
+        pass use_cache=False so the pages are not kept in a backend cache.
+
+        Returns:
+            tuple: (list of measurement dictionaries, next cursor or None if this is the last page)
+
+        Raises:
+            ValueError: If the cursor is invalid or the filters cannot be combined
+        """
+
+    @abstractmethod
+    def get_patient_measurements(self, patient_id: str, exam_from: Optional[datetime] = None,
+                                 exam_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Get one patient's measurements, ordered by exam time, optionally within a range (inclusive).
+
+        Returns:
+            list: List of measurement dictionaries, empty if the patient is unknown
+        """
+
+    @abstractmethod
+    def list_patients(self) -> List[Dict[str, Any]]:
+        """
+        Get every patient with a summary of their latest measurement.
+
+        Returns:
+            list: Patient summaries (see build_patient_summary), ordered by patient ID
+        """
+
+    @abstractmethod
+    def get_measurement_with_etag(self, doc_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Get a specific measurement by ID together with its version.
+
+        Returns:
+            tuple: (measurement data, ETag), or (None, None) if not found
+        """
+
+    def get_measurement(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific measurement by ID.
+
+        Returns:
+            dict: The measurement data or None if not found
+        """
+        return self.get_measurement_with_etag(doc_id)[0]
+
+    @abstractmethod
+    def update_measurement(self, doc_id: str, measurement_data: Dict[str, Any],
+                           if_match: Optional[str] = None) -> str:
+        """
+        Merge fields into an existing measurement.
+
+        Returns:
+            str: The ETag of the updated document
+
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
+        """
+
+    @abstractmethod
+    def delete_measurement(self, doc_id: str, if_match: Optional[str] = None) -> bool:
+        """
+        Delete a measurement by ID.
+
+        Returns:
+            bool: True if deleted successfully
+
+        Raises:
+            MeasurementNotFoundError: If the document does not exist
+            MeasurementConflictError: If the document changed since if_match was read
+        """
+
+    @abstractmethod
+    def list_deleted_ids(self, since: datetime) -> List[str]:
+        """
+        Get the IDs of measurements deleted after a time, for incremental sync.
+
+        Deletions (including duplicates removed by consolidate_measurements)
+        leave a tombstone that is kept for DELETED_RETENTION_DAYS.
+
+        Returns:
+            list: Measurement IDs, oldest deletion first
+        """
+
+    @abstractmethod
+    def backfill_exam_timestamps(self, start_after: Optional[str] = None,
+                                 limit: int = BATCH_WRITE_LIMIT) -> Tuple[int, Optional[str]]:
+        """
+        Derive exam_timestamp for one batch of existing measurements, in document ID order.
+
+        Args:
+            start_after: Last document ID handled by the previous batch
+            limit: Number of documents to scan
+
+        Returns:
+            tuple: (documents updated, last document ID scanned or None when there are no more)
+        """
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get read-through cache counters.
+
+        Returns:
+            dict: Cache counters, empty if the backend does not cache
+        """
+        return {}
+
+    def close(self) -> None:
+        """Release connections and background listeners."""
+
+
+def get_storage_service(backend: str = STORAGE_BACKEND) -> MeasurementStore:
+    """
+    Create the configured storage backend.
+
+    Backends are imported lazily so the local backend runs without the
+    Google Cloud client libraries installed.
+
+    Args:
+        backend (str): 'firestore' or 'sqlite'
+
+    Returns:
+        MeasurementStore: The storage service
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend == "firestore":
+        from .firestore_service import FirestoreService
+        return FirestoreService()
+    if backend == "sqlite":
+        from .sqlite_service import SQLiteService
+        return SQLiteService()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,90 @@
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# Formats seen on InBody result sheets and in model output, most common first.
+# Day-first is preferred over month-first for slashed dates (Brazilian sheets).
+EXAM_DATE_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y.%m.%d %H:%M:%S",
+    "%Y.%m.%d %H:%M",
+    "%Y.%m.%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y/%m/%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_DOT = re.compile(r"\.(?=\s|$)")
+_TIME_OF_DAY = re.compile(r"\d{1,2}:\d{2}")
+
+
+def parse_exam_date(value: Any) -> Optional[datetime]:
+    """
+    Parse an exam date as written by the model into a timezone-aware datetime.
+
+    ISO 8601 strings (with or without offset) are accepted first, then the
+    formats in EXAM_DATE_FORMATS. Dates without an offset are the clinic's
+    wall-clock time and are stored as UTC, so they sort consistently.
+
+    Args:
+        value: The informacoes_basicas.data_exame value
+
+    Returns:
+        datetime: The exam time in UTC, or None if the value cannot be parsed
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        # InBody sheets often end dates with a dot ("2025.03.06.") or wrap times in parentheses
+        text = _WHITESPACE.sub(" ", value.replace("(", " ").replace(")", " ")).strip()
+        text = _TRAILING_DOT.sub("", text)
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            for fmt in EXAM_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+        if parsed is None:
+            return None
+    else:
+        return None
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def has_time_of_day(value: Any) -> bool:
+    """
+    Tell whether an exam date states the time of day, not just the date.
+
+    Args:
+        value: The informacoes_basicas.data_exame value
+
+    Returns:
+        bool: True for datetimes and for strings with an hours:minutes time
+    """
+    if isinstance(value, datetime):
+        return True
+    return isinstance(value, str) and _TIME_OF_DAY.search(value) is not None
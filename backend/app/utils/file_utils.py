@@ -1,8 +1,12 @@
 import os
+import io
+import mmap
 import uuid
 import logging
+import tempfile
+import zipfile
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional, Union
 import base64
 
 logger = logging.getLogger(__name__)
@@ -10,6 +14,133 @@ logger = logging.getLogger(__name__)
 # Define allowed file extensions
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf'}
 
+# Upload ingestion limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_SPILL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPILL_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Total decompressed size allowed for the members of one ZIP archive
+ZIP_MAX_UNCOMPRESSED_BYTES = int(os.getenv("ZIP_MAX_UNCOMPRESSED_BYTES", str(200 * 1024 * 1024)))
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the maximum allowed size."""
+
+
+class SpooledUpload:
+    """
+    Upload contents kept in memory, spilling to a temporary file above a size threshold.
+    
+    getbuffer() returns the in-memory bytes directly, or a read-only memoryview
+    over a memory map of the spilled file, so hashing it for the extraction
+    cache does not load a spilled file into memory. The model request and the
+    PDF splitter need bytes, so a spilled file is copied into memory once
+    when it is sent for extraction.
+    """
+    
+    def __init__(self, filename: str, spill_threshold: int = UPLOAD_SPILL_THRESHOLD_BYTES):
+        self.filename = filename
+        self.spill_threshold = spill_threshold
+        self.size = 0
+        self._chunks: List[bytes] = []
+        self._data: Optional[bytes] = None
+        self._file = None
+        self._mmap = None
+    
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk, spilling everything buffered so far to disk once over the threshold."""
+        self.size += len(chunk)
+        if self._file is None and self.size > self.spill_threshold:
+            self._file = tempfile.TemporaryFile()
+            for buffered in self._chunks:
+                self._file.write(buffered)
+            self._chunks = []
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._chunks.append(chunk)
+    
+    def getbuffer(self) -> Union[bytes, memoryview]:
+        """Get the full contents without copying a spilled file into memory."""
+        if self._file is None:
+            if self._data is None:
+                self._data = b"".join(self._chunks)
+                self._chunks = []
+            return self._data
+        if self._mmap is None:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)
+    
+    def open(self):
+        """
+        Open the contents as a seekable binary file, e.g. for zipfile.
+        
+        In-memory contents are wrapped without copying; a spilled file is
+        reopened through a duplicated descriptor, so closing the returned file
+        leaves this upload intact. Do not use more than one at a time.
+        """
+        if self._file is None:
+            return io.BytesIO(self.getbuffer())
+        self._file.flush()
+        reader = os.fdopen(os.dup(self._file.fileno()), "rb")
+        reader.seek(0)
+        return reader
+    
+    def close(self) -> None:
+        """Release the buffer and delete any spilled file."""
+        self._chunks = []
+        self._data = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view is still referenced; the map is released when it is collected
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+async def read_upload(upload_file, max_bytes: int = MAX_UPLOAD_BYTES,
+                      spill_threshold: int = UPLOAD_SPILL_THRESHOLD_BYTES) -> SpooledUpload:
+    """
+    Read an uploaded file in chunks, enforcing the maximum size.
+    
+    Starlette has already received the whole multipart body (spooling large
+    parts to disk) before this runs, so the limit bounds what is kept and
+    sent for extraction, not what the server receives.
+    
+    Args:
+        upload_file: The FastAPI UploadFile
+        max_bytes (int): Maximum allowed size in bytes
+        spill_threshold (int): Size above which the contents are kept on disk
+        
+    Returns:
+        SpooledUpload: The upload contents; the caller must close() it
+        
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    declared_size = getattr(upload_file, "size", None)
+    if declared_size is not None and declared_size > max_bytes:
+        raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_bytes} bytes")
+    
+    upload = SpooledUpload(upload_file.filename, spill_threshold)
+    try:
+        while True:
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_bytes} bytes")
+            upload.write(chunk)
+    except Exception:
+        upload.close()
+        raise
+    return upload
+
 def allowed_file(filename: str) -> bool:
     """
     Check if the file has an allowed extension.
@@ -57,15 +188,19 @@ def save_uploaded_file(file_data: bytes, original_filename: str, upload_dir: str
         logger.error(f"Error saving uploaded file: {str(e)}")
         raise
 
-def decode_base64_file(base64_data: str) -> Tuple[bytes, Optional[str]]:
+def decode_base64_file(base64_data: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[bytes, Optional[str]]:
     """
     Decode a base64-encoded file.
     
     Args:
         base64_data (str): Base64-encoded file data, may include MIME type prefix
+        max_bytes (int): Maximum allowed decoded size in bytes
         
     Returns:
         Tuple[bytes, Optional[str]]: (decoded file data, file type)
+        
+    Raises:
+        UploadTooLargeError: If the decoded file would be larger than max_bytes
     """
     try:
         # Check if the base64 data includes a MIME type prefix
@@ -76,6 +211,10 @@ def decode_base64_file(base64_data: str) -> Tuple[bytes, Optional[str]]:
         else:
             file_type = None
         
+        # Reject oversized payloads before decoding them
+        if len(base64_data) * 3 // 4 > max_bytes:
+            raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_bytes} bytes")
+        
         # Decode the base64 data
         file_data = base64.b64decode(base64_data)
         
@@ -104,3 +243,92 @@ def get_file_mime_type(file_path: str) -> str:
         '.pdf': 'application/pdf'
     }
     return mime_types.get(extension, 'application/octet-stream')
+
+def detect_mime_type(data: Union[bytes, memoryview]) -> str:
+    """
+    Get the MIME type of file contents from their leading bytes.
+    
+    Args:
+        data (bytes | memoryview): The file contents
+        
+    Returns:
+        str: MIME type, image/jpeg when the format is not recognised
+    """
+    header = bytes(data[:8])
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header.startswith(b'%PDF'):
+        return 'application/pdf'
+    return 'image/jpeg'
+
+def extract_zip_files(archive: SpooledUpload, max_files: int,
+                      max_file_bytes: int = MAX_UPLOAD_BYTES,
+                      max_total_bytes: int = ZIP_MAX_UNCOMPRESSED_BYTES,
+                      spill_threshold: int = UPLOAD_SPILL_THRESHOLD_BYTES) -> List[Tuple[str, SpooledUpload]]:
+    """
+    Extract the allowed files from a ZIP archive.
+    
+    Directories, hidden files (including macOS resource forks) and files with
+    disallowed extensions are skipped. Members are decompressed in chunks into
+    SpooledUploads, like uploaded files, so a large member spills to disk.
+    Sizes are checked against the archive directory before anything is
+    decompressed, and again while reading, since the directory of a crafted
+    archive can understate them.
+    
+    Args:
+        archive (SpooledUpload): The uploaded ZIP archive
+        max_files (int): Maximum number of files to extract
+        max_file_bytes (int): Maximum decompressed size of one file
+        max_total_bytes (int): Maximum decompressed size of all extracted files
+        spill_threshold (int): Size above which a member is kept on disk
+        
+    Returns:
+        List[Tuple[str, SpooledUpload]]: (member name, file contents) pairs; the caller must close() each
+        
+    Raises:
+        ValueError: If the archive is invalid, contains too many files or decompresses to too much data
+    """
+    extracted = []
+    try:
+        with archive.open() as source, zipfile.ZipFile(source) as zip_file:
+            members = [
+                info for info in zip_file.infolist()
+                if not info.is_dir()
+                and not any(part.startswith(('.', '__MACOSX')) for part in Path(info.filename).parts)
+                and allowed_file(info.filename)
+            ]
+            if len(members) > max_files:
+                raise ValueError(f"Archive contains {len(members)} files; the limit is {max_files}")
+            for info in members:
+                if info.file_size > max_file_bytes:
+                    raise ValueError(f"{info.filename} exceeds the maximum upload size of {max_file_bytes} bytes")
+            declared_total = sum(info.file_size for info in members)
+            if declared_total > max_total_bytes:
+                raise ValueError(
+                    f"Archive decompresses to {declared_total} bytes; the limit is {max_total_bytes}"
+                )
+            
+            total = 0
+            for info in members:
+                contents = SpooledUpload(info.filename, spill_threshold)
+                extracted.append((info.filename, contents))
+                with zip_file.open(info) as member:
+                    while True:
+                        chunk = member.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        if contents.size + len(chunk) > max_file_bytes:
+                            raise ValueError(
+                                f"{info.filename} exceeds the maximum upload size of {max_file_bytes} bytes"
+                            )
+                        total += len(chunk)
+                        if total > max_total_bytes:
+                            raise ValueError(f"Archive decompresses to more than {max_total_bytes} bytes")
+                        contents.write(chunk)
+            return extracted
+    except Exception as e:
+        for _, contents in extracted:
+            contents.close()
+        if isinstance(e, zipfile.BadZipFile):
+            raise ValueError(f"Invalid ZIP archive: {str(e)}") from e
+        raise
@@ -0,0 +1,47 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Tuple
+
+
+def encode_cursor(value: Any, doc_id: str) -> str:
+    """
+    Encode the position after a document as an opaque cursor.
+    
+    Args:
+        value: The document's value for the ordering field
+        doc_id (str): The document ID, used to break ties
+        
+    Returns:
+        str: URL-safe opaque cursor
+    """
+    if isinstance(value, datetime):
+        payload = {"t": "dt", "v": value.isoformat(), "id": doc_id}
+    else:
+        payload = {"t": "raw", "v": value, "id": doc_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor (str): The opaque cursor
+        
+    Returns:
+        Tuple[Any, str]: (ordering field value, document ID)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = payload["v"]
+        if payload["t"] == "dt":
+            value = datetime.fromisoformat(value)
+        return value, payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
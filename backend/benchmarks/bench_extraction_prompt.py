@@ -0,0 +1,126 @@
+"""
+Compare input tokens and latency of the extraction prompt before and after compaction.
+
+"legacy" is the prompt used before: instructions with the Python repr of the
+whole json.schema embedded in the text. "compact" is the current prompt: short
+instructions, with the compacted schema passed as the native response schema.
+
+For each variant and image, count_tokens gives the prompt's input tokens and
+each extraction run reports the billed input tokens (usage metadata, which
+includes the response schema) and the wall-clock latency.
+
+Usage:
+    python benchmarks/bench_extraction_prompt.py report.jpg --runs 3
+    python benchmarks/bench_extraction_prompt.py report.jpg --count-only
+    python benchmarks/bench_extraction_prompt.py reports/*.jpg --record responses/
+    python benchmarks/bench_extraction_prompt.py --offline
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.extraction_prompt import EXTRACTION_INSTRUCTIONS, PROMPT_VERSION, RESPONSE_SCHEMA, SCHEMA_PATH
+
+_LEGACY_TEMPLATE = """
+            Extract all available InBody measurement data from this image.
+            The image contains an InBody scale measurement report.
+            Extract all the metrics and values visible in the image.
+            Format the data according to the following JSON schema:
+
+            ```json
+            {schema}
+            ```
+
+            Return only the JSON data without any additional text or explanation.
+            """
+
+
+def _variants():
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    return {
+        "legacy": (_LEGACY_TEMPLATE.format(schema=schema), None),
+        "compact": (EXTRACTION_INSTRUCTIONS, RESPONSE_SCHEMA),
+    }
+
+
+def _offline() -> None:
+    """Report sizes without calling the API (about 4 characters per token)."""
+    print(f"prompt version {PROMPT_VERSION}")
+    for name, (text, response_schema) in _variants().items():
+        schema_chars = len(json.dumps(response_schema, ensure_ascii=False, separators=(",", ":"))) if response_schema else 0
+        total = len(text) + schema_chars
+        print(f"{name:8} prompt {len(text):6} chars, response schema {schema_chars:6} chars, ~{total // 4} tokens")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="InBody report images or PDFs")
+    parser.add_argument("--runs", type=int, default=3, help="Extractions per variant and image")
+    parser.add_argument("--count-only", action="store_true", help="Only count tokens, do not run extractions")
+    parser.add_argument("--offline", action="store_true", help="Only compare prompt sizes, without API calls")
+    parser.add_argument("--record", help="Save each raw response to this directory, as a corpus for "
+                        "benchmarks/bench_response_parser.py")
+    parser.add_argument("--region", default="us-central1", help="Vertex AI region")
+    parser.add_argument("--model", default="gemini-2.0-flash-001", help="Gemini model")
+    args = parser.parse_args()
+
+    if args.offline:
+        _offline()
+        return
+    if not args.images:
+        parser.error("give at least one image, or --offline")
+
+    import vertexai
+    from vertexai.generative_models import GenerationConfig, GenerativeModel, Part
+
+    vertexai.init(project=os.getenv("project_id"), location=args.region)
+    model = GenerativeModel(args.model)
+    mime_types = {".png": "image/png", ".pdf": "application/pdf"}
+    runs = 0 if args.count_only else args.runs
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    for name, (text, response_schema) in _variants().items():
+        config = GenerationConfig(
+            max_output_tokens=8192, temperature=0.2, top_p=0.95, response_mime_type="application/json",
+            **({"response_schema": response_schema} if response_schema else {}),
+        )
+        counted, billed, latencies = [], [], []
+        for path in args.images:
+            with open(path, "rb") as f:
+                image = Part.from_data(f.read(), mime_type=mime_types.get(os.path.splitext(path)[1].lower(), "image/jpeg"))
+            prompt = [image, text]
+            counted.append(model.count_tokens(prompt).total_tokens)
+            for _ in range(runs):
+                start = time.perf_counter()
+                response = model.generate_content(prompt, generation_config=config)
+                latencies.append(time.perf_counter() - start)
+                billed.append(response.usage_metadata.prompt_token_count)
+                if args.record:
+                    stem = os.path.splitext(os.path.basename(path))[0]
+                    record_path = os.path.join(args.record, f"{name}-{stem}-{len(latencies)}.txt")
+                    with open(record_path, "w", encoding="utf-8") as f:
+                        f.write(response.text)
+                # Fail loudly if a variant stops producing usable output
+                json.loads(response.text)
+
+        line = f"{name:8} count_tokens {statistics.mean(counted):8.0f}"
+        if latencies:
+            line += (f"  billed input {statistics.mean(billed):8.0f}"
+                     f"  latency mean {statistics.mean(latencies):6.2f}s"
+                     f"  median {statistics.median(latencies):6.2f}s  ({len(latencies)} runs)")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
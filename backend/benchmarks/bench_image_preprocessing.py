@@ -0,0 +1,123 @@
+"""
+Measure what image preprocessing saves before a photo is sent to the model.
+
+For each image, reports the size and dimensions before and after
+app.services.image_preprocessor.preprocess_image and the time it takes, then
+the throughput of the whole set through the preprocessing process pool.
+With --live, also compares the model's input tokens and extraction latency
+for the original and the preprocessed image.
+
+Without images, a synthetic 12 MP phone photo of a printout (rotated by its
+EXIF orientation, on a noisy background) is used.
+
+Usage:
+    python benchmarks/bench_image_preprocessing.py
+    python benchmarks/bench_image_preprocessing.py photos/*.jpg --repeat 5
+    python benchmarks/bench_image_preprocessing.py photos/*.jpg --live
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from PIL import Image, ImageDraw
+
+from app.services.executor import PREPROCESS_WORKERS, run_in_process_pool, shutdown_executors
+from app.services.image_preprocessor import preprocess_image
+from app.utils.file_utils import get_file_mime_type
+
+
+def _synthetic_photo():
+    """A printout photographed on a desk: noisy background, page in the middle, EXIF rotated."""
+    photo = Image.effect_noise((4032, 3024), 40).point(lambda level: level // 3).convert("RGB")
+    page = Image.new("RGB", (2200, 2900), "white")
+    draw = ImageDraw.Draw(page)
+    for row in range(120, 2800, 48):
+        draw.text((140, row), f"Peso (kg) {row / 37:.1f}   Massa de gordura {row / 91:.1f}   PGC {row / 113:.1f}",
+                  fill="black")
+    photo.paste(page.rotate(90, expand=True), (300, 250))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    output = io.BytesIO()
+    photo.save(output, format="JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+def _describe(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return f"{len(data) / 1024:8.0f} KB {image.width}x{image.height}"
+
+
+def _live(samples):
+    import vertexai
+    from vertexai.generative_models import GenerationConfig, GenerativeModel, Part
+
+    from app.services.extraction_prompt import EXTRACTION_INSTRUCTIONS, RESPONSE_SCHEMA
+
+    vertexai.init(project=os.getenv("project_id"), location="us-central1")
+    model = GenerativeModel("gemini-2.0-flash-001")
+    config = GenerationConfig(max_output_tokens=8192, temperature=0.2, top_p=0.95,
+                              response_mime_type="application/json", response_schema=RESPONSE_SCHEMA)
+    for name, (original, mime_type), (processed, processed_type) in samples:
+        for label, data, kind in (("original", original, mime_type), ("processed", processed, processed_type)):
+            prompt = [Part.from_data(data, mime_type=kind), EXTRACTION_INSTRUCTIONS]
+            tokens = model.count_tokens(prompt).total_tokens
+            start = time.perf_counter()
+            response = model.generate_content(prompt, generation_config=config)
+            latency = time.perf_counter() - start
+            json.loads(response.text)
+            print(f"{name[:24]:24} {label:9} input tokens {tokens:6}  latency {latency:6.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="Photos of InBody reports (JPEG or PNG)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per image")
+    parser.add_argument("--live", action="store_true", help="Also compare input tokens and latency with Gemini")
+    args = parser.parse_args()
+
+    inputs = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            inputs.append((os.path.basename(path), f.read(), get_file_mime_type(path)))
+    if not inputs:
+        inputs.append(("synthetic", _synthetic_photo(), "image/jpeg"))
+
+    samples = []
+    for name, data, mime_type in inputs:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            processed, processed_type = preprocess_image(data, mime_type)
+            timings.append(time.perf_counter() - start)
+        samples.append((name, (data, mime_type), (processed, processed_type)))
+        print(f"{name[:24]:24} {_describe(data)} -> {_describe(processed)}"
+              f"  ({100 * len(processed) / len(data):5.1f}%)  {statistics.median(timings) * 1000:7.1f} ms")
+
+    # Pool throughput, as seen by concurrent extraction workers
+    batch = [(data, mime_type) for _, data, mime_type in inputs] * max(PREPROCESS_WORKERS * 2, 4)
+    run_in_process_pool(preprocess_image, *batch[0])  # spawn the workers outside the timing
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(batch)) as threads:
+        list(threads.map(lambda item: run_in_process_pool(preprocess_image, *item), batch))
+    elapsed = time.perf_counter() - start
+    print(f"process pool ({PREPROCESS_WORKERS} workers): {len(batch)} images in {elapsed:.2f}s, "
+          f"{len(batch) / elapsed:.1f} images/s")
+    shutdown_executors()
+
+    if args.live:
+        _live(samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: per-call overhead of obtaining a Gemini model handle.
+
+Compares the previous per-request path (vertexai.init + new GenerativeModel +
+new prediction client for every region attempt) against the pooled handles in
+GeminiRegionClient. No model requests are sent; only handle and transport
+setup is measured. Requires Google Cloud credentials for client creation.
+
+Usage:
+    python benchmarks/bench_model_handles.py --iterations 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import vertexai
+from vertexai.generative_models import GenerativeModel
+
+from app.services.gemini_client import GeminiRegionClient
+
+
+def _per_call(client: GeminiRegionClient, region: str) -> None:
+    """Previous behaviour: initialise and build a fresh handle for each call."""
+    vertexai.init(project=client.project_id, location=region)
+    model = GenerativeModel(client.model_name)
+    getattr(model, "_prediction_client", None)
+
+
+def _pooled(client: GeminiRegionClient, region: str) -> None:
+    """Current behaviour: reuse the region's pooled handle."""
+    model = client._get_model(region)
+    getattr(model, "_prediction_client", None)
+
+
+def _measure(func, client: GeminiRegionClient, region: str, iterations: int) -> float:
+    """Return the mean time per call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(client, region)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project-id", default=os.getenv("project_id"), help="Google Cloud project ID")
+    parser.add_argument("--region", default="us-central1", help="Region to benchmark")
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per variant")
+    args = parser.parse_args()
+
+    client = GeminiRegionClient(project_id=args.project_id)
+
+    start = time.perf_counter()
+    client.warm_up(regions=[args.region])
+    warm_up_ms = (time.perf_counter() - start) * 1000
+
+    per_call_ms = _measure(_per_call, client, args.region, args.iterations)
+    pooled_ms = _measure(_pooled, client, args.region, args.iterations)
+
+    print(f"warm-up (one-off):      {warm_up_ms:8.3f} ms")
+    print(f"per-call init + build:  {per_call_ms:8.3f} ms/call")
+    print(f"pooled handle:          {pooled_ms:8.3f} ms/call")
+    if pooled_ms > 0:
+        print(f"speed-up:               {per_call_ms / pooled_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark of model response parsing and validation.
+
+Runs every response in a corpus through the current pipeline
+(app.services.response_parser.parse_measurement) and through the previous one
+(json.loads, then a greedy regex over the text, then defaults and
+MeasurementData.model_validate), and reports the time per response and how
+many responses each could not turn into a measurement.
+
+The corpus is a directory of raw responses, one per file, as saved by
+benchmarks/bench_extraction_prompt.py --record. Without --corpus, a synthetic
+corpus is built from the response schema: clean JSON, JSON in a markdown fence,
+JSON followed by prose, and output truncated at several points.
+
+Usage:
+    python benchmarks/bench_response_parser.py
+    python benchmarks/bench_response_parser.py --corpus responses/ --repeat 2000
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.schemas.measurement import MeasurementData
+from app.services.extraction_prompt import RESPONSE_SCHEMA
+from app.services.response_parser import apply_defaults, orjson, parse_measurement
+
+
+def _legacy_parse(text):
+    """The parsing and validation path used before response_parser."""
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r'({.*})', text, re.DOTALL)
+        if not match:
+            raise ValueError("Could not extract valid JSON from response")
+        result = json.loads(match.group(1))
+    result = apply_defaults(result)
+    MeasurementData.model_validate(result)
+    return result
+
+
+def _sample(schema, counter):
+    """Fill a schema node with distinct values of the right type."""
+    if "properties" in schema:
+        return {name: _sample(child, counter) for name, child in schema["properties"].items()}
+    value = next(counter)
+    types = schema.get("type")
+    kind = types[0] if isinstance(types, list) else types
+    if kind == "string":
+        return f"value {value}"
+    if kind == "integer":
+        return value
+    return round(value * 1.37, 2)
+
+
+def _synthetic_corpus():
+    document = _sample(RESPONSE_SCHEMA, itertools.count(1))
+    document["informacoes_basicas"]["data_exame"] = "06.03.2025 14:30"
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    corpus = {
+        "clean": text,
+        "compact": json.dumps(document, ensure_ascii=False, separators=(",", ":")),
+        "fenced": f"```json\n{text}\n```",
+        "trailing-prose": f"{text}\n\nNote: values {{in braces}} were read from the report.",
+    }
+    for fraction in (0.5, 0.75, 0.95):
+        corpus[f"truncated-{int(fraction * 100)}"] = text[:int(len(text) * fraction)]
+    return corpus
+
+
+def _load_corpus(directory):
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def _run(parse, text, repeat):
+    """Return (median seconds per call, whether the response was parsed)."""
+    try:
+        parse(text)
+    except Exception:
+        return None, False
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(text)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of recorded model responses")
+    parser.add_argument("--repeat", type=int, default=500, help="Timed calls per response and parser")
+    args = parser.parse_args()
+    # The fallback paths warn on every call
+    logging.disable(logging.WARNING)
+
+    corpus = _load_corpus(args.corpus) if args.corpus else _synthetic_corpus()
+    if not corpus:
+        parser.error(f"no responses in {args.corpus}")
+    print(f"{len(corpus)} responses, {args.repeat} calls each, orjson {'on' if orjson else 'off'}")
+
+    timings = {"legacy": {}, "current": {}}
+    for name, text in corpus.items():
+        line = f"{name[:28]:28} {len(text):7} chars"
+        for label, parse in (("legacy", _legacy_parse), ("current", parse_measurement)):
+            seconds, parsed = _run(parse, text, args.repeat)
+            if parsed:
+                timings[label][name] = seconds
+                line += f"  {label} {seconds * 1e6:8.1f}us"
+            else:
+                line += f"  {label} {'failed':>10}"
+        print(line)
+
+    # Compare speed only on responses both pipelines parse
+    common = timings["legacy"].keys() & timings["current"].keys()
+    for label, by_name in timings.items():
+        mean = f"{statistics.mean(by_name[name] for name in common) * 1e6:.1f}us" if common else "n/a"
+        print(f"{label:8} mean {mean} over {len(common)} responses both parse, "
+              f"failed {len(corpus) - len(by_name)} of {len(corpus)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load test: listing latency while uploads are in flight.
+
+Measures `GET /api/measurements` latency against a running API, first with no
+other traffic and then while a number of uploads are being processed. With the
+upload pipeline running off the event loop, both distributions should be
+roughly the same; before, a single upload stalled every other request.
+
+Usage:
+    python benchmarks/load_test_uploads.py --image sample.jpg --uploads 8
+"""
+import argparse
+import mimetypes
+import statistics
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import List
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return the given percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(label: str, samples: List[float]) -> str:
+    """Format a latency summary line in milliseconds."""
+    if not samples:
+        return f"{label}: no samples"
+    return (
+        f"{label}: n={len(samples)} "
+        f"p50={_percentile(samples, 50) * 1000:.1f}ms "
+        f"p95={_percentile(samples, 95) * 1000:.1f}ms "
+        f"max={max(samples) * 1000:.1f}ms "
+        f"mean={statistics.mean(samples) * 1000:.1f}ms"
+    )
+
+
+def _timed_get(url: str) -> float:
+    """Issue a GET request and return its latency in seconds."""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def _upload(url: str, image_path: Path) -> None:
+    """Upload a file as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    content_type = mimetypes.guess_type(image_path.name)[0] or "application/octet-stream"
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="file"; filename="{image_path.name}"\r\n'.encode(),
+        f"Content-Type: {content_type}\r\n\r\n".encode(),
+        image_path.read_bytes(),
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    request = urllib.request.Request(
+        url,
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        response.read()
+
+
+def _poll(url: str, duration: float, interval: float) -> List[float]:
+    """Repeatedly GET a URL for a duration and collect latencies."""
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        samples.append(_timed_get(url))
+        time.sleep(interval)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--image", required=True, type=Path, help="InBody image to upload")
+    parser.add_argument("--uploads", type=int, default=8, help="Number of concurrent uploads")
+    parser.add_argument("--duration", type=float, default=10.0, help="Baseline polling duration in seconds")
+    parser.add_argument("--interval", type=float, default=0.1, help="Delay between listing requests")
+    args = parser.parse_args()
+
+    list_url = f"{args.base_url}/api/measurements"
+    upload_url = f"{args.base_url}/api/measurements/upload"
+
+    # Baseline: listing latency with no uploads in flight
+    baseline = _poll(list_url, args.duration, args.interval)
+    print(_summary("baseline", baseline))
+
+    # Under load: keep polling until every upload has finished
+    errors = []
+
+    def _run_upload():
+        try:
+            _upload(upload_url, args.image)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_run_upload) for _ in range(args.uploads)]
+    upload_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    under_load = []
+    while any(thread.is_alive() for thread in threads):
+        under_load.append(_timed_get(list_url))
+        time.sleep(args.interval)
+    upload_elapsed = time.perf_counter() - upload_start
+
+    print(_summary("during uploads", under_load))
+    print(f"uploads: {args.uploads} in {upload_elapsed:.1f}s, {len(errors)} failed")
+
+    if baseline and under_load:
+        ratio = _percentile(under_load, 95) / _percentile(baseline, 95)
+        print(f"p95 ratio (during / baseline): {ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
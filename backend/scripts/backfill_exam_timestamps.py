@@ -0,0 +1,77 @@
+"""
+Backfill exam_timestamp on measurements saved before it existed.
+
+Scans the configured storage backend (STORAGE_BACKEND) in document ID order,
+parses informacoes_basicas.data_exame and writes exam_timestamp in batches.
+After every batch the last document ID is written to a checkpoint file, so an
+interrupted run continues where it stopped. Documents that already have the
+right value are skipped, so re-running is safe.
+
+Usage:
+    python scripts/backfill_exam_timestamps.py --batch-size 500
+    python scripts/backfill_exam_timestamps.py --restart
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.storage_backend import BATCH_WRITE_LIMIT, get_storage_service
+
+
+def _read_checkpoint(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path: str, doc_id: str) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(doc_id)
+    os.replace(temp_path, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=BATCH_WRITE_LIMIT, help="Documents per batch")
+    parser.add_argument("--checkpoint", default=".backfill_exam_timestamps", help="Checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    args = parser.parse_args()
+
+    storage = get_storage_service()
+    start_after = None if args.restart else _read_checkpoint(args.checkpoint)
+    if start_after:
+        print(f"Resuming after document {start_after}")
+
+    scanned_batches = 0
+    updated_total = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            updated, last_id = storage.backfill_exam_timestamps(start_after, args.batch_size)
+            if last_id is None:
+                break
+            scanned_batches += 1
+            updated_total += updated
+            start_after = last_id
+            _write_checkpoint(args.checkpoint, last_id)
+            print(f"batch {scanned_batches}: updated {updated}, last id {last_id}")
+    finally:
+        storage.close()
+
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    print(f"Done: updated {updated_total} measurements in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Merge duplicate measurements stored before ingest deduplication existed.
+
+Streams the configured storage backend (STORAGE_BACKEND) in exam time order,
+so copies of a scan (same patient, exam time and device model) arrive next to
+each other. Each set of copies is merged into one document stored under the
+scan's key, the ID new uploads of that scan use; the most recently created
+copy wins field by field. Single measurements still under a random ID are
+moved to their key too, so re-uploading them later is deduplicated.
+
+Runs as a dry run unless --apply is given. Re-running is safe: measurements
+already under their key are left alone.
+
+Usage:
+    python scripts/dedup_measurements.py
+    python scripts/dedup_measurements.py --apply
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.storage_backend import (
+    BATCH_WRITE_LIMIT,
+    EXAM_TIMESTAMP_FIELD,
+    deep_merge,
+    get_storage_service,
+    measurement_key,
+    patient_id_of,
+)
+
+# Fields recomputed by the storage layer on write
+_SERVER_FIELDS = ('id', 'updated_at', 'derivados')
+
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _created_at(measurement):
+    value = measurement.get('timestamp')
+    if not isinstance(value, datetime):
+        return _EPOCH
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _merge_copies(copies):
+    """Merge copies of one scan, oldest first, keeping the first copy's creation timestamp."""
+    # Not updated_at: refreshing derived data touches it on neighbouring measurements
+    copies = sorted(copies, key=_created_at)
+    merged = {}
+    for copy in copies:
+        merged = deep_merge(merged, {k: v for k, v in copy.items() if k not in _SERVER_FIELDS})
+    if 'timestamp' in copies[0]:
+        merged['timestamp'] = copies[0]['timestamp']
+    return merged
+
+
+def _process_group(storage, measurements, apply, stats):
+    """Consolidate measurements that share one exam time."""
+    by_key = defaultdict(list)
+    for measurement in measurements:
+        key = measurement_key(measurement)
+        if key is None:
+            stats['unkeyed'] += 1
+        else:
+            by_key[key].append(measurement)
+
+    for key, copies in by_key.items():
+        if len(copies) == 1 and copies[0]['id'] == key:
+            continue
+        duplicate_ids = [copy['id'] for copy in copies if copy['id'] != key]
+        if len(copies) > 1:
+            stats['merged'] += 1
+            stats['removed'] += len(copies) - 1
+            print(f"merge {len(copies)} copies of patient {patient_id_of(copies[0])} exam "
+                  f"{copies[0][EXAM_TIMESTAMP_FIELD].isoformat()} into {key}: {', '.join(duplicate_ids)}")
+        else:
+            stats['moved'] += 1
+        if apply:
+            storage.consolidate_measurements(key, _merge_copies(copies), duplicate_ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=BATCH_WRITE_LIMIT, help="Measurements read per page")
+    parser.add_argument("--apply", action="store_true", help="Write the changes instead of only reporting them")
+    args = parser.parse_args()
+
+    storage = get_storage_service()
+    stats = defaultdict(int)
+    start = time.perf_counter()
+    group, cursor = [], None
+    try:
+        while True:
+            page, cursor = storage.list_measurements(args.page_size, cursor, use_cache=False)
+            for measurement in page:
+                stats['scanned'] += 1
+                # A group is complete once the next exam time shows up; it may span pages
+                if group and measurement[EXAM_TIMESTAMP_FIELD] != group[0][EXAM_TIMESTAMP_FIELD]:
+                    _process_group(storage, group, args.apply, stats)
+                    group = []
+                group.append(measurement)
+            if cursor is None:
+                break
+        if group:
+            _process_group(storage, group, args.apply, stats)
+    finally:
+        storage.close()
+
+    merged, moved = ("Merged", "moved") if args.apply else ("Would merge", "would move")
+    print(f"{merged} {stats['merged']} duplicated scans ({stats['removed']} copies removed), "
+          f"{moved} {stats['moved']} measurements to their key; scanned {stats['scanned']}, "
+          f"{stats['unkeyed']} without a patient ID or exam date, in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
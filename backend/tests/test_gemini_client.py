@@ -0,0 +1,120 @@
+import unittest
+
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+
+from app.services.gemini_client import GeminiRegionClient
+from app.services.region_router import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, RegionRouter
+
+from .test_region_router import FakeClock
+
+PRIMARY = "us-central1"
+SECONDARY = "europe-west2"
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Model handle for one region: answers after `latency` fake seconds, or raises `error`."""
+
+    def __init__(self, region, clock):
+        self.region = region
+        self.clock = clock
+        self.latency = 1.0
+        self.error = None
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        self.clock.advance(self.latency)
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(f"answer from {self.region}")
+
+
+class GeminiRegionClientTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.models = {}
+
+        def model_factory(region):
+            self.models[region] = FakeModel(region, self.clock)
+            return self.models[region]
+
+        self.client = GeminiRegionClient(project_id="test-project", model_factory=model_factory, clock=self.clock)
+        self.client.hedging = False
+        # Two regions and small thresholds keep the scenarios short
+        self.client.router = RegionRouter([PRIMARY, SECONDARY], failure_threshold=2, min_requests=100,
+                                          cooldown_seconds=60, clock=self.clock)
+        self.client.warm_up()
+
+    def state_of(self, region):
+        return next(entry["state"] for entry in self.client.router.snapshot() if entry["region"] == region)
+
+    def test_uses_the_model_factory_for_every_region(self):
+        self.assertEqual(set(self.models), set(self.client.regions))
+        self.assertEqual(self.client.generate_content("prompt"), f"answer from {PRIMARY}")
+
+    def test_routes_to_the_healthiest_region_first(self):
+        self.models[PRIMARY].latency = 5.0
+        self.models[SECONDARY].latency = 1.0
+        self.client.router.record_success(PRIMARY, 5.0)
+        self.client.router.record_success(SECONDARY, 1.0)
+        self.assertEqual(self.client.generate_content("prompt"), f"answer from {SECONDARY}")
+        self.assertEqual(self.models[PRIMARY].calls, 0)
+
+    def test_measures_latency_with_the_injected_clock(self):
+        self.models[PRIMARY].latency = 3.0
+        self.client.generate_content("prompt")
+        entry = next(entry for entry in self.client.router.snapshot() if entry["region"] == PRIMARY)
+        self.assertEqual(entry["latency_ewma_seconds"], 3.0)
+
+    def test_failing_region_opens_its_breaker_and_traffic_moves_on(self):
+        self.models[PRIMARY].error = ServiceUnavailable("down")
+        for _ in range(2):
+            self.assertEqual(self.client.generate_content("prompt"), f"answer from {SECONDARY}")
+        self.assertEqual(self.state_of(PRIMARY), STATE_OPEN)
+        self.assertEqual(self.models[PRIMARY].calls, 2)
+
+        self.client.generate_content("prompt")
+        self.assertEqual(self.models[PRIMARY].calls, 2)
+
+    def test_half_open_trial_recovers_the_region(self):
+        self.models[PRIMARY].error = ServiceUnavailable("down")
+        for _ in range(2):
+            self.client.generate_content("prompt")
+        self.clock.advance(60)
+        self.assertEqual(self.state_of(PRIMARY), STATE_HALF_OPEN)
+
+        # The recovering region is tried only after the healthy one
+        self.models[PRIMARY].error = None
+        self.assertEqual(self.client.generate_content("prompt"), f"answer from {SECONDARY}")
+        self.assertEqual(self.models[PRIMARY].calls, 2)
+
+        # When the healthy region fails, the trial goes to the recovering one and closes its breaker
+        self.models[SECONDARY].error = ServiceUnavailable("down")
+        self.assertEqual(self.client.generate_content("prompt"), f"answer from {PRIMARY}")
+        self.assertEqual(self.state_of(PRIMARY), STATE_CLOSED)
+
+    def test_failed_trial_reopens_the_breaker(self):
+        self.models[PRIMARY].error = ServiceUnavailable("down")
+        for _ in range(2):
+            self.client.generate_content("prompt")
+        self.clock.advance(60)
+        self.models[SECONDARY].error = ServiceUnavailable("down")
+        with self.assertRaises(Exception):
+            self.client._generate_serial("prompt", self.client.default_generation_config)
+        self.assertEqual(self.state_of(PRIMARY), STATE_OPEN)
+
+    def test_request_errors_are_not_sent_to_other_regions(self):
+        self.models[PRIMARY].error = InvalidArgument("corrupt image")
+        with self.assertRaises(InvalidArgument):
+            self.client.generate_content("prompt")
+        self.assertEqual(self.models[SECONDARY].calls, 0)
+        self.assertEqual(self.state_of(PRIMARY), STATE_CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
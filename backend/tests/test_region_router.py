@@ -0,0 +1,154 @@
+import unittest
+
+from app.services.region_router import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    RegionRouter,
+)
+
+
+class FakeClock:
+    """Monotonic clock that only moves when a test advances it."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_router(clock, regions=("a", "b", "c"), **kwargs):
+    options = dict(failure_threshold=3, error_rate_threshold=0.5, min_requests=10,
+                   cooldown_seconds=60, window_seconds=300)
+    options.update(kwargs)
+    return RegionRouter(list(regions), clock=clock, **options)
+
+
+def state_of(router, region):
+    return next(entry["state"] for entry in router.snapshot() if entry["region"] == region)
+
+
+class RegionRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = make_router(self.clock)
+
+    def fail_region(self, region, times=1, quota_error=False):
+        for _ in range(times):
+            self.router.begin(region)
+            self.router.record_failure(region, RuntimeError("unavailable"), quota_error=quota_error)
+
+    def test_preference_order_without_statistics(self):
+        self.assertEqual(self.router.ordered_regions(), ["a", "b", "c"])
+
+    def test_orders_healthiest_first(self):
+        self.router.record_success("a", 4.0)
+        self.router.record_success("b", 1.0)
+        self.router.record_success("c", 2.0)
+        self.assertEqual(self.router.ordered_regions(), ["b", "c", "a"])
+
+    def test_errors_push_a_region_back(self):
+        for region in ("a", "b", "c"):
+            self.router.record_success(region, 1.0)
+        self.fail_region("a")
+        self.assertEqual(self.router.ordered_regions(), ["b", "c", "a"])
+
+    def test_quota_errors_push_a_region_back(self):
+        for region in ("a", "b", "c"):
+            self.router.record_success(region, 1.0)
+        self.fail_region("a", quota_error=True)
+        self.assertEqual(self.router.ordered_regions(), ["b", "c", "a"])
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        self.fail_region("a", times=2)
+        self.assertEqual(state_of(self.router, "a"), STATE_CLOSED)
+        self.fail_region("a")
+        self.assertEqual(state_of(self.router, "a"), STATE_OPEN)
+        self.assertNotIn("a", self.router.ordered_regions())
+
+    def test_success_resets_consecutive_failures(self):
+        self.fail_region("a", times=2)
+        self.router.record_success("a", 1.0)
+        self.fail_region("a", times=2)
+        self.assertEqual(state_of(self.router, "a"), STATE_CLOSED)
+
+    def test_breaker_opens_on_error_rate(self):
+        router = make_router(self.clock, failure_threshold=100, min_requests=4)
+        for _ in range(2):
+            router.record_success("a", 1.0)
+            router.record_failure("a", RuntimeError("unavailable"))
+        self.assertEqual(state_of(router, "a"), STATE_OPEN)
+
+    def test_half_open_after_cooldown(self):
+        self.fail_region("a", times=3)
+        self.clock.advance(59)
+        self.assertEqual(state_of(self.router, "a"), STATE_OPEN)
+        self.clock.advance(1)
+        self.assertEqual(state_of(self.router, "a"), STATE_HALF_OPEN)
+        # A recovering region is only tried after the healthy ones
+        self.assertEqual(self.router.ordered_regions(), ["b", "c", "a"])
+
+    def test_half_open_allows_a_single_trial(self):
+        self.fail_region("a", times=3)
+        self.clock.advance(60)
+        self.assertTrue(self.router.begin("a"))
+        self.assertFalse(self.router.begin("a"))
+        self.assertNotIn("a", self.router.ordered_regions())
+        # Healthy regions are never limited to one request
+        self.assertTrue(self.router.begin("b"))
+        self.assertTrue(self.router.begin("b"))
+
+    def test_released_trial_can_be_retried(self):
+        self.fail_region("a", times=3)
+        self.clock.advance(60)
+        self.assertTrue(self.router.begin("a"))
+        self.router.release("a")
+        self.assertTrue(self.router.begin("a"))
+
+    def test_successful_trial_closes_the_breaker(self):
+        self.fail_region("a", times=3)
+        self.clock.advance(60)
+        self.router.begin("a")
+        self.router.record_success("a", 1.0)
+        self.assertEqual(state_of(self.router, "a"), STATE_CLOSED)
+        self.assertIn("a", self.router.ordered_regions())
+        self.assertTrue(self.router.begin("a"))
+        self.assertTrue(self.router.begin("a"))
+
+    def test_failed_trial_reopens_for_a_new_cooldown(self):
+        self.fail_region("a", times=3)
+        self.clock.advance(60)
+        self.router.begin("a")
+        self.router.record_failure("a", RuntimeError("still down"))
+        self.assertEqual(state_of(self.router, "a"), STATE_OPEN)
+        self.clock.advance(59)
+        self.assertEqual(state_of(self.router, "a"), STATE_OPEN)
+        self.clock.advance(1)
+        self.assertEqual(state_of(self.router, "a"), STATE_HALF_OPEN)
+
+    def test_all_open_probes_the_region_that_opened_first(self):
+        self.fail_region("b", times=3)
+        self.clock.advance(1)
+        self.fail_region("a", times=3)
+        self.clock.advance(1)
+        self.fail_region("c", times=3)
+        self.assertEqual(self.router.ordered_regions(), ["b"])
+
+    def test_old_outcomes_leave_the_window(self):
+        router = make_router(self.clock, failure_threshold=100, min_requests=4, window_seconds=300)
+        router.record_failure("a", RuntimeError("unavailable"))
+        router.record_failure("a", RuntimeError("unavailable"))
+        self.clock.advance(301)
+        router.record_success("a", 1.0)
+        router.record_success("a", 1.0)
+        router.record_failure("a", RuntimeError("unavailable"))
+        router.record_success("a", 1.0)
+        self.assertEqual(state_of(router, "a"), STATE_CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
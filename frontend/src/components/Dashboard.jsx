@@ -64,12 +64,8 @@ const Dashboard = () => {
   // Set selected measurement when measurements are loaded
   useEffect(() => {
     if (measurements && measurements.length > 0) {
-      // Sort measurements by date (most recent first)
-      const sortedMeasurements = [...measurements].sort((a, b) => {
-        const dateA = new Date(a.informacoes_basicas?.data_exame);
-        const dateB = new Date(b.informacoes_basicas?.data_exame);
-        return dateB - dateA;
-      });
+      // The API returns measurements ordered by exam_timestamp; most recent first
+      const sortedMeasurements = [...measurements].reverse();
       
       // Set the most recent measurement as selected
       setSelectedMeasurement(sortedMeasurements[0]);
@@ -188,11 +184,7 @@ const Dashboard = () => {
     
     if (measurement) {
       // Find the previous measurement (the one before the selected one in chronological order)
-      const sortedMeasurements = [...measurements].sort((a, b) => {
-        const dateA = new Date(a.informacoes_basicas?.data_exame);
-        const dateB = new Date(b.informacoes_basicas?.data_exame);
-        return dateB - dateA; // Descending order (most recent first)
-      });
+      const sortedMeasurements = [...measurements].reverse(); // Most recent first
       
       const selectedIndex = sortedMeasurements.findIndex(m => m.id === selectedId);
       
@@ -251,12 +243,15 @@ const Dashboard = () => {
     const prevBMI = previousMeasurement?.indices_corporais?.imc;
     const prevPBF = previousMeasurement?.indices_corporais?.pgc;
     
-    // Calculate changes
-    const weightChange = calculateChange(composicao_corporal?.peso, prevWeight);
-    const fatChange = calculateChange(composicao_corporal?.massa_gordura, prevFat);
-    const muscleChange = calculateChange(composicao_corporal?.massa_muscular_esqueletica, prevMuscle);
-    const bmiChange = calculateChange(indices_corporais?.imc, prevBMI);
-    const pbfChange = calculateChange(indices_corporais?.pgc, prevPBF);
+    // Use the deltas precomputed by the backend; compute them here for older records without them
+    const variacao = selectedMeasurement.derivados?.variacao;
+    const weightChange = variacao ? variacao.peso : calculateChange(composicao_corporal?.peso, prevWeight);
+    const fatChange = variacao ? variacao.massa_gordura : calculateChange(composicao_corporal?.massa_gordura, prevFat);
+    const muscleChange = variacao
+      ? variacao.massa_muscular_esqueletica
+      : calculateChange(composicao_corporal?.massa_muscular_esqueletica, prevMuscle);
+    const bmiChange = variacao ? variacao.imc : calculateChange(indices_corporais?.imc, prevBMI);
+    const pbfChange = variacao ? variacao.pgc : calculateChange(indices_corporais?.pgc, prevPBF);
     
     return (
       <Grid container spacing={2} sx={{ mb: 3 }}>
@@ -18,6 +18,7 @@ const FileUpload = ({ onUploadSuccess }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [success, setSuccess] = useState(false);
+  const [sections, setSections] = useState([]);
 
   // Handle file drop
   const onDrop = useCallback((acceptedFiles) => {
@@ -49,20 +50,58 @@ const FileUpload = ({ onUploadSuccess }) => {
 
     setLoading(true);
     setError(null);
+    setSections([]);
+
+    if (file.name.toLowerCase().endsWith('.pdf')) {
+      await handlePdfUpload();
+      return;
+    }
 
     try {
-      const response = await apiService.uploadFile(file);
+      // Sections arrive while the model is still reading the report
+      const response = await apiService.uploadFileStream(file, (name) => {
+        setSections((previous) => [...previous, name]);
+      });
       
-      if (response.data.success) {
+      if (response.success) {
         setSuccess(true);
         setFile(null);
         
         // Call the callback function with the measurement data
         if (onUploadSuccess) {
-          onUploadSuccess(response.data.data);
+          onUploadSuccess(response.data);
         }
       } else {
-        setError(response.data.message || 'Upload failed');
+        setError(response.message || 'Upload failed');
+      }
+    } catch (err) {
+      console.error('Upload error:', err);
+      setError(err.detail || 'Error uploading file. Please try again.');
+    } finally {
+      setLoading(false);
+      setSections([]);
+    }
+  };
+
+  // Handle PDF upload; an export may hold several reports, each saved as its own measurement
+  const handlePdfUpload = async () => {
+    try {
+      const response = await apiService.uploadPdf(file);
+      const saved = response.data.results.filter((result) => result.success);
+      
+      if (saved.length > 0) {
+        setSuccess(true);
+        setFile(null);
+        
+        if (onUploadSuccess) {
+          onUploadSuccess(saved[saved.length - 1].data);
+        }
+      }
+      if (!response.data.success) {
+        const failed = response.data.results
+          .filter((result) => !result.success)
+          .map((result) => `${result.file_name}: ${result.error}`);
+        setError(`${response.data.message}. ${failed.join('; ')}`);
       }
     } catch (err) {
       console.error('Upload error:', err);
@@ -191,6 +230,12 @@ const FileUpload = ({ onUploadSuccess }) => {
         </Box>
       </Paper>
       
+      {loading && sections.length > 0 && (
+        <Typography variant="body2" color="textSecondary" align="center" sx={{ mb: 2 }}>
+          Extracted so far: {sections.map((name) => name.replace(/_/g, ' ')).join(', ')}
+        </Typography>
+      )}
+      
       {error && (
         <Alert severity="error" sx={{ mb: 2 }}>
           {error}
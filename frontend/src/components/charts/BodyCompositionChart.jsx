@@ -33,12 +33,8 @@ const BodyCompositionChart = ({ measurements, selectedMeasurement, loading, erro
 
   // Prepare chart data from measurements
   const prepareChartData = () => {
-    // Sort measurements by date
-    const sortedMeasurements = [...measurements].sort((a, b) => {
-      const dateA = new Date(a.informacoes_basicas?.data_exame);
-      const dateB = new Date(b.informacoes_basicas?.data_exame);
-      return dateA - dateB;
-    });
+    // The API returns measurements ordered by exam_timestamp
+    const sortedMeasurements = measurements;
 
     // Extract dates for labels
     const labels = sortedMeasurements.map(m => {
@@ -172,11 +168,7 @@ const BodyCompositionChart = ({ measurements, selectedMeasurement, loading, erro
           afterBody: function(context) {
             // Add total weight for this date
             const dataIndex = context[0].dataIndex;
-            const sortedMeasurements = [...measurements].sort((a, b) => {
-              const dateA = new Date(a.informacoes_basicas?.data_exame);
-              const dateB = new Date(b.informacoes_basicas?.data_exame);
-              return dateA - dateB;
-            });
+            const sortedMeasurements = measurements;
             
             if (dataIndex < sortedMeasurements.length) {
               const measurement = sortedMeasurements[dataIndex];
@@ -35,12 +35,8 @@ const WeightChart = ({ measurements, selectedMeasurement, loading, error }) => {
 
   // Prepare chart data from measurements
   const prepareChartData = () => {
-    // Sort measurements by date
-    const sortedMeasurements = [...measurements].sort((a, b) => {
-      const dateA = new Date(a.informacoes_basicas?.data_exame);
-      const dateB = new Date(b.informacoes_basicas?.data_exame);
-      return dateA - dateB;
-    });
+    // The API returns measurements ordered by exam_timestamp
+    const sortedMeasurements = measurements;
 
     // Extract dates and weights
     const labels = sortedMeasurements.map(m => {
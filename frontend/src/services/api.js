@@ -26,6 +26,73 @@ const apiService = {
     });
   },
   
+  /**
+   * Upload a PDF that may hold several InBody reports
+   * @param {File} file - The PDF to upload
+   * @returns {Promise} - The response from the server, with one result per report page
+   */
+  uploadPdf: async (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    return api.post('/measurements/upload-pdf', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
+  
+  /**
+   * Upload a file and receive the extracted sections as they are produced
+   * @param {File} file - The file to upload
+   * @param {function} [onSection] - Called with (name, value) for each section preview
+   * @returns {Promise} - Resolves with the saved measurement response, rejects with an Error carrying status and detail
+   */
+  uploadFileStream: async (file, onSection) => {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    // EventSource cannot POST, so read the event stream from fetch
+    const response = await fetch('/api/measurements/upload/stream', {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw Object.assign(new Error(body.detail || 'Upload failed'), { status: response.status, detail: body.detail });
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) {
+        throw new Error('Stream ended before the measurement was saved');
+      }
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const lines = buffer.slice(0, end).split('\n');
+        buffer = buffer.slice(end + 2);
+        const event = lines.find((line) => line.startsWith('event: '))?.slice(7);
+        const data = lines.find((line) => line.startsWith('data: '))?.slice(6);
+        if (!event || data === undefined) {
+          continue;
+        }
+        const payload = JSON.parse(data);
+        if (event === 'section') {
+          onSection?.(payload.name, payload.value);
+        } else if (event === 'measurement') {
+          reader.cancel();
+          return payload;
+        } else if (event === 'error') {
+          reader.cancel();
+          throw Object.assign(new Error(payload.detail), payload);
+        }
+      }
+    }
+  },
+  
   /**
    * Upload a base64-encoded file to the server
    * @param {string} fileData - Base64-encoded file data
@@ -49,6 +116,20 @@ const apiService = {
     return api.get('/measurements');
   },
   
+  /**
+   * Get one page of measurements
+   * @param {object} options - Pagination options
+   * @param {number} [options.pageSize] - Maximum measurements per page
+   * @param {string} [options.cursor] - Cursor returned with the previous page
+   * @param {string} [options.since] - ISO timestamp; only measurements changed after it are returned
+   * @returns {Promise} - The response from the server, including next_cursor and, on the first page of a since sync, deleted_ids
+   */
+  listMeasurements: async ({ pageSize, cursor, since } = {}) => {
+    return api.get('/measurements', {
+      params: { page_size: pageSize, cursor, since },
+    });
+  },
+  
   /**
    * Get a specific measurement by ID
    * @param {string} id - The measurement ID
@@ -61,20 +142,61 @@ const apiService = {
   /**
    * Delete a measurement by ID
    * @param {string} id - The measurement ID
+   * @param {string} [etag] - ETag from getMeasurement; the delete fails with 412 if the measurement changed
    * @returns {Promise} - The response from the server
    */
-  deleteMeasurement: async (id) => {
-    return api.delete(`/measurements/${id}`);
+  deleteMeasurement: async (id, etag) => {
+    return api.delete(`/measurements/${id}`, etag ? { headers: { 'If-Match': etag } } : undefined);
   },
   
   /**
    * Update a measurement by ID
    * @param {string} id - The measurement ID
    * @param {object} data - The updated measurement data
+   * @param {string} [etag] - ETag from getMeasurement; the update fails with 412 if the measurement changed
    * @returns {Promise} - The response from the server
    */
-  updateMeasurement: async (id, data) => {
-    return api.put(`/measurements/${id}`, data);
+  updateMeasurement: async (id, data, etag) => {
+    return api.put(`/measurements/${id}`, data, etag ? { headers: { 'If-Match': etag } } : undefined);
+  },
+  
+  /**
+   * Get all patients with a summary of their latest measurement
+   * @returns {Promise} - The response from the server
+   */
+  listPatients: async () => {
+    return api.get('/patients');
+  },
+  
+  /**
+   * Get one patient's measurements, ordered by exam date
+   * @param {string} patientId - The patient ID (informacoes_basicas.id)
+   * @returns {Promise} - The response from the server
+   */
+  getPatientMeasurements: async (patientId) => {
+    return api.get(`/patients/${encodeURIComponent(patientId)}/measurements`);
+  },
+  
+  /**
+   * Get column-oriented measurement series for charts
+   * @param {object} options - Query options
+   * @param {string} [options.patientId] - Restrict to one patient
+   * @param {string} [options.examFrom] - ISO timestamp; earliest exam time
+   * @param {string} [options.examTo] - ISO timestamp; latest exam time
+   * @param {string[]} [options.fields] - Series to include (all if omitted)
+   * @param {number} [options.maxPoints] - Downsample to at most this many points
+   * @returns {Promise} - The response from the server
+   */
+  getTimeSeries: async ({ patientId, examFrom, examTo, fields, maxPoints } = {}) => {
+    return api.get('/analytics/timeseries', {
+      params: {
+        patient_id: patientId,
+        exam_from: examFrom,
+        exam_to: examTo,
+        fields: fields ? fields.join(',') : undefined,
+        max_points: maxPoints,
+      },
+    });
   },
 };
 